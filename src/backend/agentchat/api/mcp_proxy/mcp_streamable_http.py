@@ -22,19 +22,22 @@ from agentchat.mcp_proxy.json_rpc import rpc_error, rpc_ok, check_auth, sse_even
 from agentchat.schemas.json_rpc import HealthResponse
 from agentchat.mcp_proxy.session.manager import SessionManager
 from agentchat.mcp_proxy.session.models import ClientCapabilities, ClientInfo
+from agentchat.mcp_proxy.session.notification import NotificationBus, get_notification_bus
 from agentchat.settings import app_settings
 
 router = APIRouter(prefix="/mcp", tags=["MCP-Streamable-Http"])
 
-# session_id -> asyncio.Queue，用于服务端向 GET SSE 长连接推送通知
-_sse_queues: dict[str, asyncio.Queue] = {}
-
 
 # 依赖函数
 def get_session_manager(request: Request) -> SessionManager:
     return request.app.state.session_manager
 
 
+def get_bus() -> NotificationBus:
+    # 服务端推送通过 Redis 通知总线，跨 worker / 节点投递到 GET SSE 长连接
+    return get_notification_bus()
+
+
 # POST /{server_key}  ——  主入口，处理所有 JSON-RPC 请求
 @router.post("/{server_key}")
 async def streamable_http_endpoint(
@@ -150,6 +153,7 @@ async def sse_listen_endpoint(
     server_key: str,
     request: Request,
     sm: SessionManager = Depends(get_session_manager),
+    bus: NotificationBus = Depends(get_bus),
 ):
     """
     客户端建立 SSE 长连接，用于接收服务端主动推送的通知。
@@ -181,26 +185,32 @@ async def sse_listen_endpoint(
     if session.server_name != server_key:
         return Response(content="Session mismatch", status_code=400)
 
-    # 为该 session 创建推送队列
-    queue: asyncio.Queue = asyncio.Queue()
-    _sse_queues[session_id] = queue
+    # 为该 session 创建推送队列，并在通知总线中登记长连接所在节点
+    queue = await bus.subscribe(session_id)
+    await sm.assign_node(session_id)
 
-    logger.info(f"SSE listen connected: session={session_id}, server={server_key}")
+    logger.info(f"SSE listen connected: session={session_id}, server={server_key}, node={bus.node_id}")
 
     async def event_generator() -> AsyncGenerator[bytes, None]:
+        # 按时间续期节点路由：持续有通知时不会进入心跳分支，不能只在空闲时续期
+        refresh_interval = bus.route_ttl / 3
+        last_refresh = time.monotonic()
         try:
             while True:
                 if await request.is_disconnected():
                     logger.info(f"SSE listen disconnected: session={session_id}")
                     break
+                if time.monotonic() - last_refresh >= refresh_interval:
+                    await bus.refresh(session_id)
+                    last_refresh = time.monotonic()
                 try:
-                    item: dict = await asyncio.wait_for(queue.get(), timeout=30.0)
+                    item: dict = await asyncio.wait_for(queue.get(), timeout=min(30.0, refresh_interval))
                     yield sse_event(item).encode()
                 except asyncio.TimeoutError:
                     # 心跳，保持连接
                     yield sse_ping().encode()
         finally:
-            _sse_queues.pop(session_id, None)
+            await bus.unsubscribe(session_id, queue)
             logger.info(f"SSE listen cleanup: session={session_id}")
 
     return StreamingResponse(
@@ -220,6 +230,7 @@ async def close_session_endpoint(
     server_key: str,
     request: Request,
     sm: SessionManager = Depends(get_session_manager),
+    bus: NotificationBus = Depends(get_bus),
 ):
     if not check_auth(request):
         return JSONResponse(
@@ -248,7 +259,7 @@ async def close_session_endpoint(
         )
 
     await sm.delete_session(session_id)
-    _sse_queues.pop(session_id, None)
+    await bus.close_session(session_id)
 
     logger.info(f"Session deleted: {session_id}")
     return Response(status_code=200)
@@ -256,11 +267,11 @@ async def close_session_endpoint(
 
 # Health
 @router.get("/{server_key}/health", response_model=HealthResponse)
-async def health_check(server_key: str):
+async def health_check(server_key: str, bus: NotificationBus = Depends(get_bus)):
     return HealthResponse(
         status="UP",
         server_name=app_settings.server_name or "MCP-Proxy",
-        active_sessions=len(_sse_queues),
+        active_sessions=bus.local_session_count,
         timestamp=int(time.time()),
     )
 
@@ -324,26 +335,23 @@ async def _handle_streaming_response(
 
 async def push_notification(session_id: str, notification: dict) -> bool:
     """
-    向指定 session 的 GET SSE 长连接推送通知。
-    返回 True 表示推送成功，False 表示该 session 没有活跃的 SSE 连接。
+    向指定 session 的 GET SSE 长连接推送通知，长连接可以在任意节点上。
+    返回 True 表示推送成功，False 表示该 session 暂时没有活跃的 SSE 连接，
+    通知已暂存，等待客户端建立连接后补发。
     """
-    queue = _sse_queues.get(session_id)
-    if not queue:
-        logger.warning(f"No active SSE listener for session={session_id}, notification dropped")
-        return False
-    await queue.put(notification)
-    logger.info(f"Notification pushed to session={session_id}: method={notification.get('method')}")
-    return True
+    delivered = await get_notification_bus().publish(session_id, notification)
+    if delivered:
+        logger.info(f"Notification pushed to session={session_id}: method={notification.get('method')}")
+    else:
+        logger.warning(f"No active SSE listener for session={session_id}, notification stored as pending")
+    return delivered
 
 
 async def broadcast_notification(notification: dict) -> int:
     """
-    向所有活跃 session 的 SSE 连接广播通知。
-    返回成功推送的 session 数量。
+    向所有节点上活跃 session 的 SSE 连接广播通知。
+    返回接收到广播的节点数量。
     """
-    count = 0
-    for session_id, queue in list(_sse_queues.items()):
-        await queue.put(notification)
-        count += 1
-    logger.info(f"Notification broadcasted to {count} sessions: method={notification.get('method')}")
+    count = await get_notification_bus().broadcast(notification)
+    logger.info(f"Notification broadcasted to {count} nodes: method={notification.get('method')}")
     return count
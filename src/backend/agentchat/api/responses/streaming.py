@@ -1,12 +1,19 @@
+import anyio
+from functools import partial
 from loguru import logger
 from typing import Callable
-from starlette.types import Receive
+from starlette._utils import collapse_excgroups
+from starlette.requests import ClientDisconnect
+from starlette.types import Receive, Scope, Send
 from fastapi.responses import StreamingResponse
 
 
 class WatchedStreamingResponse(StreamingResponse):
     """
     重写 StreamingResponse类 保证流式输出的时候可随时暂停
+
+    客户端断开时调用 callback 并取消正在执行的流式输出；ASGI spec 2.4 下 Starlette 不再监听 http.disconnect，
+    只有写入失败时才能发现断开，模型思考或工具执行期间没有输出，请求会一直执行下去，所以这里始终监听断开事件
     """
     def __init__(
         self,
@@ -30,4 +37,24 @@ class WatchedStreamingResponse(StreamingResponse):
                 if self.callback:
                     self.callback()
 
-                break
\ No newline at end of file
+                break
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        with collapse_excgroups():
+            async with anyio.create_task_group() as task_group:
+
+                async def wrap(func):
+                    await func()
+                    task_group.cancel_scope.cancel()
+
+                async def stream_response():
+                    try:
+                        await self.stream_response(send)
+                    except OSError:
+                        raise ClientDisconnect()
+
+                task_group.start_soon(wrap, stream_response)
+                await wrap(partial(self.listen_for_disconnect, receive))
+
+        if self.background is not None:
+            await self.background()
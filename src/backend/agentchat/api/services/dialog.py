@@ -7,6 +7,8 @@ from agentchat.database.dao.dialog import DialogDao
 from agentchat.database.dao.history import HistoryDao
 from agentchat.database.models.user import AdminUser
 from agentchat.prompts.completion import GENERATE_CHAT_SUMMARY
+from agentchat.services.dialog_summary import get_summary_scheduler
+from agentchat.utils.common import count_tokens_usage
 
 
 class DialogService:
@@ -81,27 +83,38 @@ class DialogService:
         dialog = await DialogDao.select_dialog_by_id(dialog_id)
         return dialog.summary
 
+    @classmethod
+    async def get_short_term_tokens(cls, dialog_id: str) -> int:
+        """上次总结之后的消息 token 总数，使用落库的 token_usage"""
+        dialog = await DialogDao.select_dialog_by_id(dialog_id)
+        messages = await HistoryDao.get_short_term_messages(dialog_id, dialog.summary_last_time)
+        return sum(cls._message_tokens(m) for m in messages)
+
+    @classmethod
+    def schedule_dialog_summary(cls, dialog_id: str, user_id: str, short_term_tokens: int) -> bool:
+        """
+        短期消息超过高水位时，交给后台调度器进行总结，不阻塞当前这一轮对话
+        """
+        try:
+            return get_summary_scheduler().maybe_schedule(dialog_id, user_id, short_term_tokens)
+        except Exception as err:
+            logger.error(f"Schedule dialog summary failed: {err}")
+            return False
+
+    @classmethod
+    def _message_tokens(cls, message) -> int:
+        return message.token_usage or count_tokens_usage(message.content)
+
     @classmethod
     async def update_dialog_summary(cls, dialog_id: str, user_id: str, cutoff_tokens: int=3000):
-        messages = await HistoryDao.select_history_from_time(
-            dialog_id=dialog_id,
-            k=10000
-        )
         dialog = await DialogDao.select_dialog_by_id(dialog_id)
 
         if dialog.user_id != user_id:
             raise ValueError(f"无权限访问 {dialog_id} 数据")
         current_summary = dialog.summary
-        summary_last_time = dialog.summary_last_time
 
-        if not messages:
-            return None
-        if summary_last_time:
-            incremental_messages = [
-                m for m in messages if m.create_time and m.create_time > summary_last_time
-            ]
-        else:
-            incremental_messages = messages
+        # 只加载上次总结之后的消息
+        incremental_messages = await HistoryDao.get_short_term_messages(dialog_id, dialog.summary_last_time)
 
         if not incremental_messages:
             return None
@@ -122,7 +135,7 @@ class DialogService:
         # 至少保留一对
         # 如果只有一对，并且 token 超过 cutoff → 不总结
         if len(pairs) == 1:
-            pair_tokens = sum((m.token_usage or len(m.content) // 4) for m in pairs[0])
+            pair_tokens = sum(cls._message_tokens(m) for m in pairs[0])
             if pair_tokens > cutoff_tokens:
                 return None
 
@@ -131,7 +144,7 @@ class DialogService:
         kept_pairs = []
 
         for pair in reversed(pairs):
-            pair_tokens = sum((m.token_usage or len(m.content) // 4) for m in pair)
+            pair_tokens = sum(cls._message_tokens(m) for m in pair)
 
             if total_tokens + pair_tokens > cutoff_tokens:
                 break
@@ -220,7 +233,7 @@ class DialogService:
         kept_pairs = []
 
         for pair in reversed(pairs):
-            pair_tokens = sum((m.token_usage or len(m.content) // 4) for m in pair)
+            pair_tokens = sum(cls._message_tokens(m) for m in pair)
 
             if total_tokens + pair_tokens > cutoff_tokens:
                 break
@@ -1,9 +1,10 @@
-from typing import List
+from typing import List, Dict
 from uuid import uuid4
 from langchain_core.messages import BaseMessage, AIMessage, HumanMessage
 
 from agentchat.database.dao.dialog import DialogDao
 from agentchat.database.dao.history import HistoryDao
+from agentchat.database.models.history import HistoryTable
 from agentchat.services.rag.es_client import client as es_client
 from agentchat.services.rag.vector_stores import milvus_client
 from agentchat.schemas.chunk import ChunkModel
@@ -119,17 +120,31 @@ class HistoryService:
 
 
     @classmethod
-    async def get_short_term_messages(cls, dialog_id, user_id: str):
-        """通过上次总结的时间来获取短期记忆, summary_last_time"""
+    async def get_short_term_history(cls, dialog_id, user_id: str) -> List[HistoryTable]:
+        """通过上次总结的时间来获取短期记忆的原始记录（包含 token_usage）"""
         db_dialog = await DialogDao.select_dialog_by_id(dialog_id)
         if db_dialog.user_id != user_id:
             raise ValueError(f"没有权限获取 {dialog_id} 的对话信息")
 
-        short_term_messages = await HistoryDao.get_short_term_messages(dialog_id, db_dialog.summary_last_time)
+        return await HistoryDao.get_short_term_messages(dialog_id, db_dialog.summary_last_time)
+
+    @classmethod
+    async def get_short_term_messages(cls, dialog_id, user_id: str):
+        """通过上次总结的时间来获取短期记忆, summary_last_time"""
+        short_term_messages = await cls.get_short_term_history(dialog_id, user_id)
+        return cls.convert_history_to_messages(short_term_messages)
+
+    @classmethod
+    def convert_history_to_messages(cls, histories: List[HistoryTable]) -> List[BaseMessage]:
         messages: List[BaseMessage] = []
-        for msg in short_term_messages:
+        for msg in histories:
             if msg.role == Assistant_Role:
                 messages.append(AIMessage(content=msg.content))
             elif msg.role == User_Role:
                 messages.append(HumanMessage(content=msg.content))
         return messages
+
+    @classmethod
+    async def update_token_usages(cls, token_usages: Dict[str, int]):
+        """回填历史消息的 token 数量，之后的对话不需要重新计算"""
+        await HistoryDao.update_token_usages(token_usages)
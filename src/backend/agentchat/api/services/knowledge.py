@@ -3,6 +3,7 @@ from typing import List
 from agentchat.database.dao.knowledge import KnowledgeDao
 from agentchat.database.dao.knowledge_file import KnowledgeFileDao
 from agentchat.database.models.user import AdminUser
+from agentchat.services.mars.autobuild_catalog import invalidate_auto_build_catalog
 from agentchat.utils.file_utils import format_file_size
 
 
@@ -12,6 +13,7 @@ class KnowledgeService:
     async def create_knowledge(cls, knowledge_name, knowledge_desc, user_id):
         try:
             await KnowledgeDao.create_knowledge(knowledge_name, knowledge_desc, user_id)
+            invalidate_auto_build_catalog(user_id)
         except Exception as err:
             raise ValueError(f'Create Knowledge Error: {err}')
 
@@ -49,6 +51,7 @@ class KnowledgeService:
     async def delete_knowledge(cls, knowledge_id):
         try:
             await KnowledgeDao.delete_knowledge_by_id(knowledge_id)
+            invalidate_auto_build_catalog()
         except Exception as err:
             raise ValueError(f'Delete Knowledge By ID Error: {err}')
 
@@ -62,6 +65,7 @@ class KnowledgeService:
     async def update_knowledge(cls, knowledge_id, knowledge_name, knowledge_desc):
         try:
             await KnowledgeDao.update_knowledge_by_id(knowledge_id, knowledge_desc, knowledge_name)
+            invalidate_auto_build_catalog()
         except Exception as err:
             raise ValueError(f'Update Knowledge Error: {err}')
 
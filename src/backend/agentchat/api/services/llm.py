@@ -1,6 +1,7 @@
 from loguru import logger
 from agentchat.database.dao.llm import LLMDao
 from agentchat.database.models.user import AdminUser, SystemUser
+from agentchat.services.mars.autobuild_catalog import invalidate_auto_build_catalog
 
 LLM_Types = ['LLM', 'Embedding', 'Reranker']
 
@@ -10,10 +11,12 @@ class LLMService:
     @classmethod
     async def create_llm(cls, **kwargs):
         await LLMDao.create_llm(**kwargs)
+        invalidate_auto_build_catalog(kwargs.get("user_id"))
 
     @classmethod
     async def delete_llm(cls, llm_id: str):
         await LLMDao.delete_llm(llm_id)
+        invalidate_auto_build_catalog()
 
     @classmethod
     async def verify_user_permission(cls, llm_id: str, user_id: str):
@@ -29,6 +32,7 @@ class LLMService:
     @classmethod
     async def update_llm(cls, **kwargs):
         await LLMDao.update_llm(**kwargs)
+        invalidate_auto_build_catalog()
 
     @staticmethod
     def _group_by_type(llms: list, hide_api_key: bool = False):
@@ -95,7 +99,9 @@ class LLMService:
         api_key: str,
         base_url: str
     ):
-        return await LLMDao.update_first_llm(llm_id, model, provider, api_key, base_url)
+        result = await LLMDao.update_first_llm(llm_id, model, provider, api_key, base_url)
+        invalidate_auto_build_catalog()
+        return result
 
     @classmethod
     async def get_llm_type(cls):
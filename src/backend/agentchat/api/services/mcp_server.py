@@ -9,6 +9,7 @@ from agentchat.database.dao.mcp_server import MCPServerDao
 from agentchat.database.models.user import AdminUser, SystemUser
 from agentchat.prompts.mcp import McpAsToolPrompt
 from agentchat.schemas.mcp import MCPResponseFormat
+from agentchat.services.mars.autobuild_catalog import invalidate_auto_build_catalog
 from agentchat.services.mcp.manager import MCPManager
 from agentchat.utils.convert import convert_mcp_config
 from agentchat.api.services.user import UserService
@@ -34,7 +35,7 @@ class MCPService:
         imported_config: dict = None,
         config_enabled: bool = False,
     ):
-        return await MCPServerDao.create_mcp_server(
+        result = await MCPServerDao.create_mcp_server(
             url=url,
             type=type,
             config=config,
@@ -49,6 +50,8 @@ class MCPService:
             logo_url=logo_url,
             imported_config=imported_config
         )
+        invalidate_auto_build_catalog(user_id)
+        return result
 
     @classmethod
     async def get_mcp_server_from_id(cls, mcp_server_id):
@@ -61,10 +64,12 @@ class MCPService:
         if not update_data:
             return
 
-        return await MCPServerDao.update_mcp_server(
+        result = await MCPServerDao.update_mcp_server(
             mcp_server_id=server_id,
             update_data=update_data
         )
+        invalidate_auto_build_catalog()
+        return result
 
     @classmethod
     async def get_server_from_tool_name(cls, tool_name):
@@ -73,7 +78,9 @@ class MCPService:
 
     @classmethod
     async def delete_server_from_id(cls, mcp_server_id):
-        return await MCPServerDao.delete_mcp_server(mcp_server_id)
+        result = await MCPServerDao.delete_mcp_server(mcp_server_id)
+        invalidate_auto_build_catalog()
+        return result
 
     @classmethod
     async def verify_user_permission(cls, server_id, user_id, action: str="update"):
@@ -94,8 +101,11 @@ class MCPService:
             admin_servers = await MCPServerDao.get_mcp_servers_from_user(SystemUser)
             all_servers = personal_servers + admin_servers
         all_servers = [server.to_dict() for server in all_servers]
+        # 一次批量读取所有 Server 的用户配置，避免 N+1 查询
+        user_configs = await MCPUserConfigService.show_mcp_user_configs(
+            user_id, [server["mcp_server_id"] for server in all_servers])
         for server in all_servers:
-            user_config = await MCPUserConfigService.show_mcp_user_config(user_id, server["mcp_server_id"])
+            user_config = user_configs.get(server["mcp_server_id"], {})
             if user_config.get("config"):
                 server["config"] = user_config.get("config")
         return all_servers
@@ -1,6 +1,29 @@
-from typing import Optional, List
+import asyncio
+from loguru import logger
+from typing import Optional, List, Dict
+from cachetools import TTLCache
+
 from agentchat.database.dao.mcp_user_config import MCPUserConfigDao
 from agentchat.database.models.user import AdminUser, SystemUser
+from agentchat.services.redis import redis_client
+from agentchat.settings import app_settings
+
+MCP_USER_CONFIG_CACHE_KEY = "mcp_user_config:{}:{}"
+
+# (user_id, mcp_server_id) -> 配置记录（to_dict），没有配置时为 {}；首次使用时创建，保证读取到的是已加载的配置
+_local_cache: Optional[TTLCache] = None
+
+
+def _get_local_cache() -> TTLCache:
+    global _local_cache
+    if _local_cache is None:
+        _local_cache = TTLCache(maxsize=4096, ttl=app_settings.tool_call.get("user_config_local_ttl", 10))
+    return _local_cache
+
+
+def _to_mcp_config(user_config: dict) -> dict:
+    """将配置记录转换为工具调用时追加的参数"""
+    return {res["key"]: res["value"] for res in user_config.get("config") or []}
 
 
 class MCPUserConfigService:
@@ -14,7 +37,9 @@ class MCPUserConfigService:
         :return: 创建的MCP用户配置记录
         """
         try:
-            return await MCPUserConfigDao.create_mcp_user_config(mcp_server_id, user_id, config)
+            result = await MCPUserConfigDao.create_mcp_user_config(mcp_server_id, user_id, config)
+            cls.invalidate_mcp_user_config(user_id, mcp_server_id)
+            return result
         except Exception as err:
             raise ValueError(f"Create MCP User Config Error: {err}")
 
@@ -42,12 +67,14 @@ class MCPUserConfigService:
         :return: None
         """
         try:
-            user_config = await cls.show_mcp_user_config(user_id, mcp_server_id)
-            if not user_config.get("config"):
+            # 直接读取数据库，避免使用缓存中的旧数据判断
+            user_config = await MCPUserConfigDao.get_mcp_user_configs(user_id, mcp_server_id)
+            if not user_config or not user_config.config:
                 # 创建一条记录
                 await cls.create_mcp_user_config(mcp_server_id, user_id, config)
             else:
                 await MCPUserConfigDao.update_mcp_user_config(mcp_server_id, user_id, config)
+                cls.invalidate_mcp_user_config(user_id, mcp_server_id)
         except Exception as err:
             raise ValueError(f"Update MCP User Config Error: {err}")
 
@@ -59,7 +86,11 @@ class MCPUserConfigService:
         :return: None
         """
         try:
-            return await MCPUserConfigDao.delete_mcp_user_config(config_id)
+            user_config = await MCPUserConfigDao.get_mcp_user_config_from_id(config_id)
+            result = await MCPUserConfigDao.delete_mcp_user_config(config_id)
+            if user_config:
+                cls.invalidate_mcp_user_config(user_config.user_id, user_config.mcp_server_id)
+            return result
         except Exception as err:
             raise ValueError(f"Delete MCP User Config Error: {err}")
 
@@ -73,23 +104,105 @@ class MCPUserConfigService:
         """
         # 针对Agent对话时使用
         try:
-            result = await MCPUserConfigDao.get_mcp_user_configs(user_id, mcp_server_id)
-            mcp_config = {}
+            user_config = await cls.show_mcp_user_config(user_id, mcp_server_id)
             # 确认用户配置信息
-            if result:
-                for res in result.config:
-                    mcp_config[res["key"]] = res["value"]
-            return mcp_config
+            return _to_mcp_config(user_config)
         except Exception as err:
             raise ValueError(f"Get MCP User Configs Error: {err}")
 
+    @classmethod
+    async def get_mcp_user_configs(cls, user_id: str, mcp_server_ids: List[str]) -> Dict[str, dict]:
+        """
+        批量获取用户在多个MCP Server上的配置，返回 mcp_server_id -> 工具调用参数
+        """
+        user_configs = await cls.show_mcp_user_configs(user_id, mcp_server_ids)
+        return {mcp_server_id: _to_mcp_config(user_config) for mcp_server_id, user_config in user_configs.items()}
+
     @classmethod
     async def show_mcp_user_config(cls, user_id: str, mcp_server_id: str):
         try:
-            result = await MCPUserConfigDao.get_mcp_user_configs(user_id, mcp_server_id)
-            if result:
-                return result.to_dict()
+            user_configs = await cls.show_mcp_user_configs(user_id, [mcp_server_id])
+            return user_configs[mcp_server_id]
+        except Exception as err:
+            raise ValueError(f"Get MCP User Configs Error: {err}")
+
+    @classmethod
+    async def show_mcp_user_configs(cls, user_id: str, mcp_server_ids: List[str]) -> Dict[str, dict]:
+        """
+        批量获取配置记录，依次读取本地缓存、Redis 共享缓存，剩余的一次查询数据库
+        没有配置的 MCP Server 返回 {}
+        """
+        local_cache = _get_local_cache()
+        results: Dict[str, dict] = {}
+        missing_ids = []
+        for mcp_server_id in dict.fromkeys(mcp_server_ids):
+            if (user_id, mcp_server_id) in local_cache:
+                results[mcp_server_id] = local_cache[(user_id, mcp_server_id)]
             else:
-                return {}
+                missing_ids.append(mcp_server_id)
+
+        if missing_ids:
+            keys = [MCP_USER_CONFIG_CACHE_KEY.format(user_id, mcp_server_id) for mcp_server_id in missing_ids]
+            try:
+                cached_values = redis_client.mget(keys)
+            except Exception as err:
+                logger.warning(f"Read MCP user config cache error: {err}")
+                cached_values = [None] * len(keys)
+
+            db_ids = []
+            for mcp_server_id, value in zip(missing_ids, cached_values):
+                if value is None:
+                    db_ids.append(mcp_server_id)
+                else:
+                    results[mcp_server_id] = value
+                    local_cache[(user_id, mcp_server_id)] = value
+
+            if db_ids:
+                records = await MCPUserConfigDao.get_mcp_user_configs_by_servers(user_id, db_ids)
+                db_results = {mcp_server_id: {} for mcp_server_id in db_ids}
+                for record in records:
+                    db_results[record.mcp_server_id] = record.to_dict()
+                for mcp_server_id, value in db_results.items():
+                    results[mcp_server_id] = value
+                    local_cache[(user_id, mcp_server_id)] = value
+                try:
+                    redis_client.mset(
+                        {MCP_USER_CONFIG_CACHE_KEY.format(user_id, mcp_server_id): value
+                         for mcp_server_id, value in db_results.items()},
+                        expiration=app_settings.tool_call.get("user_config_cache_ttl", 60)
+                    )
+                except Exception as err:
+                    logger.warning(f"Write MCP user config cache error: {err}")
+
+        return {mcp_server_id: dict(results[mcp_server_id]) for mcp_server_id in mcp_server_ids}
+
+    @classmethod
+    def invalidate_mcp_user_config(cls, user_id: str, mcp_server_id: str):
+        """配置变更后清除缓存，其他进程的本地缓存在 user_config_local_ttl 内过期"""
+        _get_local_cache().pop((user_id, mcp_server_id), None)
+        try:
+            redis_client.delete(MCP_USER_CONFIG_CACHE_KEY.format(user_id, mcp_server_id))
         except Exception as err:
-            raise ValueError(f"Get MCP User Configs Error: {err}")
\ No newline at end of file
+            logger.warning(f"Invalidate MCP user config cache error: {err}")
+
+
+class MCPUserConfigCache:
+    """
+    一轮对话内的用户配置缓存，同一个 MCP Server 的配置只加载一次
+    首次读取时批量加载构造时传入的全部 MCP Server 配置
+    """
+
+    def __init__(self, user_id: str, mcp_server_ids: Optional[List[str]] = None):
+        self.user_id = user_id
+        self.mcp_server_ids = list(mcp_server_ids or [])
+        self._configs: Dict[str, dict] = {}
+        self._lock = asyncio.Lock()
+
+    async def get(self, mcp_server_id: str) -> dict:
+        if mcp_server_id not in self._configs:
+            async with self._lock:
+                if mcp_server_id not in self._configs:
+                    server_ids = [server_id for server_id in self.mcp_server_ids + [mcp_server_id]
+                                  if server_id and server_id not in self._configs]
+                    self._configs.update(await MCPUserConfigService.get_mcp_user_configs(self.user_id, server_ids))
+        return dict(self._configs.get(mcp_server_id, {}))
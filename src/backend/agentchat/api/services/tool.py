@@ -4,6 +4,7 @@ from typing import List, Union
 from agentchat.database import SystemUser, ToolTable
 from agentchat.database.models.user import AdminUser
 from agentchat.database.dao.tool import ToolDao
+from agentchat.services.mars.autobuild_catalog import invalidate_auto_build_catalog
 
 
 class ToolService:
@@ -14,6 +15,7 @@ class ToolService:
         default_tool: ToolTable
     ):
         result = await ToolDao.create_default_tool(default_tool)
+        invalidate_auto_build_catalog()
         return result
 
     @classmethod
@@ -22,6 +24,7 @@ class ToolService:
         tool: ToolTable
     ):
         result = await ToolDao.create_user_defined_tool(tool)
+        invalidate_auto_build_catalog(tool.user_id)
         return result
 
     @classmethod
@@ -30,6 +33,7 @@ class ToolService:
         tool_id: str
     ):
         await ToolDao.delete_user_defined_tool(tool_id=tool_id)
+        invalidate_auto_build_catalog()
 
     @classmethod
     async def verify_user_permission(
@@ -159,4 +163,5 @@ class ToolService:
 
     @classmethod
     async def update_user_defined_tool(cls, tool_id, update_values):
-        await ToolDao.update_user_defined_tool(tool_id, update_values)
\ No newline at end of file
+        await ToolDao.update_user_defined_tool(tool_id, update_values)
+        invalidate_auto_build_catalog()
\ No newline at end of file
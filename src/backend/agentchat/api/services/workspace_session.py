@@ -2,6 +2,7 @@ from typing import List
 
 from agentchat.database.dao.workspace_session import WorkSpaceSession, WorkSpaceSessionDao
 from agentchat.database.models.workspace_session import WorkSpaceSessionCreate
+from agentchat.settings import app_settings
 
 
 class WorkSpaceSessionService:
@@ -15,7 +16,16 @@ class WorkSpaceSessionService:
     async def get_workspace_sessions(cls, user_id):
         results = await WorkSpaceSessionDao.get_workspace_sessions(user_id)
         results.sort(key=lambda x: x.update_time, reverse=True)
-        return [result.to_dict() for result in results]
+
+        # 一次查询取出所有会话的上下文，未迁移的旧数据仍在 contexts 列中
+        sessions_contexts = await WorkSpaceSessionDao.get_workspace_sessions_contexts(
+            [result.session_id for result in results])
+        sessions = []
+        for result in results:
+            session = result.to_dict()
+            session["contexts"] = (result.contexts or []) + sessions_contexts.get(result.session_id, [])
+            sessions.append(session)
+        return sessions
 
     @classmethod
     async def delete_workspace_session(cls, session_ids, user_id):
@@ -30,12 +40,37 @@ class WorkSpaceSessionService:
         return await WorkSpaceSessionDao.clear_workspace_session_contexts(session_id)
 
     @classmethod
-    async def get_workspace_session_from_id(cls, session_id, user_id):
+    async def get_workspace_session_from_id(cls, session_id, user_id, include_contexts: bool = True):
+        """
+        获取会话信息，include_contexts 为 False 时不读取上下文，
+        仅判断会话是否存在或者读取标题时使用
+        """
         result = await WorkSpaceSessionDao.get_workspace_session_from_id(session_id)
         if result is None:
             return None
-        return result.to_dict()
+
+        session = result.to_dict()
+        if include_contexts:
+            session["contexts"] = await WorkSpaceSessionDao.get_workspace_session_contexts(session_id)
+        else:
+            session.pop("contexts", None)
+        return session
+
+    @classmethod
+    async def get_workspace_session_contexts(cls, session_id, page: int = 1, limit: int = 20):
+        """分页读取会话上下文，按轮次从旧到新排列"""
+        page = max(page, 1)
+        contexts = await WorkSpaceSessionDao.get_workspace_session_contexts(
+            session_id, offset=(page - 1) * limit, limit=limit)
+        total = await WorkSpaceSessionDao.count_workspace_session_contexts(session_id)
+        return {"contexts": contexts, "total": total, "page": page, "limit": limit}
+
+    @classmethod
+    async def get_recent_workspace_session_contexts(cls, session_id, limit: int = None):
+        """读取最近若干轮上下文，用于构建对话历史，避免加载整个会话"""
+        limit = limit or app_settings.workspace.get("recent_contexts", 10)
+        return await WorkSpaceSessionDao.get_recent_workspace_session_contexts(session_id, limit)
 
     @classmethod
     async def generate_session_title(cls, user_query):
-        pass
\ No newline at end of file
+        pass
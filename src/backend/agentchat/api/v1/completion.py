@@ -1,9 +1,10 @@
 import json
-from typing import List, Callable
+import asyncio
+from loguru import logger
 from fastapi import APIRouter, Depends
-from langchain_core.messages import HumanMessage, SystemMessage, BaseMessage
 
 from agentchat.core.agents.general_agent import GeneralAgent, AgentConfig
+from agentchat.core.context_budget import PromptBudgeter
 from agentchat.api.services.history import HistoryService
 from agentchat.api.services.dialog import DialogService
 from agentchat.api.responses.streaming import WatchedStreamingResponse
@@ -11,12 +12,16 @@ from agentchat.api.services.user import UserPayload, get_login_user
 from agentchat.prompts.completion import SYSTEM_PROMPT
 from agentchat.schemas.completion import CompletionReq
 from agentchat.services.memory.client import memory_client
+from agentchat.settings import app_settings
 from agentchat.utils.common import count_tokens_usage
 from agentchat.utils.contexts import set_user_id_context, set_agent_name_context
-from agentchat.utils.helpers import build_completion_system_prompt, build_completion_user_input
+from agentchat.utils.helpers import build_completion_user_input
 
 router = APIRouter(tags=["Completion"])
 
+# 客户端断开后在后台保存回答的任务，保留引用避免被回收
+_persist_tasks: set[asyncio.Task] = set()
+
 @router.post("/completion", description="对话接口")
 async def completion(
     *,
@@ -50,7 +55,7 @@ async def completion(
     # Prompt 构建
     system_prompt = agent_config.system_prompt.strip() or SYSTEM_PROMPT
 
-    short_history = await HistoryService.get_short_term_messages(
+    short_history = await HistoryService.get_short_term_history(
         req.dialog_id, login_user.user_id
     )
     history_summary = await DialogService.get_dialog_history_summary(req.dialog_id)
@@ -65,23 +70,61 @@ async def completion(
             m.get("memory", "") for m in memories.get("results", [])
         )
 
-    system_prompt = build_completion_system_prompt(
-        system_prompt,
-        history_summary,
-        long_memory
+    # 按模型的上下文预算裁剪历史消息
+    budgeter = PromptBudgeter(getattr(chat_agent.conversation_model, "model_name", None))
+    messages, _ = await budgeter.build_messages(
+        system_prompt=system_prompt,
+        history_summary=history_summary,
+        long_memory=long_memory,
+        histories=short_history,
+        user_input=user_input,
     )
-
-    messages: List[BaseMessage] = [
-        SystemMessage(content=system_prompt),
-        *short_history,
-        HumanMessage(content=user_input),
-    ]
+    short_term_tokens = sum(history.token_usage for history in short_history)
 
     # 事件 & 流式响应
     events: list = []
 
+    async def save_response(response_content: str, completed: bool):
+        """
+        保存 AI 回答；客户端中途断开时按 completion.disconnect_persist 处理：
+            none: 不保存回答；partial: 只保存已生成的部分回答，不提取记忆、不触发总结；full: 与正常结束相同
+        """
+        policy = app_settings.completion.get("disconnect_persist", "partial")
+        if not completed and policy == "none":
+            logger.info(f"Client disconnected, discard partial response of dialog {req.dialog_id}")
+            return
+        full = completed or policy == "full"
+
+        if agent_config.enable_memory and full:
+            await memory_client.add(
+                messages=[
+                    {"role": "user", "content": raw_input},
+                    {"role": "assistant", "content": response_content}
+                ],
+                run_id=req.dialog_id
+            )
+
+        response_tokens = count_tokens_usage(response_content)
+        await HistoryService.save_chat_history(
+            role="assistant",
+            content=response_content,
+            events=events,
+            dialog_id=req.dialog_id,
+            token_usage=response_tokens,
+            memory_enable=agent_config.enable_memory
+        )
+
+        if full:
+            # 超过高水位时在后台总结，不占用本轮对话的时间
+            DialogService.schedule_dialog_summary(
+                dialog_id=req.dialog_id,
+                user_id=login_user.user_id,
+                short_term_tokens=short_term_tokens + input_tokens + response_tokens,
+            )
+
     async def stream():
         response_content = " "
+        completed = False
         try:
             async for event in chat_agent.astream(messages):
 
@@ -93,37 +136,24 @@ async def completion(
 
                 yield f"data: {json.dumps(event)}\n\n"
 
+            completed = not chat_agent.stop_streaming
         finally:
-            if agent_config.enable_memory:
-                await memory_client.add(
-                    messages=[
-                        {"role": "user", "content": raw_input},
-                        {"role": "assistant", "content": response_content}
-                    ],
-                    run_id=req.dialog_id
-                )
-
-            await HistoryService.save_chat_history(
-                role="assistant",
-                content=response_content,
-                events=events,
-                dialog_id=req.dialog_id,
-                token_usage=count_tokens_usage(response_content),
-                memory_enable=agent_config.enable_memory
-            )
-
-            await DialogService.update_dialog_summary(
-                dialog_id=req.dialog_id,
-                user_id=login_user.user_id,
-            )
+            if completed:
+                await save_response(response_content, completed)
+            else:
+                # 客户端断开时当前请求已被取消，在后台任务中保存
+                task = asyncio.create_task(save_response(response_content, completed))
+                _persist_tasks.add(task)
+                task.add_done_callback(_persist_tasks.discard)
 
     # 用户消息先落库
+    input_tokens = count_tokens_usage(raw_input)
     await HistoryService.save_chat_history(
         role="user",
         content=raw_input,
         events=events,
         dialog_id=req.dialog_id,
-        token_usage=count_tokens_usage(raw_input),
+        token_usage=input_tokens,
         memory_enable=agent_config.enable_memory
     )
 
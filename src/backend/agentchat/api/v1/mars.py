@@ -1,14 +1,14 @@
+import asyncio
 from typing import List
 
 from fastapi import FastAPI, APIRouter, Body, Depends
 from langchain_core.messages import SystemMessage, HumanMessage, BaseMessage
-from starlette.responses import StreamingResponse
 
+from agentchat.api.responses.streaming import WatchedStreamingResponse
 from agentchat.api.services.user import UserPayload, get_login_user
 from agentchat.prompts.mars import Mars_System_Prompt
 from agentchat.schemas.usage_stats import UsageStatsAgentType
 from agentchat.services.mars.mars_agent import MarsAgent, MarsConfig
-from agentchat.services.mars.mars_tools.autobuild import construct_auto_build_prompt
 from agentchat.services.memory.client import memory_client
 from agentchat.utils.contexts import set_user_id_context, set_agent_name_context
 
@@ -30,9 +30,11 @@ async def chat_mars(user_input: str = Body(..., description="用户输入", embe
     mars_config = MarsConfig(user_id=login_user.user_id)
     mars_agent = MarsAgent(mars_config)
 
-    await mars_agent.init_mars_agent()
-
-    memory_messages = await memory_client.search(query=user_input, user_id=login_user.user_id)
+    # Agent 初始化与记忆检索互不依赖，并行执行
+    _, memory_messages = await asyncio.gather(
+        mars_agent.init_mars_agent(),
+        memory_client.search(query=user_input, user_id=login_user.user_id)
+    )
     memory_content = str([f"- {msg.get('memory', '')} \n" for msg in memory_messages.get('results', [])])
 
     messages: List[BaseMessage] = [
@@ -52,7 +54,11 @@ async def chat_mars(user_input: str = Body(..., description="用户输入", embe
             messages=[{"role": "user", "content": user_input}, {"role": "assistant", "content": final_response}]
         )
 
-    return StreamingResponse(general_generate(), media_type="text/event-stream")
+    return WatchedStreamingResponse(
+        general_generate(),
+        callback=mars_agent.stop_streaming,
+        media_type="text/event-stream"
+    )
 
 @router.post("/mars/example")
 async def chat_mars_example(
@@ -87,4 +93,8 @@ async def chat_mars_example(
         async for chunk in mars_agent.ainvoke_stream(messages):
             yield f"data: {chunk}\n\n"
 
-    return StreamingResponse(general_generate(), media_type="text/event-stream")
+    return WatchedStreamingResponse(
+        general_generate(),
+        callback=mars_agent.stop_streaming,
+        media_type="text/event-stream"
+    )
@@ -1,10 +1,10 @@
 from loguru import logger
 from urllib.parse import urljoin
-from fastapi import APIRouter, UploadFile, File, Depends
+from fastapi import APIRouter, UploadFile, File, Depends, Body
 
 from agentchat.api.services.user import UserPayload, get_login_user
 from agentchat.api.responses.builder import UnifiedResponseModel, resp_200, resp_500
-from agentchat.services.storage import storage_client
+from agentchat.services.storage import async_storage_client
 from agentchat.settings import app_settings
 from agentchat.utils.file_utils import get_object_storage_base_path
 
@@ -17,15 +17,42 @@ async def upload_file(
     login_user: UserPayload = Depends(get_login_user)
 ):
     try:
-        file_content = await file.read()
-
         oss_object_name = get_object_storage_base_path(file.filename)
         sign_url = urljoin(app_settings.storage.active.base_url, oss_object_name)
 
-        storage_client.sign_url_for_get(sign_url)
-        storage_client.upload_file(oss_object_name, file_content)
+        # 直接从临时文件流式上传，大文件分片上传，不阻塞事件循环
+        await async_storage_client.upload_fileobj(
+            oss_object_name,
+            file.file,
+            length=file.size if file.size is not None else -1,
+            content_type=file.content_type
+        )
 
         return resp_200(sign_url)
     except Exception as err:
         logger.error(f"上传文件{file.filename}出错：{err}")
-        return resp_500(message=str(err))
\ No newline at end of file
+        return resp_500(message=str(err))
+
+
+@router.post("/upload/presign", description="获取直传到对象存储的预签名链接", response_model=UnifiedResponseModel)
+async def presign_upload_file(
+    *,
+    file_name: str = Body(..., embed=True, description="要上传的文件名称"),
+    login_user: UserPayload = Depends(get_login_user)
+):
+    """
+    客户端使用返回的 upload_url 直接 PUT 文件到存储桶，上传完成后使用 file_url 调用后续接口，
+    大文件不再经过 API 服务
+    """
+    try:
+        oss_object_name = get_object_storage_base_path(file_name)
+        upload_url = await async_storage_client.sign_url_for_put(oss_object_name)
+
+        return resp_200(data={
+            "upload_url": upload_url,
+            "file_url": urljoin(app_settings.storage.active.base_url, oss_object_name),
+            "expiration": app_settings.storage.presign_expiration
+        })
+    except Exception as err:
+        logger.error(f"生成文件{file_name}的上传链接出错：{err}")
+        return resp_500(message=str(err))
@@ -106,12 +106,11 @@ async def handle_wechat_message(request: Request):
     if value := redis_client.get(f"{from_user}:{content}"):
         model_reply = value.get("content")
     else:
-        workspace_session = await WorkSpaceSessionService.get_workspace_session_from_id(from_user, from_user)
-        if workspace_session:
-            contexts = workspace_session.get("contexts", [])
+        contexts = await WorkSpaceSessionService.get_recent_workspace_session_contexts(from_user, 2)
+        if contexts:
             history_messages = "\n".join(
                 [f"user query: {message.get("query")}, answer: {message.get("answer")}\n" for message in
-                 reversed(contexts[-2:])])
+                 reversed(contexts)])
         else:
             history_messages = "无历史对话"
 
@@ -45,6 +45,23 @@ async def workspace_session_info(session_id: str,
     except Exception as err:
         raise HTTPException(status_code=500, detail=str(err))
 
+@router.get("/session/{session_id}/contexts", summary="分页获取工作台会话的上下文")
+async def workspace_session_contexts(session_id: str,
+                                     page: int = 1,
+                                     limit: int = 20,
+                                     login_user: UserPayload = Depends(get_login_user)):
+    try:
+        session = await WorkSpaceSessionService.get_workspace_session_from_id(session_id, login_user.user_id, include_contexts=False)
+        if session is None or session.get("user_id") != login_user.user_id:
+            raise HTTPException(status_code=404, detail="会话不存在")
+
+        result = await WorkSpaceSessionService.get_workspace_session_contexts(session_id, page, limit)
+        return resp_200(data=result)
+    except HTTPException:
+        raise
+    except Exception as err:
+        raise HTTPException(status_code=500, detail=str(err))
+
 @router.delete("/session", summary="删除工作台的会话")
 async def create_workspace_session(session_id: str,
                                    login_user: UserPayload = Depends(get_login_user)):
@@ -83,9 +100,9 @@ async def workspace_simple_chat(simple_task: WorkSpaceSimpleTask,
         session_id=simple_task.session_id
     )
 
-    workspace_session = await WorkSpaceSessionService.get_workspace_session_from_id(simple_task.session_id, login_user.user_id)
-    if workspace_session:
-        contexts = workspace_session.get("contexts", [])
+    # 只读取最近若干轮的上下文构建历史，避免长会话每轮都加载全部上下文
+    contexts = await WorkSpaceSessionService.get_recent_workspace_session_contexts(simple_task.session_id)
+    if contexts:
         history_messages = [f"query: {message.get("query")}, answer: {message.get("answer")}\n" for message in contexts]
     else:
         history_messages = "无历史对话"
@@ -3,10 +3,11 @@ import time
 import asyncio
 from loguru import logger
 from pydantic import BaseModel
-from typing import List, Dict, Any, AsyncGenerator, Callable, NotRequired
+from typing import List, Dict, Any, AsyncGenerator, Callable, NotRequired, Optional, Annotated
 from langgraph.runtime import Runtime
 from langgraph.types import Command
-from langchain_core.tools import BaseTool, tool, StructuredTool
+from langchain_core.tools import BaseTool, tool, StructuredTool, InjectedToolCallId
+from langgraph.prebuilt import InjectedState
 from langchain.tools.tool_node import ToolCallRequest
 from langchain.agents import create_agent, AgentState
 from langgraph.config import get_stream_writer
@@ -25,6 +26,8 @@ from agentchat.services.rag.handler import RagHandler
 from agentchat.core.agents.mcp_agent import MCPAgent, MCPConfig
 from agentchat.api.services.mcp_server import MCPService
 from agentchat.tools.openapi_tool.adapter import OpenAPIToolAdapter
+from agentchat.core.tool_index import ToolIndex, select_relevant_tools
+from agentchat.settings import app_settings
 
 
 class StreamAgentState(AgentState):
@@ -126,10 +129,14 @@ class GeneralAgent:
         self.middlewares = []
         self.skill_agent_as_tools = []
         self.tool_metadata_map: Dict[str, Dict[str, str]] = {}
+        # 工具数量超过阈值时才构建语义索引
+        self.tool_index: Optional[ToolIndex] = None
 
         # 流式事件队列
         self.event_queue = asyncio.Queue()
         self.stop_streaming = False
+        # 执行 Agent 的任务，客户端断开时取消
+        self.run_task: Optional[asyncio.Task] = None
 
     def wrap_event(self, data: Dict[Any, Any]):
         """发送流式事件"""
@@ -149,6 +156,7 @@ class GeneralAgent:
 
         await self.setup_knowledge_tool()
         await self.setup_language_model()
+        await self.setup_tool_index()
 
         self.search_tool = self.setup_search_tool()
         self.middlewares = await self.setup_agent_middleware()
@@ -177,11 +185,42 @@ class GeneralAgent:
         # 意图识别模型
         self.tool_invocation_model = ModelManager.get_tool_invocation_model()
 
+    @property
+    def bound_tools(self) -> List[BaseTool]:
+        return self.tools + self.mcp_agent_as_tools + self.skill_agent_as_tools
+
+    async def setup_tool_index(self):
+        """工具数量超过阈值后构建语义索引，每轮对话只向模型暴露最相关的工具"""
+        bound_tools = self.bound_tools
+        if len(bound_tools) < app_settings.tool_call.get("max_tools_size", MAX_TOOLS_SIZE):
+            return
+
+        try:
+            self.tool_index = await ToolIndex.get_or_build(bound_tools)
+        except Exception as err:
+            # 索引不可用时退化为绑定全部工具
+            logger.warning(f"Build tool index failed, fallback to bind all tools: {err}")
+            self.tool_index = None
+
+    async def select_available_tools(self, query: str) -> List[BaseTool]:
+        """本轮对话暴露给模型的工具，返回空列表表示使用全部工具"""
+        if self.tool_index is None or not query:
+            return []
+
+        try:
+            selected_tools = await select_relevant_tools(self.tool_index, self.bound_tools, query)
+        except Exception as err:
+            logger.warning(f"Select relevant tools failed, fallback to bind all tools: {err}")
+            return []
+        # 搜索工具始终可用，模型可以通过它找到未被选中的工具
+        return selected_tools + [self.search_tool]
+
     def setup_react_agent(self):
+        # 工具节点需要注册全部工具，模型每轮可见的工具由 available_tools 控制
+        tools = self.bound_tools + ([self.search_tool] if self.tool_index else [])
         return create_agent(
             model=self.conversation_model,
-            tools=self.tools + self.mcp_agent_as_tools + self.skill_agent_as_tools,
-            #tools=[self.search_tool] if len(self.tools + self.mcp_agent_as_tools) >= MAX_TOOLS_SIZE else self.tools + self.mcp_agent_as_tools,
+            tools=tools,
             middleware=self.middlewares,
             state_schema=StreamAgentState
         )
@@ -195,23 +234,25 @@ class GeneralAgent:
             2.一些工具在每次对话都能用到
         """
         @tool(parse_docstring=True)
-        def search_available_tools(query: str, tool_call_id):
+        async def search_available_tools(
+            query: str,
+            tool_call_id: Annotated[str, InjectedToolCallId],
+            state: Annotated[dict, InjectedState],
+        ):
             """
             搜索可用的工具，使用此工具查找是否包含相关的能力
 
             Args:
-                query (str): 执行任务的关键词，例如 'github'、'search'、'天气'
+                query (str): 执行任务的描述或关键词，例如 '查询 github 仓库'、'搜索'、'天气'
 
             Returns:
                 str: 返回本次任务可能能用到的接口
             """
-            found_tools = []
-            available_tools = self.tools + self.mcp_agent_as_tools
-            for tool in available_tools:
-                if tool.name == "search_available_tools":
-                    continue
-                if query.lower() in tool.name or query.lower() in tool.description:
-                    found_tools.append(tool)
+            if self.tool_index is not None:
+                found_tools = await select_relevant_tools(self.tool_index, self.bound_tools, query)
+            else:
+                found_tools = [tool for tool in self.bound_tools
+                               if query.lower() in tool.name or query.lower() in tool.description]
 
             if not found_tools:
                 content_str = "未找到相关工具。请尝试其他关键词。"
@@ -224,7 +265,12 @@ class GeneralAgent:
                 name="search_available_tools"
             )
 
-            return Command(update={"available_tools": found_tools, "messages": [tool_msg]})
+            # 在本轮已激活的工具基础上追加
+            available_tools = list(state.get("available_tools") or [])
+            activated_names = {tool.name for tool in available_tools}
+            available_tools.extend(tool for tool in found_tools if tool.name not in activated_names)
+
+            return Command(update={"available_tools": available_tools, "messages": [tool_msg]})
         return search_available_tools
 
 
@@ -364,15 +410,30 @@ class GeneralAgent:
             }
 
 
-    async def astream(self, messages: List[BaseMessage]) -> AsyncGenerator[Dict[str, Any], None]:
-        """流式调用主方法"""
-        response_content = ""
+    async def _run_react_agent(self, messages: List[BaseMessage], available_tools: List[BaseTool]):
+        """在独立的任务中执行 Agent，事件放入 event_queue；取消该任务会取消其中的模型调用、工具、MCP 子 Agent 和沙箱进程"""
         try:
             async for token, metadata in self.react_agent.astream(
-                    input={"messages": copy.deepcopy(messages), "model_call_count": 0, "user_id": self.agent_config.user_id},
+                    input={"messages": copy.deepcopy(messages), "model_call_count": 0,
+                           "user_id": self.agent_config.user_id, "available_tools": available_tools},
                     config={"callbacks": [usage_metadata_callback]},
                     stream_mode=["messages", "custom"],
             ):
+                self.event_queue.put_nowait((token, metadata))
+        finally:
+            self.event_queue.put_nowait(None)
+
+    async def astream(self, messages: List[BaseMessage]) -> AsyncGenerator[Dict[str, Any], None]:
+        """流式调用主方法"""
+        response_content = ""
+        try:
+            query = next((message.content for message in reversed(messages)
+                          if isinstance(message, HumanMessage) and isinstance(message.content, str)), "")
+            available_tools = await self.select_available_tools(query)
+
+            self.run_task = asyncio.create_task(self._run_react_agent(messages, available_tools))
+            while (item := await self.event_queue.get()) is not None:
+                token, metadata = item
                 if token == "custom":
                     yield self.wrap_event(metadata)
                 elif isinstance(metadata[0], AIMessageChunk) and metadata[0].content:
@@ -386,6 +447,12 @@ class GeneralAgent:
                         }
                     }
 
+            # 客户端已断开，Agent 任务已被取消
+            if self.stop_streaming:
+                return
+            # 抛出 Agent 执行过程中的异常
+            await self.run_task
+
         # 针对模型回复进行兜底操作，错误类型包括：敏感词，模型问题
         except Exception as err:
             logger.error(f"LLM Model Error: {err}")
@@ -397,9 +464,17 @@ class GeneralAgent:
                     "accumulated": response_content
                 }
             }
+        finally:
+            # 消费方提前退出（例如请求被取消）时，不再让 Agent 在后台继续执行
+            if self.run_task is not None and not self.run_task.done():
+                self.run_task.cancel()
 
     def stop_streaming_callback(self):
+        """客户端断开连接时的回调，取消正在执行的 Agent 任务树"""
         self.stop_streaming = True
+        if self.run_task is not None and not self.run_task.done():
+            logger.info("Client disconnected, cancel running agent")
+            self.run_task.cancel()
 
     def get_tool_display_name(self, tool_name: str):
         """
@@ -8,7 +8,7 @@ from langgraph.prebuilt.tool_node import ToolCallRequest
 from langchain_core.messages import BaseMessage, SystemMessage, HumanMessage
 from langchain.agents.middleware import AgentState, wrap_tool_call, before_agent
 
-from agentchat.api.services.mcp_user_config import MCPUserConfigService
+from agentchat.api.services.mcp_user_config import MCPUserConfigCache
 from agentchat.core.models.manager import ModelManager
 from agentchat.prompts.completion import CALL_END_PROMPT
 from agentchat.services.mcp.manager import MCPManager
@@ -30,6 +30,8 @@ class MCPAgent:
 
         self.user_id = user_id
         self.mcp_tools: List[BaseTool] = []
+        # 用户配置在本轮对话中只加载一次
+        self.mcp_user_configs = MCPUserConfigCache(user_id, [mcp_config.mcp_server_id])
 
         self.conversation_model = None
         self.tool_invocation_model = None
@@ -78,7 +80,7 @@ class MCPAgent:
             )
 
             # 针对鉴权的MCP Server需要用户的单独配置，例如飞书、邮箱
-            mcp_config = await MCPUserConfigService.get_mcp_user_config(self.user_id, self.mcp_config.mcp_server_id)
+            mcp_config = await self.mcp_user_configs.get(self.mcp_config.mcp_server_id)
             request.tool_call["args"].update(mcp_config)
 
             tool_result = await handler(request)
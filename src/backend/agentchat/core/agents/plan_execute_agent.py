@@ -1,4 +1,3 @@
-import asyncio
 import json
 from typing import List
 from loguru import logger
@@ -6,8 +5,9 @@ from langchain_core.messages import BaseMessage, HumanMessage, SystemMessage, AI
 from langchain_core.tools import BaseTool
 
 from agentchat.api.services.mcp_server import MCPService
-from agentchat.api.services.mcp_user_config import MCPUserConfigService
+from agentchat.api.services.mcp_user_config import MCPUserConfigCache
 from agentchat.core.models.manager import ModelManager
+from agentchat.core.tool_executor import execute_tool_calls, run_sync_tool
 from agentchat.prompts.completion import FIX_JSON_PROMPT, PLAN_CALL_TOOL_PROMPT, SINGLE_PLAN_CALL_PROMPT
 from agentchat.schemas.completion import PlanToolFlow
 from agentchat.core.agents.structured_response_agent import StructuredResponseAgent
@@ -76,6 +76,8 @@ class PlanExecuteAgent:
         self.user_id = user_id
         self.mcp_ids = mcp_ids
         self.mcp_manager: MCPManager = None
+        # User configs of the MCP servers, loaded in one batch on the first MCP tool call
+        self.mcp_user_configs = MCPUserConfigCache(user_id, mcp_ids)
 
         self.mcp_tools = []
         self.conversation_model = ModelManager.get_conversation_model()
@@ -156,38 +158,31 @@ class PlanExecuteAgent:
         return tool_results
 
     async def _execute_tool(self, message: AIMessage):
-        """Tool execution - sub-agent responsible for specific tool execution"""
-        tool_calls = message.tool_calls
-        tool_messages: List[BaseMessage] = []
-
-        for tool_call in tool_calls:
-            is_mcp_tool, use_tool = self._find_tool_use(tool_call["name"])
-            tool_name = tool_call["name"]
-            tool_args = tool_call["args"]
-            tool_call_id = tool_call["id"]
-
-            try:
-                if hasattr(use_tool, "coroutine") and use_tool.coroutine is not None:
-                    # Determine if user personal configuration needs to be added
-                    if is_mcp_tool:
-                        personal_config = await MCPUserConfigService.get_mcp_user_config(self.user_id, self._get_mcp_id_by_tool(tool_name))
-                        tool_args.update(personal_config)
-
-                    tool_result, _ = await use_tool.coroutine(**tool_args)
-                else:
-                    # Convert to async
-                    tool_result = await asyncio.to_thread(use_tool.func, **tool_args)
-
-                tool_messages.append(
-                    ToolMessage(content=tool_result, name=tool_name, tool_call_id=tool_call_id))
-                logger.info(f"Plugin Tool {tool_name}, Args: {tool_args}, Result: {tool_result}")
-
-            except Exception as err:
-                logger.error(f"Plugin Tool {tool_name} Error: {str(err)}")
-                tool_messages.append(
-                    ToolMessage(content=str(err), name=tool_name, tool_call_id=tool_call_id))
+        """Tool execution - sub-agent responsible for specific tool execution
+
+        Independent tool calls of the same model turn run concurrently, each under its own timeout;
+        the returned tool messages keep the order of ``message.tool_calls``.
+        """
+        async def invoke_tool(tool_name, tool_args):
+            is_mcp_tool, use_tool = self._find_tool_use(tool_name)
+            if use_tool is None:
+                raise ValueError(f"Tool {tool_name} does not exist")
+
+            if is_mcp_tool:
+                # MCP tools need the user's personal configuration
+                personal_config = await self.mcp_user_configs.get(self._get_mcp_id_by_tool(tool_name))
+                tool_args.update(personal_config)
+
+                tool_result, _ = await use_tool.coroutine(**tool_args)
+            elif getattr(use_tool, "coroutine", None) is not None:
+                # Async plugins (web search etc.) run on the event loop directly
+                tool_result = await use_tool.ainvoke(tool_args)
+            else:
+                # Offload sync tools to the bounded tool executor
+                tool_result = await run_sync_tool(use_tool.func, **tool_args)
+            return tool_result
 
-        return tool_messages
+        return await execute_tool_calls(message.tool_calls, invoke_tool)
 
     async def astream(self, messages: List[BaseMessage]):
         await self.setup_mcp_tools()
@@ -231,8 +226,10 @@ class PlanExecuteAgent:
         return None
 
     def _find_tool_use(self, tool_name):
-        if tool_name in [tool.name for tool in self.tools]:
-            return True, self.tools[tool_name]
-        elif tool_name in [tool.name for tool in self.mcp_tools]:
-            return True, self.mcp_tools[tool_name]
-        return False, None
\ No newline at end of file
+        for tool in self.tools:
+            if tool.name == tool_name:
+                return False, tool
+        for tool in self.mcp_tools:
+            if tool.name == tool_name:
+                return True, tool
+        return False, None
@@ -0,0 +1,138 @@
+"""
+对话 Prompt 的上下文预算
+
+/completion 的 Prompt 由 系统提示词 + 历史摘要 + 长期记忆 + 上次摘要之后的全部短期消息 组成，
+长对话在摘要追上之前 Prompt 会越来越大。这里在发送给模型之前按预算进行裁剪：
+    - 每条历史消息的 token 数量保存在 HistoryTable.token_usage 中，只有旧数据缺失时才计算并回填
+    - 预算按模型配置，预留模型输出的 token
+    - 过长的单条消息、长期记忆先压缩（保留首尾），再从最早的历史消息开始丢弃，至少保留最近的若干条
+    - 返回本轮 Prompt 的大小统计，便于观察每轮的延迟和成本
+"""
+from loguru import logger
+from dataclasses import dataclass, asdict
+from typing import Dict, List, Optional
+from langchain_core.messages import BaseMessage, HumanMessage, SystemMessage
+
+from agentchat.api.services.history import HistoryService, Assistant_Role, User_Role
+from agentchat.database.models.history import HistoryTable
+from agentchat.settings import app_settings
+from agentchat.utils.common import count_tokens_usage, truncate_text_tokens
+from agentchat.utils.helpers import build_completion_system_prompt
+
+# 每条消息的角色、分隔符等额外开销
+MESSAGE_OVERHEAD_TOKENS = 4
+
+
+@dataclass
+class PromptBudgetReport:
+    model: Optional[str]
+    budget: int
+    system_tokens: int
+    history_tokens: int
+    input_tokens: int
+    total_tokens: int
+    history_messages: int
+    dropped_messages: int
+    compacted_messages: int
+
+    def to_dict(self):
+        return asdict(self)
+
+
+class PromptBudgeter:
+
+    def __init__(self, model: Optional[str] = None):
+        config = app_settings.completion
+        self.model = model
+
+        model_budgets: Dict[str, int] = config.get("model_budgets") or {}
+        max_prompt_tokens = model_budgets.get(model) or config.get("max_prompt_tokens", 16000)
+        self.budget = max_prompt_tokens - config.get("reserve_output_tokens", 2000)
+        self.max_message_tokens = config.get("max_message_tokens", 4000)
+        self.max_memory_tokens = config.get("max_memory_tokens", 2000)
+        self.min_recent_messages = config.get("min_recent_messages", 2)
+
+    def count(self, text: str) -> int:
+        return count_tokens_usage(text, self.model) + MESSAGE_OVERHEAD_TOKENS
+
+    async def build_messages(
+        self,
+        system_prompt: str,
+        history_summary: Optional[str],
+        long_memory: Optional[str],
+        histories: List[HistoryTable],
+        user_input: str,
+    ) -> tuple[List[BaseMessage], PromptBudgetReport]:
+        """组装 Prompt，保证总 token 数量不超过预算（系统提示词和本轮输入本身超出预算时除外）"""
+        if long_memory:
+            long_memory = truncate_text_tokens(long_memory, self.max_memory_tokens, self.model)
+        system_prompt = build_completion_system_prompt(system_prompt, history_summary, long_memory)
+
+        system_tokens = self.count(system_prompt)
+        input_tokens = self.count(user_input)
+        remaining = self.budget - system_tokens - input_tokens
+
+        # 只有用户和 AI 的消息会进入 Prompt
+        histories = [history for history in histories if history.role in (Assistant_Role, User_Role)]
+        history_token_usages = await self._get_history_token_usages(histories)
+        history_messages = HistoryService.convert_history_to_messages(histories)
+
+        # 从最新的消息往前选取，直到预算用完
+        kept: List[tuple[BaseMessage, int]] = []
+        history_tokens = 0
+        compacted = 0
+        for history, message in zip(reversed(histories), reversed(history_messages)):
+            tokens = history_token_usages[history.id] + MESSAGE_OVERHEAD_TOKENS
+            if tokens > self.max_message_tokens:
+                message = message.model_copy(update={"content": truncate_text_tokens(
+                    message.content, self.max_message_tokens, self.model)})
+                tokens = self.count(message.content)
+                compacted += 1
+
+            if history_tokens + tokens > remaining and len(kept) >= self.min_recent_messages:
+                break
+            kept.append((message, tokens))
+            history_tokens += tokens
+        kept.reverse()
+
+        # 避免以孤立的 AI 回复开头
+        while len(kept) > self.min_recent_messages and not isinstance(kept[0][0], HumanMessage):
+            history_tokens -= kept.pop(0)[1]
+
+        report = PromptBudgetReport(
+            model=self.model,
+            budget=self.budget,
+            system_tokens=system_tokens,
+            history_tokens=history_tokens,
+            input_tokens=input_tokens,
+            total_tokens=system_tokens + history_tokens + input_tokens,
+            history_messages=len(kept),
+            dropped_messages=len(history_messages) - len(kept),
+            compacted_messages=compacted,
+        )
+        logger.info(f"Prompt budget: {report.to_dict()}")
+
+        messages: List[BaseMessage] = [
+            SystemMessage(content=system_prompt),
+            *(message for message, _ in kept),
+            HumanMessage(content=user_input),
+        ]
+        return messages, report
+
+    async def _get_history_token_usages(self, histories: List[HistoryTable]) -> Dict[str, int]:
+        """优先使用落库的 token_usage，缺失的计算后回填"""
+        token_usages = {}
+        missing = {}
+        for history in histories:
+            if history.token_usage:
+                token_usages[history.id] = history.token_usage
+            else:
+                history.token_usage = count_tokens_usage(history.content, self.model)
+                token_usages[history.id] = missing[history.id] = history.token_usage
+
+        if missing:
+            try:
+                await HistoryService.update_token_usages(missing)
+            except Exception as err:
+                logger.warning(f"Backfill history token usage failed: {err}")
+        return token_usages
@@ -0,0 +1,79 @@
+"""
+工具调用执行器
+
+模型在一轮回复中可能同时返回多个互不依赖的工具调用（例如同时搜索三个关键词），
+这里负责将它们并发执行：
+    - 每个工具调用单独超时，单个工具失败不影响其他工具
+    - 同步工具放到有界线程池中执行，避免阻塞事件循环
+    - 返回的 ToolMessage 顺序与模型给出的 tool_calls 顺序一致
+"""
+import asyncio
+import functools
+import contextvars
+from loguru import logger
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+from langchain_core.messages import ToolMessage
+
+from agentchat.settings import app_settings
+
+_sync_tool_executor: Optional[ThreadPoolExecutor] = None
+
+
+def get_sync_tool_executor() -> ThreadPoolExecutor:
+    """懒加载同步工具线程池，保证读取到的是已加载的配置"""
+    global _sync_tool_executor
+    if _sync_tool_executor is None:
+        _sync_tool_executor = ThreadPoolExecutor(
+            max_workers=app_settings.tool_call.get("max_workers", 8),
+            thread_name_prefix="agentchat-sync-tool"
+        )
+    return _sync_tool_executor
+
+
+async def run_sync_tool(func: Callable[..., Any], /, *args, **kwargs) -> Any:
+    """在有界线程池中执行同步工具，并保留当前的 contextvars（user_id、trace_id 等）"""
+    loop = asyncio.get_running_loop()
+    context = contextvars.copy_context()
+    return await loop.run_in_executor(
+        get_sync_tool_executor(),
+        functools.partial(context.run, func, *args, **kwargs)
+    )
+
+
+async def execute_tool_calls(
+    tool_calls: List[Dict[str, Any]],
+    invoke_tool: Callable[[str, Dict[str, Any]], Awaitable[Any]],
+    timeout: Optional[float] = None,
+) -> List[ToolMessage]:
+    """
+    并发执行同一轮中的多个工具调用
+
+    Args:
+        tool_calls: AIMessage.tool_calls
+        invoke_tool: 根据工具名称和参数执行工具的协程函数，返回工具结果
+        timeout: 单个工具调用的超时时间，默认读取 tool_call.timeout 配置
+
+    Returns:
+        与 tool_calls 一一对应的 ToolMessage 列表
+    """
+    if timeout is None:
+        timeout = app_settings.tool_call.get("timeout", 60)
+
+    async def execute(tool_call: Dict[str, Any]) -> ToolMessage:
+        tool_name = tool_call.get("name")
+        tool_args = tool_call.get("args") or {}
+        try:
+            content = await asyncio.wait_for(invoke_tool(tool_name, tool_args), timeout=timeout)
+            logger.info(f"Tool {tool_name}, Args: {tool_args}, Result: {content}")
+        except asyncio.TimeoutError:
+            logger.error(f"Tool {tool_name} timed out after {timeout}s")
+            content = f"Tool {tool_name} timed out after {timeout}s"
+        except Exception as err:
+            logger.error(f"Tool {tool_name} Error: {err}")
+            content = str(err)
+
+        return ToolMessage(content=content, name=tool_name, tool_call_id=tool_call.get("id"))
+
+    # gather 按照传入顺序返回结果，保证 ToolMessage 与 tool_call_id 的顺序一致
+    return list(await asyncio.gather(*(execute(tool_call) for tool_call in tool_calls)))
@@ -0,0 +1,133 @@
+"""
+工具语义索引
+
+Agent 绑定的工具（插件、MCP Agent、Skill）很多时，把所有工具都放进 Prompt 会占用大量 Token，
+模型的响应时间也会随工具数量增长。这里为工具描述预先计算 Embedding，每轮对话只选出最相关的子集：
+    - 索引按工具集合的内容（名称 + 描述）计算版本号，工具、MCP、Skill 有变化时自动重建
+    - 相同版本的索引在进程内缓存，多个 Agent / 多轮对话共用
+    - 单个工具的 Embedding 也单独缓存，不同 Agent 之间重叠的工具不会重复计算
+    - 检索时对预先归一化的矩阵做一次矩阵乘法得到余弦相似度，取 top-k
+"""
+import asyncio
+import hashlib
+import numpy as np
+from loguru import logger
+from typing import Dict, List, Optional, Sequence
+from cachetools import LRUCache
+from langchain_core.tools import BaseTool
+
+from agentchat.services.rag.embedding import get_embedding
+from agentchat.settings import app_settings
+
+_index_cache: Optional[LRUCache] = None
+_embedding_cache: Optional[LRUCache] = None
+_build_locks: Dict[str, asyncio.Lock] = {}
+
+
+def _get_index_cache() -> LRUCache:
+    global _index_cache
+    if _index_cache is None:
+        _index_cache = LRUCache(maxsize=app_settings.tool_call.get("index_cache_size", 128))
+    return _index_cache
+
+
+def _get_embedding_cache() -> LRUCache:
+    global _embedding_cache
+    if _embedding_cache is None:
+        _embedding_cache = LRUCache(maxsize=app_settings.tool_call.get("index_embedding_cache_size", 4096))
+    return _embedding_cache
+
+
+def _tool_text(tool: BaseTool) -> str:
+    return f"{tool.name}: {tool.description or ''}"
+
+
+def _text_hash(text: str) -> str:
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+
+def _normalize(matrix: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(matrix, axis=-1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+class ToolIndex:
+    """一组工具描述的 Embedding 矩阵（已归一化），只保存工具名称，不持有工具对象"""
+
+    def __init__(self, version: str, tool_names: List[str], matrix: np.ndarray):
+        self.version = version
+        self.tool_names = tool_names
+        self.matrix = matrix
+
+    def __len__(self):
+        return len(self.tool_names)
+
+    def search(self, query_embedding: Sequence[float], top_k: int, min_score: float = 0.0) -> List[str]:
+        """返回与查询最相似的 top_k 个工具名称，按相似度从高到低排列"""
+        if not self.tool_names or top_k <= 0:
+            return []
+
+        query = _normalize(np.asarray(query_embedding, dtype=np.float32))
+        scores = self.matrix @ query
+        top_k = min(top_k, len(self.tool_names))
+        # argpartition 只做部分排序，再对选出的 top_k 排序
+        candidates = np.argpartition(-scores, top_k - 1)[:top_k]
+        candidates = candidates[np.argsort(-scores[candidates])]
+        return [self.tool_names[i] for i in candidates if scores[i] >= min_score]
+
+    @staticmethod
+    def compute_version(tools: Sequence[BaseTool]) -> str:
+        """工具集合的版本号，与工具顺序无关"""
+        return _text_hash("\n".join(sorted(_text_hash(_tool_text(tool)) for tool in tools)))
+
+    @classmethod
+    async def get_or_build(cls, tools: Sequence[BaseTool]) -> "ToolIndex":
+        """获取工具集合对应的索引，相同版本只构建一次"""
+        version = cls.compute_version(tools)
+        index_cache = _get_index_cache()
+        if index := index_cache.get(version):
+            return index
+
+        lock = _build_locks.setdefault(version, asyncio.Lock())
+        try:
+            async with lock:
+                if index := index_cache.get(version):
+                    return index
+                index = await cls._build(version, tools)
+                index_cache[version] = index
+                return index
+        finally:
+            if not lock.locked():
+                _build_locks.pop(version, None)
+
+    @classmethod
+    async def _build(cls, version: str, tools: Sequence[BaseTool]) -> "ToolIndex":
+        embedding_cache = _get_embedding_cache()
+        texts = {_text_hash(_tool_text(tool)): _tool_text(tool) for tool in tools}
+
+        missing = [key for key in texts if key not in embedding_cache]
+        if missing:
+            embeddings = await get_embedding([texts[key] for key in missing])
+            for key, embedding in zip(missing, embeddings):
+                embedding_cache[key] = np.asarray(embedding, dtype=np.float32)
+
+        matrix = np.vstack([embedding_cache[_text_hash(_tool_text(tool))] for tool in tools])
+        logger.info(f"Built tool index version={version[:8]} with {len(tools)} tools, {len(missing)} new embeddings")
+        return cls(version, [tool.name for tool in tools], _normalize(matrix))
+
+
+async def select_relevant_tools(
+    index: ToolIndex,
+    tools: Sequence[BaseTool],
+    query: str,
+    top_k: Optional[int] = None,
+) -> List[BaseTool]:
+    """根据用户问题从工具集合中选出最相关的工具，保持 tools 中的原有顺序"""
+    if top_k is None:
+        top_k = app_settings.tool_call.get("index_top_k", 5)
+    min_score = app_settings.tool_call.get("index_min_score", 0.0)
+
+    query_embedding = await get_embedding(query)
+    selected_names = set(index.search(query_embedding, top_k, min_score))
+    return [tool for tool in tools if tool.name in selected_names]
@@ -16,12 +16,13 @@ from agentchat.database.models.user_role import UserRole
 from agentchat.database.models.llm import LLMTable
 from agentchat.database.models.message import MessageDownTable, MessageLikeTable
 from agentchat.database.models.role import Role
-from agentchat.database.models.workspace_session import WorkSpaceSession
+from agentchat.database.models.workspace_session import WorkSpaceSession, WorkSpaceSessionTurn
 from agentchat.database.models.usage_stats import UsageStats
 from agentchat.database.models.agent_skill import AgentSkill
 from agentchat.database.models.register_mcp import RegisterMcpServer
 from agentchat.database.models.register_task import RegisterMcpTask
 from agentchat.database.models.register_mcp_tool import RegisterMcpTool
+from agentchat.database.models.mcp_checkpoint import McpAgentCheckpoint, McpAgentCheckpointWrite
 from agentchat.settings import app_settings
 
 
@@ -1,7 +1,7 @@
-from typing import List
+from typing import List, Dict
 
 from agentchat.database.models.history import HistoryTable
-from sqlmodel import Session, select, delete
+from sqlmodel import Session, select, delete, update
 from agentchat.database.session import async_session_getter
 
 class HistoryDao:
@@ -72,3 +72,14 @@ class HistoryDao:
 
             result = await session.exec(statement)
             return result.all()
+
+    @classmethod
+    async def update_token_usages(cls, token_usages: Dict[str, int]):
+        """Backfill token usage for history records, {history_id: token_usage}"""
+        if not token_usages:
+            return
+        async with async_session_getter() as session:
+            for history_id, token_usage in token_usages.items():
+                statement = update(HistoryTable).where(HistoryTable.id == history_id).values(token_usage=token_usage)
+                await session.exec(statement)
+            await session.commit()
@@ -90,3 +90,18 @@ class MCPUserConfigDao:
                 and_(MCPUserConfigTable.user_id == user_id, MCPUserConfigTable.mcp_server_id == mcp_server_id))
             results = session.exec(sql)
             return results.first()
+
+    @classmethod
+    async def get_mcp_user_configs_by_servers(cls, user_id: str, mcp_server_ids: List[str]):
+        """
+        一次查询批量获取用户在多个MCP Server上的配置记录。
+        :param user_id: 用户ID
+        :param mcp_server_ids: MCP Server ID列表
+        :return: 查询结果列表
+        """
+        if not mcp_server_ids:
+            return []
+        with session_getter() as session:
+            sql = select(MCPUserConfigTable).where(
+                and_(MCPUserConfigTable.user_id == user_id, MCPUserConfigTable.mcp_server_id.in_(mcp_server_ids)))
+            return session.exec(sql).all()
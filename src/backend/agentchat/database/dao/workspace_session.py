@@ -1,8 +1,8 @@
-from typing import List
+from typing import List, Optional
 
-from sqlmodel import select, update, and_, delete
-from agentchat.database.session import session_getter, async_session_getter
-from agentchat.database.models.workspace_session import WorkSpaceSession
+from sqlmodel import select, update, and_, delete, func
+from agentchat.database.session import async_session_getter
+from agentchat.database.models.workspace_session import WorkSpaceSession, WorkSpaceSessionTurn
 
 
 class WorkSpaceSessionDao:
@@ -21,7 +21,15 @@ class WorkSpaceSessionDao:
             if not workspace_session.session_id:
                 from uuid import uuid4
                 workspace_session.session_id = uuid4().hex
+
+            # 初始上下文按轮次写入 workspace_session_turn 表
+            contexts = workspace_session.contexts or []
+            workspace_session.contexts = []
             session.add(workspace_session)
+            session.add_all([
+                WorkSpaceSessionTurn(session_id=workspace_session.session_id, context=context)
+                for context in contexts
+            ])
             await session.commit()
             await session.refresh(workspace_session)
         return workspace_session
@@ -32,20 +40,28 @@ class WorkSpaceSessionDao:
             statement = delete(WorkSpaceSession).where(and_(WorkSpaceSession.session_id.in_(session_ids),
                                                             WorkSpaceSession.user_id == user_id))
             await session.exec(statement)
+            # 会话ID为主键，删除后仍然存在的会话属于其他用户，其上下文需要保留
+            remaining_sessions = select(WorkSpaceSession.session_id).where(
+                WorkSpaceSession.session_id.in_(session_ids))
+            await session.exec(
+                delete(WorkSpaceSessionTurn).where(and_(WorkSpaceSessionTurn.session_id.in_(session_ids),
+                                                        WorkSpaceSessionTurn.session_id.not_in(remaining_sessions))))
             await session.commit()
 
     @classmethod
     async def update_workspace_session_contexts(cls, session_id, session_context):
+        """追加一轮上下文，只写入一行，不再读取和重写整个 contexts 列"""
         async with async_session_getter() as session:
-            workspace_session = await session.get(WorkSpaceSession, session_id)
-            new_contexts = workspace_session.contexts.copy()
-            new_contexts.append(session_context)
-            workspace_session.contexts = new_contexts  # 重新赋值
+            await cls._migrate_legacy_contexts(session, session_id)
 
+            session.add(WorkSpaceSessionTurn(session_id=session_id, context=session_context))
+            # 刷新会话的修改时间，用于会话列表排序
+            await session.exec(
+                update(WorkSpaceSession)
+                .where(WorkSpaceSession.session_id == session_id)
+                .values(update_time=func.now())
+            )
             await session.commit()
-            await session.refresh(workspace_session)
-
-        return workspace_session
 
     @classmethod
     async def get_workspace_session_from_id(cls, session_id):
@@ -54,13 +70,98 @@ class WorkSpaceSessionDao:
             return workspace_session
 
     @classmethod
-    async def clear_workspace_session_contexts(cls, session_id):
+    async def get_workspace_session_contexts(cls, session_id, offset: int = 0, limit: Optional[int] = None) -> List[dict]:
+        """按轮次顺序分页读取会话上下文"""
         async with async_session_getter() as session:
-            workspace_session = await session.get(WorkSpaceSession, session_id)
-            new_contexts = []
-            workspace_session.contexts = new_contexts  # 重新赋值
+            await cls._migrate_legacy_contexts(session, session_id)
+            await session.commit()
 
+            statement = select(WorkSpaceSessionTurn.context).where(
+                WorkSpaceSessionTurn.session_id == session_id
+            ).order_by(WorkSpaceSessionTurn.id).offset(offset)
+            if limit is not None:
+                statement = statement.limit(limit)
+            result = await session.exec(statement)
+            return list(result.all())
+
+    @classmethod
+    async def get_recent_workspace_session_contexts(cls, session_id, limit: int) -> List[dict]:
+        """读取最近的 limit 轮上下文（从旧到新），用于构建对话历史"""
+        async with async_session_getter() as session:
+            await cls._migrate_legacy_contexts(session, session_id)
             await session.commit()
-            await session.refresh(workspace_session)
 
-        return workspace_session
\ No newline at end of file
+            statement = select(WorkSpaceSessionTurn.context).where(
+                WorkSpaceSessionTurn.session_id == session_id
+            ).order_by(WorkSpaceSessionTurn.id.desc()).limit(limit)
+            result = await session.exec(statement)
+            contexts = list(result.all())
+            contexts.reverse()
+            return contexts
+
+    @classmethod
+    async def get_workspace_sessions_contexts(cls, session_ids: List[str]) -> dict[str, List[dict]]:
+        """一次查询批量读取多个会话的上下文"""
+        if not session_ids:
+            return {}
+
+        async with async_session_getter() as session:
+            statement = select(WorkSpaceSessionTurn.session_id, WorkSpaceSessionTurn.context).where(
+                WorkSpaceSessionTurn.session_id.in_(session_ids)
+            ).order_by(WorkSpaceSessionTurn.id)
+            result = await session.exec(statement)
+
+            contexts = {session_id: [] for session_id in session_ids}
+            for session_id, context in result.all():
+                contexts[session_id].append(context)
+            return contexts
+
+    @classmethod
+    async def count_workspace_session_contexts(cls, session_id) -> int:
+        async with async_session_getter() as session:
+            statement = select(func.count()).select_from(WorkSpaceSessionTurn).where(
+                WorkSpaceSessionTurn.session_id == session_id
+            )
+            result = await session.exec(statement)
+            return result.one()
+
+    @classmethod
+    async def clear_workspace_session_contexts(cls, session_id):
+        async with async_session_getter() as session:
+            await session.exec(
+                delete(WorkSpaceSessionTurn).where(WorkSpaceSessionTurn.session_id == session_id)
+            )
+            await session.exec(
+                update(WorkSpaceSession)
+                .where(WorkSpaceSession.session_id == session_id)
+                .values(contexts=[], update_time=func.now())
+            )
+            await session.commit()
+
+    @classmethod
+    async def _migrate_legacy_contexts(cls, session, session_id):
+        """
+        将旧版本存在 workspace_session.contexts 列中的上下文迁移到 workspace_session_turn 表
+        迁移完成后该列置空，之后的调用只会读到一个空列表
+        需要迁移时锁住会话行并重新读取，锁持有到事务提交，并发的请求排队等待，避免同一批上下文被重复迁移
+        """
+        statement = select(WorkSpaceSession.contexts).where(WorkSpaceSession.session_id == session_id)
+        result = await session.exec(statement)
+        if not result.first():
+            return
+
+        result = await session.exec(statement.with_for_update())
+        legacy_contexts = result.first()
+        if not legacy_contexts:
+            return
+
+        session.add_all([
+            WorkSpaceSessionTurn(session_id=session_id, context=context)
+            for context in legacy_contexts
+        ])
+        await session.exec(
+            update(WorkSpaceSession)
+            .where(WorkSpaceSession.session_id == session_id)
+            .values(contexts=[])
+        )
+        await session.flush()
@@ -1,9 +1,11 @@
 import json
 import asyncio
+import hashlib
 import httpx
 import aiofiles
 from loguru import logger
 from sqlmodel import SQLModel
+from sqlalchemy import inspect
 
 from agentchat.database import engine, SystemUser, ensure_mysql_database, AgentTable, ToolTable
 from agentchat.api.services.agent import AgentService
@@ -21,6 +23,10 @@ from agentchat.utils.convert import convert_mcp_config
 from agentchat.core.agents.structured_response_agent import StructuredResponseAgent
 from agentchat.utils.helpers import get_provider_from_model
 
+# 快速启动模式下在后台执行的初始化任务状态：pending / running / done / failed，用于就绪探针
+startup_tasks_status: dict[str, str] = {}
+_background_tasks: set[asyncio.Task] = set()
+
 async def init_agentchat_system():
     """
     agentchat 启动入口（推荐用于每次服务启动）
@@ -52,10 +58,17 @@ async def init_agentchat_system():
 
         logger.info(f"Existing system detected ({len(agents)} agents), updating config...")
 
-        await asyncio.gather(
-            _update_exist_llm(),
-            _update_mcp_server_into_mysql(True),
-        )
+        _run_in_background("vector_preload", _preload_vector_collections())
+
+        if app_settings.startup.get("fast_start", True):
+            # 快速启动：只更新本地的 LLM 配置，需要连接 MCP Server 和调用 LLM 的刷新放到后台执行
+            await _update_exist_llm()
+            _run_in_background("mcp_refresh", _refresh_mcp_server_in_background())
+        else:
+            await asyncio.gather(
+                _update_exist_llm(),
+                _update_mcp_server_into_mysql(True),
+            )
         logger.success("agentchat runtime ready")
     except Exception as err:
         logger.error(f" agentchat init failed: {err}")
@@ -67,12 +80,78 @@ async def init_database():
     - 创建所有表结构
     """
     try:
-        ensure_mysql_database()
-        SQLModel.metadata.create_all(engine)
+        try:
+            existing_tables = set(inspect(engine).get_table_names())
+        except Exception:
+            # 数据库不存在时先创建数据库
+            ensure_mysql_database()
+            existing_tables = set(inspect(engine).get_table_names())
+
+        # 一次查询表名，只创建缺失的表，避免每次启动逐表检查
+        missing_tables = [table for table in SQLModel.metadata.sorted_tables if table.name not in existing_tables]
+        if missing_tables:
+            SQLModel.metadata.create_all(engine, tables=missing_tables)
+            logger.info(f"Created MySQL tables: {[table.name for table in missing_tables]}")
         logger.success("MySQL tables are ready")
     except Exception as err:
         logger.error(f"Create MySQL Table Error: {err}")
 
+def _run_in_background(name: str, coro):
+    """启动后台初始化任务，并记录其状态"""
+    startup_tasks_status[name] = "running"
+
+    def _on_done(task: asyncio.Task):
+        _background_tasks.discard(task)
+        if task.cancelled() or task.exception():
+            startup_tasks_status[name] = "failed"
+            logger.error(f"Background startup task `{name}` failed: {None if task.cancelled() else task.exception()}")
+        else:
+            startup_tasks_status[name] = "done"
+
+    task = asyncio.create_task(coro)
+    _background_tasks.add(task)
+    task.add_done_callback(_on_done)
+
+
+async def _refresh_mcp_server_in_background():
+    # 等待服务完成启动后再开始刷新，避免与启动阶段争抢资源
+    await asyncio.sleep(app_settings.startup.get("mcp_refresh_delay", 5))
+    await _update_mcp_server_into_mysql(True)
+
+
+async def _preload_vector_collections():
+    """预加载热点知识库对应的 Milvus 集合，避免第一次检索时等待集合加载"""
+    vector_db = app_settings.rag.vector_db
+    if vector_db.get("mode") not in (None, "standalone", "lite"):
+        return
+
+    residency = vector_db.get("residency") or {}
+    knowledge_ids = list(residency.get("preload_knowledge_ids") or [])
+    if preload_recent := residency.get("preload_recent", 0):
+        from agentchat.database.dao.knowledge import KnowledgeDao
+        knowledges = sorted(await KnowledgeDao.get_all_knowledge(),
+                            key=lambda knowledge: knowledge.update_time or knowledge.create_time, reverse=True)
+        knowledge_ids.extend(knowledge.id for knowledge in knowledges[:preload_recent])
+
+    from agentchat.services.rag.vector_stores import milvus_client
+    client = await asyncio.to_thread(milvus_client.get_client)
+    if getattr(client, "is_shared_layout", False):
+        # 共享布局下所有知识库都在共享集合中，另外加载尚未迁移的旧集合
+        collection_names = [client.shared_collection_name, *(knowledge_id for knowledge_id in knowledge_ids
+                                                             if knowledge_id in client.legacy_collections)]
+    else:
+        collection_names = knowledge_ids
+    if not collection_names:
+        return
+
+    await asyncio.to_thread(client.preload_collections, list(dict.fromkeys(collection_names)))
+    logger.info(f"Preloaded vector collections: {client.residency_metrics()}")
+
+
+def _hash_tools_params(params) -> str:
+    return hashlib.sha256(json.dumps(params, sort_keys=True, ensure_ascii=False).encode()).hexdigest()
+
+
 async def load_json(path: str):
     """
     异步读取 JSON 文件（避免阻塞事件循环）
@@ -243,6 +322,22 @@ async def _update_mcp_server_into_mysql(has_mcp_server: bool):
     mcp_manager = MCPManager(convert_mcp_config(servers_info))
     servers_params = await mcp_manager.show_mcp_tools()
 
+    if has_mcp_server:
+        # 工具列表没有变化的 MCP Server 不再调用 LLM 重新生成描述，只刷新更新时间
+        stored_hashes = {s["server_name"]: _hash_tools_params(s.get("params")) for s in servers}
+        unchanged = [
+            name for name, params in servers_params.items()
+            if stored_hashes.get(name) == _hash_tools_params(params)
+        ]
+        for server_name in unchanged:
+            server = next(s for s in servers if s["server_name"] == server_name)
+            await MCPService.update_mcp_server(
+                server_id=server["mcp_server_id"],
+                update_data={"tools": [t["name"] for t in servers_params.pop(server_name)]}
+            )
+        if unchanged:
+            logger.info(f"MCP servers unchanged, skip LLM refresh: {unchanged}")
+
     semaphore = asyncio.Semaphore(5)
 
     async def build_meta(server_name, params):
@@ -252,7 +347,9 @@ async def _update_mcp_server_into_mysql(has_mcp_server: bool):
         async with semaphore:
             agent = StructuredResponseAgent(MCPResponseFormat)
 
-            result = agent.get_structured_response(
+            # 同步调用 LLM，放到线程中执行，后台刷新时不阻塞事件循环
+            result = await asyncio.to_thread(
+                agent.get_structured_response,
                 McpAsToolPrompt.format(
                     tools_info=json.dumps(params, indent=2)
                 )
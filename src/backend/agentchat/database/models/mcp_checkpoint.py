@@ -0,0 +1,45 @@
+from typing import Optional
+from sqlmodel import SQLModel, Field, Column, DateTime, LargeBinary
+from datetime import datetime
+
+from agentchat.utils.common import get_now_time
+
+# MySQL 中映射为 LONGBLOB
+_BLOB_LENGTH = 2 ** 32 - 1
+
+
+class McpAgentCheckpoint(SQLModel, table=True):
+    """MCP 注册 Agent（HITL）的 LangGraph checkpoint，同一 thread 只保留最近的若干个"""
+    __tablename__ = "mcp_agent_checkpoint"
+
+    thread_id: str = Field(primary_key=True, max_length=64)
+    checkpoint_ns: str = Field(default="", primary_key=True, max_length=128)
+    checkpoint_id: str = Field(primary_key=True, max_length=64)
+    parent_checkpoint_id: Optional[str] = Field(default=None, max_length=64)
+    type: str = Field(max_length=32)
+    checkpoint: bytes = Field(sa_column=Column(LargeBinary(length=_BLOB_LENGTH), nullable=False))
+    metadata_type: str = Field(max_length=32)
+    checkpoint_metadata: bytes = Field(sa_column=Column(LargeBinary(length=_BLOB_LENGTH), nullable=False))
+    created_time: datetime = Field(
+        default_factory=get_now_time,
+        sa_column=Column(DateTime, nullable=False, default=get_now_time, index=True)
+    )
+
+
+class McpAgentCheckpointWrite(SQLModel, table=True):
+    """checkpoint 对应的 pending writes（包括 HITL 中断信息）"""
+    __tablename__ = "mcp_agent_checkpoint_write"
+
+    thread_id: str = Field(primary_key=True, max_length=64)
+    checkpoint_ns: str = Field(default="", primary_key=True, max_length=128)
+    checkpoint_id: str = Field(primary_key=True, max_length=64)
+    task_id: str = Field(primary_key=True, max_length=64)
+    idx: int = Field(primary_key=True)
+    channel: str = Field(max_length=255)
+    type: str = Field(max_length=32)
+    value: bytes = Field(sa_column=Column(LargeBinary(length=_BLOB_LENGTH), nullable=False))
+    task_path: str = Field(default="", max_length=255)
+    created_time: datetime = Field(
+        default_factory=get_now_time,
+        sa_column=Column(DateTime, nullable=False, default=get_now_time, index=True)
+    )
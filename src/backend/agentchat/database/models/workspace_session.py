@@ -12,6 +12,7 @@ class WorkSpaceSessionBase(SQLModelSerializable):
     title: str = Field(..., description="工作台会话的标题")
     agent: str = Field(..., description="工作台中选用的智能体")
     user_id: str = Field(..., description="工作台会话对应的User ID")
+    # 新的会话上下文写入 workspace_session_turn 表，该列仅保留历史数据，读取时会迁移到新表
     contexts: List[dict] = Field([], sa_column=Column(JSON), description="JSON, 含 tasks、questions、answers、guide_prompts 四个字段的结构化对话上下文")
 
     # tasks: List[str] = Field(None, description="工作台会话的任务")
@@ -41,6 +42,22 @@ class WorkSpaceSession(WorkSpaceSessionBase, table=True):
         description="创建时间"
     )
 
+class WorkSpaceSessionTurn(SQLModelSerializable, table=True):
+    """工作台会话的单轮上下文，按轮次追加写入，避免每轮都重写整个 contexts 列"""
+    __tablename__ = "workspace_session_turn"
+
+    id: Optional[int] = Field(default=None, primary_key=True, description="自增ID，同一会话内即为轮次顺序")
+    session_id: str = Field(index=True, max_length=64, description="工作台的会话ID")
+    context: dict = Field({}, sa_column=Column(JSON), description="单轮的结构化对话上下文，结构同 WorkSpaceSessionContext")
+    create_time: Optional[datetime] = Field(
+        sa_column=Column(
+            DateTime,
+            nullable=False,
+            server_default=text('CURRENT_TIMESTAMP')
+        ),
+        description="创建时间"
+    )
+
 class WorkSpaceSessionCreate(BaseModel):
     title: str
     agent: str
@@ -10,6 +10,8 @@ from fastapi.middleware.cors import CORSMiddleware
 
 from agentchat.api.JWT import Settings as AuthJwtSettings
 from agentchat.mcp_proxy.session.manager import SessionManager
+from agentchat.mcp_proxy.session.notification import init_notification_bus
+from agentchat.services.dialog_summary import init_summary_scheduler
 from agentchat.middleware.trace_id_middleware import TraceIDMiddleware
 from agentchat.middleware.white_list_middleware import WhitelistMiddleware
 from agentchat.settings import init_app_settings
@@ -23,11 +25,46 @@ async def register_router(app: FastAPI):
 
     app.include_router(router)
 
-    # 健康探针
+    # 存活探针：进程能够响应即可
     @app.get("/health")
     def check_health():
         return {'status': 'OK'}
 
+    # 就绪探针：依赖的 MySQL / Redis 可用并且没有处于关闭过程中，后台初始化任务的状态仅作展示
+    @app.get("/ready")
+    async def check_ready():
+        from sqlalchemy import text
+        from agentchat.database import async_engine
+        from agentchat.database.init_data import startup_tasks_status
+
+        checks = {}
+        try:
+            async with async_engine.connect() as conn:
+                await conn.execute(text("SELECT 1"))
+            checks["mysql"] = "OK"
+        except Exception as err:
+            checks["mysql"] = str(err)
+        try:
+            await app.state.redis_client.ping()
+            checks["redis"] = "OK"
+        except Exception as err:
+            checks["redis"] = str(err)
+
+        ready = app.state.ready and all(status == "OK" for status in checks.values())
+        content = {
+            "status": "READY" if ready else "NOT_READY",
+            "checks": checks,
+            "background_tasks": startup_tasks_status,
+        }
+        # 向量库已经初始化时附带集合驻留的统计信息（命中率、加载耗时等），不在这里触发初始化
+        from agentchat.services.rag.vector_stores import milvus_client
+        if milvus_client._client is not None and hasattr(milvus_client._client, "residency_metrics"):
+            content["vector_collections"] = milvus_client._client.residency_metrics()
+        return JSONResponse(
+            status_code=200 if ready else 503,
+            content=content
+        )
+
 
 def register_middleware(app: FastAPI):
     origins = [
@@ -64,21 +101,54 @@ def print_logo():
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
+    app.state.ready = False
     await init_config()
 
     redis_client = aioredis.from_url(
         app_settings.redis.get("endpoint"),
         decode_responses=True
     )
+    app.state.redis_client = redis_client
     app.state.session_manager = SessionManager(redis_client)
+    await app.state.session_manager.start()
+    notification_bus = init_notification_bus(redis_client)
+    from agentchat.mcp_proxy.register_mcp import RegisterMcpService
+    notification_bus.on_server_invalidated(RegisterMcpService.clear_local_server_cache)
+    await notification_bus.start()
+    summary_scheduler = init_summary_scheduler(redis_client)
+    await summary_scheduler.start()
+    # 存储客户端依赖加载后的配置，延迟导入
+    from agentchat.services.mars.ai_news.snapshot import init_ai_news_snapshot
+    ai_news_snapshot = init_ai_news_snapshot(redis_client)
+    await ai_news_snapshot.start()
 
     await register_router(app)
-    print_logo()
+    if app_settings.startup.get("print_logo", True):
+        print_logo()
 
+    app.state.ready = True
     yield
 
+    # 先标记为未就绪，负载均衡摘除流量后再释放资源
+    app.state.ready = False
+    await notification_bus.stop()
+    await summary_scheduler.stop()
+    await ai_news_snapshot.stop()
+    await app.state.session_manager.close()
     await redis_client.close()
 
+    from agentchat.mcp_proxy.execute_tool import UpstreamHttpClients
+    await UpstreamHttpClients.aclose()
+
+    from agentchat.services.web_search import close_web_search_service
+    await close_web_search_service()
+
+    from agentchat.services.text2sql.engine import Text2SQLEngine
+    await Text2SQLEngine.close_pools()
+
+    from agentchat.services.storage import async_storage_client
+    async_storage_client.shutdown()
+
 
 def create_app():
     app = FastAPI(
@@ -5,7 +5,6 @@ from langchain.tools import tool, ToolRuntime
 from langchain_core.messages import HumanMessage, SystemMessage, AIMessageChunk
 from langgraph.config import get_stream_writer
 from langchain.agents.middleware import HumanInTheLoopMiddleware
-from langgraph.checkpoint.memory import InMemorySaver
 from langgraph.types import Command
 
 from agentchat.core.models.manager import ModelManager
@@ -18,9 +17,11 @@ from agentchat.prompts.register_mcp import (
 )
 from agentchat.schemas.register_mcp import RegisterMcpServerModel
 from agentchat.mcp_proxy.register_mcp import RegisterMcpService
+from agentchat.mcp_proxy.checkpoint import create_checkpointer
 from agentchat.utils.contexts import get_user_id_context
 
-_checkpointer = InMemorySaver()
+# 持久化的 checkpointer，HITL 中断后可以在任意 worker 上恢复，服务重启不丢失
+_checkpointer = create_checkpointer()
 
 
 @tool
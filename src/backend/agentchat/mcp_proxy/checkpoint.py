@@ -0,0 +1,497 @@
+"""
+MCP 注册 Agent（HITL）的持久化 Checkpointer
+
+HumanInTheLoopMiddleware 依赖 checkpointer 保存中断状态，/mcp/register/completion 发起的流程
+需要在 /hitl/approve 时恢复。使用进程内的 InMemorySaver 时，两次请求必须落到同一个进程，
+服务重启会丢失待确认的注册流程，并且 checkpoint 会无限增长。
+
+这里实现一个可切换存储的 checkpointer（mcp_proxy.checkpointer.mode）：
+    - redis：默认，多 worker 共享，依赖 Redis 过期时间自动清理
+    - mysql：复用业务数据库，定期清理过期数据
+    - sqlite：单机本地模式
+    - memory：保留原有的 InMemorySaver 行为
+序列化使用 LangGraph 的 serde（msgpack），超过阈值的数据再经过 zlib 压缩；
+同一 thread 只保留最近 max_checkpoints 个 checkpoint。
+"""
+import json
+import time
+import zlib
+import random
+import asyncio
+from dataclasses import dataclass
+from datetime import timedelta
+from loguru import logger
+from typing import Any, AsyncIterator, Optional, Sequence
+import redis.asyncio as aioredis
+from sqlmodel import Session, SQLModel, select, delete, and_, create_engine, col
+from langchain_core.runnables import RunnableConfig
+from langgraph.checkpoint.base import (
+    BaseCheckpointSaver,
+    ChannelVersions,
+    Checkpoint,
+    CheckpointMetadata,
+    CheckpointTuple,
+    WRITES_IDX_MAP,
+    get_checkpoint_id,
+)
+from langgraph.checkpoint.memory import InMemorySaver
+
+from agentchat.database.models.mcp_checkpoint import McpAgentCheckpoint, McpAgentCheckpointWrite
+from agentchat.settings import app_settings
+from agentchat.utils.common import get_now_time
+
+COMPRESSED_SUFFIX = "+zlib"
+
+
+@dataclass
+class CheckpointRecord:
+    checkpoint_id: str
+    parent_checkpoint_id: Optional[str]
+    type: str
+    checkpoint: bytes
+    metadata_type: str
+    metadata: bytes
+
+
+@dataclass
+class WriteRecord:
+    task_id: str
+    idx: int
+    channel: str
+    type: str
+    value: bytes
+    task_path: str = ""
+
+
+class RedisCheckpointStore:
+    """
+    Key 设计：
+        mcp:checkpoint:{thread_id}:{ns}                   ZSET  checkpoint_id，按写入时间排序
+        mcp:checkpoint:{thread_id}:{ns}:{checkpoint_id}   HASH  checkpoint 内容
+        mcp:checkpoint:writes:{thread_id}:{ns}:{checkpoint_id}  HASH  "{task_id}:{idx}" -> write
+        mcp:checkpoint:keys:{thread_id}                   SET   thread 下的所有 key，用于删除
+    """
+    prefix = "mcp:checkpoint"
+
+    def __init__(self, redis_client: aioredis.Redis, ttl: int, max_checkpoints: int):
+        self._redis = redis_client
+        self.ttl = ttl
+        self.max_checkpoints = max_checkpoints
+
+    def _index_key(self, thread_id, ns):
+        return f"{self.prefix}:{thread_id}:{ns}"
+
+    def _checkpoint_key(self, thread_id, ns, checkpoint_id):
+        return f"{self.prefix}:{thread_id}:{ns}:{checkpoint_id}"
+
+    def _writes_key(self, thread_id, ns, checkpoint_id):
+        return f"{self.prefix}:writes:{thread_id}:{ns}:{checkpoint_id}"
+
+    def _keys_key(self, thread_id):
+        return f"{self.prefix}:keys:{thread_id}"
+
+    async def put_checkpoint(self, thread_id: str, ns: str, record: CheckpointRecord):
+        index_key = self._index_key(thread_id, ns)
+        checkpoint_key = self._checkpoint_key(thread_id, ns, record.checkpoint_id)
+        keys_key = self._keys_key(thread_id)
+
+        async with self._redis.pipeline(transaction=True) as pipe:
+            pipe.hset(checkpoint_key, mapping={
+                "parent_checkpoint_id": record.parent_checkpoint_id or "",
+                "type": record.type,
+                "checkpoint": record.checkpoint,
+                "metadata_type": record.metadata_type,
+                "metadata": record.metadata,
+            })
+            pipe.zadd(index_key, {record.checkpoint_id: time.time()})
+            pipe.sadd(keys_key, index_key, checkpoint_key)
+            for key in (checkpoint_key, index_key, keys_key):
+                pipe.expire(key, self.ttl)
+            pipe.zrange(index_key, 0, -(self.max_checkpoints + 1))
+            *_, expired_ids = await pipe.execute()
+
+        if expired_ids:
+            expired_ids = [checkpoint_id.decode() for checkpoint_id in expired_ids]
+            expired_keys = []
+            for checkpoint_id in expired_ids:
+                expired_keys.append(self._checkpoint_key(thread_id, ns, checkpoint_id))
+                expired_keys.append(self._writes_key(thread_id, ns, checkpoint_id))
+            async with self._redis.pipeline(transaction=True) as pipe:
+                pipe.zrem(index_key, *expired_ids)
+                pipe.delete(*expired_keys)
+                pipe.srem(keys_key, *expired_keys)
+                await pipe.execute()
+
+    async def put_writes(self, thread_id: str, ns: str, checkpoint_id: str, writes: list[WriteRecord]):
+        writes_key = self._writes_key(thread_id, ns, checkpoint_id)
+        async with self._redis.pipeline(transaction=True) as pipe:
+            for write in writes:
+                field = f"{write.task_id}:{write.idx}"
+                value = _pack_write(write)
+                # 特殊 channel（idx < 0，如 __interrupt__）覆盖写入，其余只写入一次
+                if write.idx < 0:
+                    pipe.hset(writes_key, field, value)
+                else:
+                    pipe.hsetnx(writes_key, field, value)
+            pipe.sadd(self._keys_key(thread_id), writes_key)
+            pipe.expire(writes_key, self.ttl)
+            await pipe.execute()
+
+    async def get_checkpoint(self, thread_id: str, ns: str, checkpoint_id: Optional[str]) -> Optional[CheckpointRecord]:
+        if checkpoint_id is None:
+            latest = await self._redis.zrevrange(self._index_key(thread_id, ns), 0, 0)
+            if not latest:
+                return None
+            checkpoint_id = latest[0].decode()
+
+        data = await self._redis.hgetall(self._checkpoint_key(thread_id, ns, checkpoint_id))
+        if not data:
+            return None
+        return CheckpointRecord(
+            checkpoint_id=checkpoint_id,
+            parent_checkpoint_id=data[b"parent_checkpoint_id"].decode() or None,
+            type=data[b"type"].decode(),
+            checkpoint=data[b"checkpoint"],
+            metadata_type=data[b"metadata_type"].decode(),
+            metadata=data[b"metadata"],
+        )
+
+    async def list_checkpoint_ids(self, thread_id: str, ns: str) -> list[str]:
+        checkpoint_ids = await self._redis.zrevrange(self._index_key(thread_id, ns), 0, -1)
+        return [checkpoint_id.decode() for checkpoint_id in checkpoint_ids]
+
+    async def get_writes(self, thread_id: str, ns: str, checkpoint_id: str) -> list[WriteRecord]:
+        data = await self._redis.hgetall(self._writes_key(thread_id, ns, checkpoint_id))
+        writes = [_unpack_write(value) for value in data.values()]
+        return sorted(writes, key=lambda write: (write.task_id, write.idx))
+
+    async def delete_thread(self, thread_id: str):
+        keys_key = self._keys_key(thread_id)
+        keys = await self._redis.smembers(keys_key)
+        await self._redis.delete(keys_key, *keys)
+
+    async def cleanup(self):
+        """Redis 依赖 key 的过期时间清理"""
+        return
+
+
+class SQLCheckpointStore:
+    """基于 SQLModel 的存储，MySQL 复用业务数据库，SQLite 用于单机本地模式；同步驱动放到线程中执行"""
+
+    def __init__(self, engine, ttl: int, max_checkpoints: int, cleanup_interval: int):
+        self.engine = engine
+        self.ttl = ttl
+        self.max_checkpoints = max_checkpoints
+        self.cleanup_interval = cleanup_interval
+        self._last_cleanup = 0.0
+
+    async def _run(self, func, *args):
+        return await asyncio.to_thread(func, *args)
+
+    @staticmethod
+    def _checkpoint_filter(table, thread_id: str, ns: str):
+        return and_(table.thread_id == thread_id, table.checkpoint_ns == ns)
+
+    async def put_checkpoint(self, thread_id: str, ns: str, record: CheckpointRecord):
+        def _put():
+            with Session(self.engine) as session:
+                session.merge(McpAgentCheckpoint(
+                    thread_id=thread_id,
+                    checkpoint_ns=ns,
+                    checkpoint_id=record.checkpoint_id,
+                    parent_checkpoint_id=record.parent_checkpoint_id,
+                    type=record.type,
+                    checkpoint=record.checkpoint,
+                    metadata_type=record.metadata_type,
+                    checkpoint_metadata=record.metadata,
+                ))
+                session.flush()
+
+                # 只保留最近的 max_checkpoints 个
+                expired_ids = session.exec(
+                    select(McpAgentCheckpoint.checkpoint_id)
+                    .where(self._checkpoint_filter(McpAgentCheckpoint, thread_id, ns))
+                    .order_by(col(McpAgentCheckpoint.checkpoint_id).desc())
+                    .offset(self.max_checkpoints)
+                ).all()
+                if expired_ids:
+                    for table in (McpAgentCheckpoint, McpAgentCheckpointWrite):
+                        session.exec(delete(table).where(and_(
+                            self._checkpoint_filter(table, thread_id, ns),
+                            col(table.checkpoint_id).in_(expired_ids)
+                        )))
+                session.commit()
+
+        await self._run(_put)
+        await self.cleanup()
+
+    async def put_writes(self, thread_id: str, ns: str, checkpoint_id: str, writes: list[WriteRecord]):
+        def _put():
+            with Session(self.engine) as session:
+                existing = set(session.exec(
+                    select(McpAgentCheckpointWrite.task_id, McpAgentCheckpointWrite.idx).where(and_(
+                        self._checkpoint_filter(McpAgentCheckpointWrite, thread_id, ns),
+                        McpAgentCheckpointWrite.checkpoint_id == checkpoint_id,
+                        col(McpAgentCheckpointWrite.task_id).in_({write.task_id for write in writes})
+                    ))
+                ).all())
+                for write in writes:
+                    # 特殊 channel（idx < 0，如 __interrupt__）覆盖写入，其余只写入一次
+                    if (write.task_id, write.idx) in existing and write.idx >= 0:
+                        continue
+                    session.merge(McpAgentCheckpointWrite(
+                        thread_id=thread_id,
+                        checkpoint_ns=ns,
+                        checkpoint_id=checkpoint_id,
+                        task_id=write.task_id,
+                        idx=write.idx,
+                        channel=write.channel,
+                        type=write.type,
+                        value=write.value,
+                        task_path=write.task_path,
+                    ))
+                session.commit()
+
+        await self._run(_put)
+
+    async def get_checkpoint(self, thread_id: str, ns: str, checkpoint_id: Optional[str]) -> Optional[CheckpointRecord]:
+        def _get():
+            with Session(self.engine) as session:
+                statement = select(McpAgentCheckpoint).where(self._checkpoint_filter(McpAgentCheckpoint, thread_id, ns))
+                if checkpoint_id is None:
+                    statement = statement.order_by(col(McpAgentCheckpoint.checkpoint_id).desc()).limit(1)
+                else:
+                    statement = statement.where(McpAgentCheckpoint.checkpoint_id == checkpoint_id)
+                row = session.exec(statement).first()
+                if row is None:
+                    return None
+                return CheckpointRecord(
+                    checkpoint_id=row.checkpoint_id,
+                    parent_checkpoint_id=row.parent_checkpoint_id,
+                    type=row.type,
+                    checkpoint=row.checkpoint,
+                    metadata_type=row.metadata_type,
+                    metadata=row.checkpoint_metadata,
+                )
+
+        return await self._run(_get)
+
+    async def list_checkpoint_ids(self, thread_id: str, ns: str) -> list[str]:
+        def _list():
+            with Session(self.engine) as session:
+                return list(session.exec(
+                    select(McpAgentCheckpoint.checkpoint_id)
+                    .where(self._checkpoint_filter(McpAgentCheckpoint, thread_id, ns))
+                    .order_by(col(McpAgentCheckpoint.checkpoint_id).desc())
+                ).all())
+
+        return await self._run(_list)
+
+    async def get_writes(self, thread_id: str, ns: str, checkpoint_id: str) -> list[WriteRecord]:
+        def _get():
+            with Session(self.engine) as session:
+                rows = session.exec(
+                    select(McpAgentCheckpointWrite).where(and_(
+                        self._checkpoint_filter(McpAgentCheckpointWrite, thread_id, ns),
+                        McpAgentCheckpointWrite.checkpoint_id == checkpoint_id
+                    )).order_by(McpAgentCheckpointWrite.task_id, McpAgentCheckpointWrite.idx)
+                ).all()
+                return [
+                    WriteRecord(task_id=row.task_id, idx=row.idx, channel=row.channel,
+                                type=row.type, value=row.value, task_path=row.task_path)
+                    for row in rows
+                ]
+
+        return await self._run(_get)
+
+    async def delete_thread(self, thread_id: str):
+        def _delete():
+            with Session(self.engine) as session:
+                for table in (McpAgentCheckpoint, McpAgentCheckpointWrite):
+                    session.exec(delete(table).where(table.thread_id == thread_id))
+                session.commit()
+
+        await self._run(_delete)
+
+    async def cleanup(self):
+        """按 cleanup_interval 间隔删除超过 TTL 的数据"""
+        if time.monotonic() - self._last_cleanup < self.cleanup_interval:
+            return
+        self._last_cleanup = time.monotonic()
+
+        def _cleanup():
+            expired_time = get_now_time() - timedelta(seconds=self.ttl)
+            with Session(self.engine) as session:
+                for table in (McpAgentCheckpoint, McpAgentCheckpointWrite):
+                    session.exec(delete(table).where(table.created_time < expired_time))
+                session.commit()
+
+        try:
+            await self._run(_cleanup)
+        except Exception as err:
+            logger.error(f"Cleanup MCP agent checkpoints error: {err}")
+
+
+class PersistentCheckpointSaver(BaseCheckpointSaver[str]):
+    """只实现异步接口，AbstractMcpAgent 全部通过 astream 调用"""
+
+    def __init__(self, store, compress_threshold: int = 1024):
+        super().__init__()
+        self.store = store
+        self.compress_threshold = compress_threshold
+
+    def _dumps(self, value: Any) -> tuple[str, bytes]:
+        type_, data = self.serde.dumps_typed(value)
+        if len(data) > self.compress_threshold:
+            return type_ + COMPRESSED_SUFFIX, zlib.compress(data)
+        return type_, data
+
+    def _loads(self, type_: str, data: bytes) -> Any:
+        if type_.endswith(COMPRESSED_SUFFIX):
+            type_, data = type_[:-len(COMPRESSED_SUFFIX)], zlib.decompress(data)
+        return self.serde.loads_typed((type_, data))
+
+    @staticmethod
+    def _parse_config(config: RunnableConfig) -> tuple[str, str]:
+        configurable = config["configurable"]
+        return configurable["thread_id"], configurable.get("checkpoint_ns", "")
+
+    async def _to_tuple(self, thread_id: str, ns: str, record: CheckpointRecord) -> CheckpointTuple:
+        writes = await self.store.get_writes(thread_id, ns, record.checkpoint_id)
+        return CheckpointTuple(
+            config={"configurable": {
+                "thread_id": thread_id, "checkpoint_ns": ns, "checkpoint_id": record.checkpoint_id
+            }},
+            checkpoint=self._loads(record.type, record.checkpoint),
+            metadata=self._loads(record.metadata_type, record.metadata),
+            parent_config={"configurable": {
+                "thread_id": thread_id, "checkpoint_ns": ns, "checkpoint_id": record.parent_checkpoint_id
+            }} if record.parent_checkpoint_id else None,
+            pending_writes=[(write.task_id, write.channel, self._loads(write.type, write.value)) for write in writes],
+        )
+
+    async def aget_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        thread_id, ns = self._parse_config(config)
+        record = await self.store.get_checkpoint(thread_id, ns, get_checkpoint_id(config))
+        if record is None:
+            return None
+        return await self._to_tuple(thread_id, ns, record)
+
+    async def alist(
+        self,
+        config: Optional[RunnableConfig],
+        *,
+        filter: Optional[dict[str, Any]] = None,
+        before: Optional[RunnableConfig] = None,
+        limit: Optional[int] = None,
+    ) -> AsyncIterator[CheckpointTuple]:
+        # 只支持按 thread 查询
+        if not config:
+            return
+        thread_id, ns = self._parse_config(config)
+        checkpoint_ids = await self.store.list_checkpoint_ids(thread_id, ns)
+        if checkpoint_id := get_checkpoint_id(config):
+            checkpoint_ids = [item for item in checkpoint_ids if item == checkpoint_id]
+        if before and (before_id := get_checkpoint_id(before)):
+            checkpoint_ids = [item for item in checkpoint_ids if item < before_id]
+
+        count = 0
+        for checkpoint_id in checkpoint_ids:
+            record = await self.store.get_checkpoint(thread_id, ns, checkpoint_id)
+            if record is None:
+                continue
+            checkpoint_tuple = await self._to_tuple(thread_id, ns, record)
+            if filter and not all(checkpoint_tuple.metadata.get(key) == value for key, value in filter.items()):
+                continue
+            yield checkpoint_tuple
+            count += 1
+            if limit is not None and count >= limit:
+                break
+
+    async def aput(
+        self,
+        config: RunnableConfig,
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata,
+        new_versions: ChannelVersions,
+    ) -> RunnableConfig:
+        thread_id, ns = self._parse_config(config)
+        checkpoint_type, checkpoint_data = self._dumps(checkpoint)
+        metadata_type, metadata_data = self._dumps(metadata)
+
+        await self.store.put_checkpoint(thread_id, ns, CheckpointRecord(
+            checkpoint_id=checkpoint["id"],
+            parent_checkpoint_id=config["configurable"].get("checkpoint_id"),
+            type=checkpoint_type,
+            checkpoint=checkpoint_data,
+            metadata_type=metadata_type,
+            metadata=metadata_data,
+        ))
+        return {"configurable": {"thread_id": thread_id, "checkpoint_ns": ns, "checkpoint_id": checkpoint["id"]}}
+
+    async def aput_writes(
+        self,
+        config: RunnableConfig,
+        writes: Sequence[tuple[str, Any]],
+        task_id: str,
+        task_path: str = "",
+    ) -> None:
+        thread_id, ns = self._parse_config(config)
+        records = []
+        for idx, (channel, value) in enumerate(writes):
+            type_, data = self._dumps(value)
+            records.append(WriteRecord(
+                task_id=task_id, idx=WRITES_IDX_MAP.get(channel, idx), channel=channel,
+                type=type_, value=data, task_path=task_path
+            ))
+        await self.store.put_writes(thread_id, ns, config["configurable"]["checkpoint_id"], records)
+
+    async def adelete_thread(self, thread_id: str) -> None:
+        await self.store.delete_thread(thread_id)
+
+    def get_next_version(self, current: Optional[str], channel: None) -> str:
+        if current is None:
+            current_v = 0
+        elif isinstance(current, int):
+            current_v = current
+        else:
+            current_v = int(current.split(".")[0])
+        return f"{current_v + 1:032}.{random.random():016}"
+
+
+def _pack_write(write: WriteRecord) -> bytes:
+    header = json.dumps([write.task_id, write.idx, write.channel, write.type, write.task_path])
+    return header.encode() + b"\n" + write.value
+
+
+def _unpack_write(data: bytes) -> WriteRecord:
+    header, value = data.split(b"\n", 1)
+    task_id, idx, channel, type_, task_path = json.loads(header)
+    return WriteRecord(task_id=task_id, idx=idx, channel=channel, type=type_, value=value, task_path=task_path)
+
+
+def create_checkpointer() -> BaseCheckpointSaver:
+    """根据 mcp_proxy.checkpointer 配置创建 checkpointer"""
+    config = app_settings.mcp_proxy.get("checkpointer", {})
+    mode = config.get("mode", "redis")
+    ttl = config.get("ttl", 86400)
+    max_checkpoints = config.get("max_checkpoints", 20)
+
+    if mode == "memory":
+        return InMemorySaver()
+
+    if mode == "redis":
+        # 存储二进制数据，不能使用 decode_responses
+        store = RedisCheckpointStore(aioredis.from_url(app_settings.redis.get("endpoint")), ttl, max_checkpoints)
+    elif mode in ("mysql", "sqlite"):
+        if mode == "mysql":
+            from agentchat.database import engine
+        else:
+            engine = create_engine(f"sqlite:///{config.get('sqlite_path', 'mcp_checkpoints.db')}")
+            SQLModel.metadata.create_all(engine, tables=[McpAgentCheckpoint.__table__, McpAgentCheckpointWrite.__table__])
+        store = SQLCheckpointStore(engine, ttl, max_checkpoints, config.get("cleanup_interval", 600))
+    else:
+        raise ValueError(f"Unsupported checkpointer mode: {mode}")
+
+    logger.info(f"MCP agent checkpointer: {mode}")
+    return PersistentCheckpointSaver(store, config.get("compress_threshold", 1024))
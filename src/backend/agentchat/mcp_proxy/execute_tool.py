@@ -1,44 +1,136 @@
 import base64
 import json
+import re
 import httpx
-from typing import Any
+from http.cookiejar import CookieJar, DefaultCookiePolicy
+from dataclasses import dataclass, field
+from typing import Any, Callable, Optional
 from urllib.parse import urlencode
 
 from agentchat.database.models.register_mcp_tool import RegisterMcpTool
+from agentchat.settings import app_settings
 from loguru import logger
 
+_PATH_VAR_PATTERN = re.compile(r"\{(\w+)\}")
+
+
+def _encode_json(body: Any) -> bytes | None:
+    return json.dumps(body).encode()
+
+
+def _encode_form(body: Any) -> bytes | None:
+    if isinstance(body, dict):
+        return urlencode(body).encode()
+    return None
+
+
+def _encode_octet_stream(body: Any) -> bytes | None:
+    if isinstance(body, str):
+        return base64.b64decode(body)
+    return None
+
+
+BODY_ENCODERS: dict[str, Callable[[Any], bytes | None]] = {
+    "application/json": _encode_json,
+    "application/x-www-form-urlencoded": _encode_form,
+    "application/octet-stream": _encode_octet_stream,
+}
+
+
+@dataclass
+class CompiledTool:
+    """预先解析好的工具执行信息，避免每次调用都重新解析 parameters 和 api_info"""
+    name: str
+    method: str
+    url_template: str
+    content_type: str
+    # 参数名 -> 参数位置（path / query / header / cookie / body）
+    positions: dict[str, str] = field(default_factory=dict)
+    has_path_vars: bool = False
+    encoder: Optional[Callable[[Any], bytes | None]] = None
+
+
+class UpstreamHttpClients:
+    """
+    按上游服务（scheme + host + port）复用的 httpx 客户端
+
+    每个上游服务单独限制连接数，保持长连接，避免每次工具调用都重新进行 TCP / TLS 握手
+    客户端由所有用户共用，Cookie Jar 不保存任何 Cookie，避免上游返回给一个用户的 Set-Cookie 在其他用户的调用中被带上
+    """
+    _clients: dict[tuple, httpx.AsyncClient] = {}
+
+    @classmethod
+    def get_client(cls, url: str) -> httpx.AsyncClient:
+        parsed = httpx.URL(url)
+        key = (parsed.scheme, parsed.host, parsed.port)
+
+        client = cls._clients.get(key)
+        if client is None or client.is_closed:
+            config = app_settings.mcp_proxy
+            client = httpx.AsyncClient(
+                cookies=CookieJar(policy=DefaultCookiePolicy(allowed_domains=[])),
+                timeout=httpx.Timeout(config.get("timeout", 30), connect=config.get("connect_timeout", 5)),
+                limits=httpx.Limits(
+                    max_connections=config.get("max_connections", 50),
+                    max_keepalive_connections=config.get("max_keepalive_connections", 10),
+                    keepalive_expiry=config.get("keepalive_expiry", 30),
+                ),
+            )
+            cls._clients[key] = client
+        return client
+
+    @classmethod
+    async def aclose(cls):
+        for client in cls._clients.values():
+            await client.aclose()
+        cls._clients.clear()
+
+
 class RegisterMcpToolExecute:
 
     @classmethod
-    async def execute_http_tool(cls, tool: RegisterMcpTool, arguments: dict) -> dict:
-        """根据 Tool 的 api_info 执行 HTTP 请求，返回 MCP CallToolResult 格式"""
+    def compile_tool(cls, tool: RegisterMcpTool) -> CompiledTool:
+        """解析 Tool 的 parameters 和 api_info，生成可重复使用的执行信息"""
         api_info = tool.api_info or {}
-        base_url = api_info.get("base_url", "")
-        path = api_info.get("path", "")
-        method = api_info.get("method", "GET").upper()
+        url_template = api_info.get("base_url", "") + api_info.get("path", "")
         content_type = api_info.get("content_type", "application/json")
 
-        full_url = base_url + path
+        try:
+            param_schema = json.loads(tool.parameters) if tool.parameters else {}
+        except (json.JSONDecodeError, TypeError):
+            param_schema = {}
+
+        positions = {}
+        for arg_name, prop_def in param_schema.get("properties", {}).items():
+            # schema_converter 写入的是 x-position，兼容旧数据中的 x_position
+            positions[arg_name] = prop_def.get("x-position") or prop_def.get("x_position") or "query"
+
+        return CompiledTool(
+            name=tool.name,
+            method=api_info.get("method", "GET").upper(),
+            url_template=url_template,
+            content_type=content_type,
+            positions=positions,
+            has_path_vars=bool(_PATH_VAR_PATTERN.search(url_template)),
+            encoder=BODY_ENCODERS.get(content_type.split(";")[0].strip()),
+        )
+
+    @classmethod
+    async def execute_http_tool(cls, tool: RegisterMcpTool | CompiledTool, arguments: dict) -> dict:
+        """根据 Tool 的 api_info 执行 HTTP 请求，返回 MCP CallToolResult 格式"""
+        if isinstance(tool, RegisterMcpTool):
+            tool = cls.compile_tool(tool)
+
         path_vars: dict[str, str] = {}
         query_params: dict[str, str] = {}
         headers: dict[str, str] = {}
         cookies: dict[str, str] = {}
         body_data: dict[str, Any] = {}
 
-        # 解析 parameters schemas 获取位置信息
-        import json
-        try:
-            param_schema = json.loads(tool.parameters) if tool.parameters else {}
-        except (json.JSONDecodeError, TypeError):
-            param_schema = {}
-        
-        properties = param_schema.get("properties", {})
-
         # 根据 x-position 分配参数到正确位置
         for arg_name, arg_value in arguments.items():
-            prop_def = properties.get(arg_name, {})
-            position = prop_def.get("x_position", "query")  # 默认 query
-            
+            position = tool.positions.get(arg_name, "query")  # 默认 query
+
             if position == "path":
                 path_vars[arg_name] = str(arg_value)
             elif position == "query":
@@ -55,24 +147,31 @@ class RegisterMcpToolExecute:
                     body_data[arg_name] = arg_value
 
         # 替换路径变量
-        for var_name, var_val in path_vars.items():
-            full_url = full_url.replace(f"{{{var_name}}}", var_val)
+        full_url = tool.url_template
+        if tool.has_path_vars:
+            full_url = _PATH_VAR_PATTERN.sub(lambda match: path_vars.get(match.group(1), match.group(0)), full_url)
 
         # 编码 body
         body_bytes: bytes | None = None
-        if body_data:
-            body_bytes = cls._encode_body(body_data, content_type)
+        if body_data and tool.encoder:
+            body_bytes = tool.encoder(body_data)
+
+        # Cookie 作为请求头发送，不经过共用客户端的 Cookie Jar
+        if cookies:
+            cookie_header = "; ".join(f"{name}={value}" for name, value in cookies.items())
+            if headers.get("Cookie"):
+                cookie_header = f"{headers['Cookie']}; {cookie_header}"
+            headers["Cookie"] = cookie_header
 
         try:
-            async with httpx.AsyncClient(timeout=30.0) as client:
-                resp = await client.request(
-                    method=method,
-                    url=full_url,
-                    params=query_params or None,
-                    headers={**headers, "Content-Type": content_type} if body_bytes else headers,
-                    cookies=cookies or None,
-                    content=body_bytes,
-                )
+            client = UpstreamHttpClients.get_client(full_url)
+            resp = await client.request(
+                method=tool.method,
+                url=full_url,
+                params=query_params or None,
+                headers={**headers, "Content-Type": tool.content_type} if body_bytes else headers,
+                content=body_bytes,
+            )
             result: dict[str, Any] = {
                 "isError": not resp.is_success,
                 "content": [{"type": "text", "text": resp.text}],
@@ -90,13 +189,5 @@ class RegisterMcpToolExecute:
 
     @classmethod
     def _encode_body(cls, body: Any, content_type: str) -> bytes | None:
-        ct = content_type.split(";")[0].strip()
-        if ct == "application/json":
-            return json.dumps(body).encode()
-        elif ct == "application/x-www-form-urlencoded":
-            if isinstance(body, dict):
-                return urlencode(body).encode()
-        elif ct == "application/octet-stream":
-            if isinstance(body, str):
-                return base64.b64decode(body)
-        return None
\ No newline at end of file
+        encoder = BODY_ENCODERS.get(content_type.split(";")[0].strip())
+        return encoder(body) if encoder else None
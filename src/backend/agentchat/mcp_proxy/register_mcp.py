@@ -6,19 +6,32 @@ import json
 import re
 import uuid
 from loguru import logger
-from typing import Any
+from typing import Any, Optional
 from cachetools import TTLCache
 
 from agentchat.api.services.mcp_server import MCPService
 from agentchat.schemas.register_mcp import RegisterMcpRequest, RegisterMcpResponse, RegisterMcpServerModel
 from agentchat.mcp_proxy.schema_converter import tool_to_mcp_schema, _parse_openapi_schema
-from agentchat.mcp_proxy.execute_tool import RegisterMcpToolExecute
+from agentchat.mcp_proxy.execute_tool import RegisterMcpToolExecute, CompiledTool
+from agentchat.mcp_proxy.session.notification import get_notification_bus
 from agentchat.database.dao.register_mcp import RegisterMcpDao
 from agentchat.database.models.register_mcp import RegisterMcpServer
 from agentchat.database.models.register_mcp_tool import RegisterMcpTool
 from agentchat.settings import app_settings
 
 _tool_cache: TTLCache = TTLCache(maxsize=200, ttl=300)
+# server_key -> {tool_name: CompiledTool}，首次调用时创建，保证读取到的是已加载的配置
+_executor_cache: TTLCache | None = None
+
+
+def _get_executor_cache() -> TTLCache:
+    global _executor_cache
+    if _executor_cache is None:
+        _executor_cache = TTLCache(
+            maxsize=app_settings.mcp_proxy.get("executor_cache_size", 200),
+            ttl=app_settings.mcp_proxy.get("executor_cache_ttl", 600)
+        )
+    return _executor_cache
 
 def _slugify(text: str) -> str:
     """将任意字符串转为合法标识符（字母/数字/下划线，不以数字开头）"""
@@ -112,8 +125,7 @@ class RegisterMcpService:
             for t in tools:
                 await RegisterMcpDao.save_tool(t)
 
-        _tool_cache.pop(mcp_id, None)
-
+        await cls.invalidate_server_cache(mcp_id)
 
         return RegisterMcpResponse(mcp_id=mcp_id, remote_url=remote_url, name=name, tool_count=len(tools))
 
@@ -144,6 +156,7 @@ class RegisterMcpService:
             )
 
         await RegisterMcpDao.save_mcp_with_tools(mcp_server, mcp_tools)
+        await cls.invalidate_server_cache(register_mcp_id)
 
         await MCPService.register_and_import_mcp_server(
             server_info={
@@ -166,13 +179,44 @@ class RegisterMcpService:
         logger.info(f"Aggregated {len(schemas)} tools for server: {server_key}")
         return schemas
 
+    @classmethod
+    async def get_tool_executors(cls, server_key: str) -> dict[str, CompiledTool]:
+        """一次查询加载服务下的全部工具并编译，之后的调用直接命中缓存"""
+        executor_cache = _get_executor_cache()
+        if server_key in executor_cache:
+            return executor_cache[server_key]
+        tools = await RegisterMcpDao.get_tools_by_mcp_id(server_key)
+        executors = {t.name: RegisterMcpToolExecute.compile_tool(t) for t in tools}
+        executor_cache[server_key] = executors
+        logger.info(f"Compiled {len(executors)} tool executors for server: {server_key}")
+        return executors
+
+    @classmethod
+    async def invalidate_server_cache(cls, server_key: str):
+        """服务重新注册后清除本节点的工具列表和已编译的执行器，并通知其他节点清除"""
+        cls.clear_local_server_cache(server_key)
+        try:
+            await get_notification_bus().invalidate_server(server_key)
+        except Exception as err:
+            logger.warning(f"Publish MCP server invalidation error: {err}")
+
+    @classmethod
+    def clear_local_server_cache(cls, server_key: Optional[str] = None):
+        """server_key 为空时清除全部缓存"""
+        if server_key is None:
+            _tool_cache.clear()
+            _get_executor_cache().clear()
+            return
+        _tool_cache.pop(server_key, None)
+        _get_executor_cache().pop(server_key, None)
+
     @classmethod
     async def call_tool(cls, server_key: str, tool_name: str, arguments: dict) -> dict:
-        tool = await RegisterMcpDao.get_tool_by_name(server_key, tool_name)
-        if tool is None:
+        executor = (await cls.get_tool_executors(server_key)).get(tool_name)
+        if executor is None:
             logger.warning(f"Tool not found: {tool_name} in server: {server_key}")
             return {"isError": True, "content": [{"type": "text", "text": f"Tool not found: {tool_name}"}]}
-        return await RegisterMcpToolExecute.execute_http_tool(tool, arguments)
+        return await RegisterMcpToolExecute.execute_http_tool(executor, arguments)
 
 
     @classmethod
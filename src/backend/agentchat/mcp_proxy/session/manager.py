@@ -4,18 +4,33 @@ L1: cachetools TTLCache (本地内存)
 L2: Redis (分布式)
 """
 import json
-import socket
 import uuid
+import asyncio
+from loguru import logger
 from datetime import datetime, timezone, timedelta
 from typing import Optional
 import redis.asyncio as aioredis
 from cachetools import TTLCache
 
 from agentchat.mcp_proxy.session.models import McpProxySession, ClientInfo, ClientCapabilities, SessionState
+from agentchat.mcp_proxy.session.notification import get_node_id
+from agentchat.settings import app_settings
 
 
 SESSION_TTL_SECONDS = 1800
 SESSION_KEY_PREFIX = "mcp:session:"
+SESSION_INVALIDATION_CHANNEL = "mcp:session:invalidate"
+# touch 只刷新过期时间，最近访问时间单独保存，不重写整个 session
+SESSION_ACCESSED_KEY_SUFFIX = ":accessed"
+
+# session 仍然存在时刷新过期时间并记录最近访问时间，返回 0 表示 session 已被删除
+_TOUCH_SCRIPT = """
+if redis.call('EXPIRE', KEYS[1], ARGV[2]) == 1 then
+    redis.call('SET', KEYS[2], ARGV[1], 'EX', ARGV[2])
+    return 1
+end
+return 0
+"""
 
 def _session_to_dict(s: McpProxySession) -> dict:
     return {
@@ -62,14 +77,52 @@ def _dict_to_session(d: dict) -> McpProxySession:
 
 
 class SessionManager:
+    """
+    touch_session 使用滑动过期：
+        - 距离上次持久化的时间超过 TTL 的 touch_fraction 时才刷新 Redis 中的过期时间和 last_accessed_at
+        - 需要刷新的 session 先登记，由后台任务按 touch_flush_interval 通过 pipeline 批量写入
+        - 只刷新过期时间和单独保存的 last_accessed_at，不重写 session，避免覆盖其他节点的修改（例如 current_node_id）
+    会话被修改或删除时，通过 Redis Pub/Sub 通知其他节点失效本地 L1 缓存；touch 不通知
+    """
+
     def __init__(self, redis_client: aioredis.Redis):
         self._redis = redis_client
-        self._local: TTLCache = TTLCache(maxsize=1000, ttl=30)
-        self._node_id = socket.gethostname()
+        self._node_id = get_node_id()
+
+        config = app_settings.mcp_proxy
+        self.session_ttl = config.get("session_ttl", SESSION_TTL_SECONDS)
+        self.touch_fraction = config.get("session_touch_fraction", 0.2)
+        self.touch_flush_interval = config.get("session_touch_flush_interval", 1)
+        self._local: TTLCache = TTLCache(maxsize=1000, ttl=config.get("session_local_cache_ttl", 30))
+
+        # 等待批量写入的 session_id -> session
+        self._pending_touches: dict[str, McpProxySession] = {}
+        self._flusher: Optional[asyncio.Task] = None
+        self._invalidation_listener: Optional[asyncio.Task] = None
 
     def _key(self, session_id: str) -> str:
         return f"{SESSION_KEY_PREFIX}{session_id}"
 
+    def _accessed_key(self, session_id: str) -> str:
+        return f"{SESSION_KEY_PREFIX}{session_id}{SESSION_ACCESSED_KEY_SUFFIX}"
+
+    async def start(self):
+        if self._invalidation_listener is None:
+            self._invalidation_listener = asyncio.create_task(self._listen_invalidations())
+        if self._flusher is None:
+            self._flusher = asyncio.create_task(self._flush_touches_periodically())
+
+    async def close(self):
+        for task in (self._flusher, self._invalidation_listener):
+            if task is not None:
+                task.cancel()
+                try:
+                    await task
+                except asyncio.CancelledError:
+                    pass
+        self._flusher = self._invalidation_listener = None
+        await self.flush_touches()
+
     async def create_session(
         self,
         server_name: str,
@@ -79,7 +132,7 @@ class SessionManager:
     ) -> McpProxySession:
         session_id = f"mcp-proxy-{uuid.uuid4().hex[:8]}"
         now = datetime.now(timezone.utc)
-        expires_at = now + timedelta(seconds=SESSION_TTL_SECONDS)
+        expires_at = now + timedelta(seconds=self.session_ttl)
         session = McpProxySession(
             session_id=session_id,
             server_name=server_name,
@@ -101,23 +154,62 @@ class SessionManager:
         if cached:
             return cached
         # L2
-        raw = await self._redis.get(self._key(session_id))
+        raw, accessed = await self._redis.mget(self._key(session_id), self._accessed_key(session_id))
         if not raw:
             return None
         session = _dict_to_session(json.loads(raw))
+        if accessed:
+            accessed_at = datetime.fromisoformat(accessed.decode() if isinstance(accessed, bytes) else accessed)
+            if accessed_at > session.last_accessed_at:
+                session.last_accessed_at = accessed_at
+                session.expires_at = accessed_at + timedelta(seconds=self.session_ttl)
         self._local[session_id] = session
         return session
 
     async def touch_session(self, session_id: str) -> Optional[McpProxySession]:
         session = await self.get_session(session_id)
-        if session:
+        if session and session_id not in self._pending_touches:
+            elapsed = (datetime.now(timezone.utc) - session.last_accessed_at).total_seconds()
+            if elapsed >= self.session_ttl * self.touch_fraction:
+                self._pending_touches[session_id] = session
+                if self._flusher is None:
+                    # 未启动后台任务时（例如脚本中直接使用）立即写入
+                    await self.flush_touches()
+        return session
+
+    async def flush_touches(self):
+        """批量刷新 session 的过期时间和 last_accessed_at，不重写 session 本身，也不通知其他节点"""
+        if not self._pending_touches:
+            return
+        sessions, self._pending_touches = list(self._pending_touches.values()), {}
+
+        now = datetime.now(timezone.utc)
+        async with self._redis.pipeline(transaction=False) as pipe:
+            for session in sessions:
+                session.last_accessed_at = now
+                session.expires_at = now + timedelta(seconds=self.session_ttl)
+                pipe.eval(_TOUCH_SCRIPT, 2, self._key(session.session_id), self._accessed_key(session.session_id),
+                          now.isoformat(), self.session_ttl)
+            results = await pipe.execute()
+
+        for session, saved in zip(sessions, results):
+            if not saved:
+                self._local.pop(session.session_id, None)
+
+    async def assign_node(self, session_id: str) -> Optional[McpProxySession]:
+        """SSE 长连接建立在当前节点，记录会话所在节点"""
+        session = await self.get_session(session_id)
+        if session and session.current_node_id != self._node_id:
+            session.current_node_id = self._node_id
             session.touch()
             await self._save(session)
         return session
 
     async def delete_session(self, session_id: str):
-        await self._redis.delete(self._key(session_id))
+        self._pending_touches.pop(session_id, None)
+        await self._redis.delete(self._key(session_id), self._accessed_key(session_id))
         self._local.pop(session_id, None)
+        await self._publish_invalidation(session_id)
 
     async def exists_session(self, session_id: str) -> bool:
         if session_id in self._local:
@@ -125,6 +217,48 @@ class SessionManager:
         return bool(await self._redis.exists(self._key(session_id)))
 
     async def _save(self, session: McpProxySession):
+        session.expires_at = datetime.now(timezone.utc) + timedelta(seconds=self.session_ttl)
         data = json.dumps(_session_to_dict(session))
-        await self._redis.setex(self._key(session.session_id), SESSION_TTL_SECONDS, data)
+        async with self._redis.pipeline(transaction=False) as pipe:
+            pipe.setex(self._key(session.session_id), self.session_ttl, data)
+            # 最近访问时间已经写在 session 中
+            pipe.delete(self._accessed_key(session.session_id))
+            await pipe.execute()
         self._local[session.session_id] = session
+        await self._publish_invalidation(session.session_id)
+
+    async def _publish_invalidation(self, session_id: str):
+        await self._redis.publish(SESSION_INVALIDATION_CHANNEL, json.dumps({
+            "node_id": self._node_id,
+            "session_ids": [session_id],
+        }))
+
+    async def _flush_touches_periodically(self):
+        while True:
+            await asyncio.sleep(self.touch_flush_interval)
+            try:
+                await self.flush_touches()
+            except Exception as err:
+                logger.error(f"Flush MCP session touches error: {err}")
+
+    async def _listen_invalidations(self):
+        """其他节点修改或删除 session 后，失效本节点的 L1 缓存"""
+        while True:
+            pubsub = self._redis.pubsub(ignore_subscribe_messages=True)
+            try:
+                await pubsub.subscribe(SESSION_INVALIDATION_CHANNEL)
+                async for message in pubsub.listen():
+                    data = json.loads(message["data"])
+                    if data.get("node_id") == self._node_id:
+                        continue
+                    for session_id in data.get("session_ids", []):
+                        self._local.pop(session_id, None)
+            except asyncio.CancelledError:
+                raise
+            except Exception as err:
+                logger.error(f"MCP session invalidation listener disconnected: {err}, reconnecting")
+                # 断开期间可能错过失效消息，清空本地缓存
+                self._local.clear()
+                await asyncio.sleep(1)
+            finally:
+                await pubsub.aclose()
@@ -0,0 +1,239 @@
+"""
+MCP 代理服务端通知总线（Redis Pub/Sub）
+
+多个 worker / 节点部署时，客户端的 GET SSE 长连接只会落在其中一个节点上，
+而触发通知（如 tools/list_changed）的请求可能由任意节点处理：
+    - 路由表：mcp:notify:route:{session_id} -> node_id，记录 SSE 长连接所在节点，随心跳续期
+    - 节点频道：每个节点只订阅自己的 mcp:notify:node:{node_id} 和广播频道
+    - 待投递队列：session 暂时没有 SSE 长连接（尚未建立或正在重连）时，通知先写入
+      mcp:notify:pending:{session_id}，长连接建立后补发
+    - 服务失效频道：注册的 MCP 服务更新后通知所有节点清除本地缓存的工具列表和执行器
+"""
+import os
+import json
+import socket
+import asyncio
+from loguru import logger
+from typing import Callable, Optional
+import redis.asyncio as aioredis
+
+from agentchat.settings import app_settings
+
+ROUTE_KEY_PREFIX = "mcp:notify:route:"
+PENDING_KEY_PREFIX = "mcp:notify:pending:"
+NODE_CHANNEL_PREFIX = "mcp:notify:node:"
+BROADCAST_CHANNEL = "mcp:notify:broadcast"
+SERVER_INVALIDATION_CHANNEL = "mcp:notify:server_invalidate"
+
+# 只有路由仍指向当前节点时才删除，避免误删客户端重连到其他节点后的新路由
+_DELETE_ROUTE_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+
+def get_node_id() -> str:
+    """当前节点标识，同一主机上的多个 worker 通过进程号区分"""
+    return f"{socket.gethostname()}-{os.getpid()}"
+
+
+class NotificationBus:
+
+    def __init__(self, redis_client: aioredis.Redis):
+        self._redis = redis_client
+        self._node_id = get_node_id()
+        # session_id -> asyncio.Queue，本节点上活跃的 SSE 长连接
+        self._queues: dict[str, asyncio.Queue] = {}
+        self._listener: Optional[asyncio.Task] = None
+        # 后台写入待投递队列的任务，保留引用避免被回收
+        self._pending_tasks: set[asyncio.Task] = set()
+        # 其他节点上的 MCP 服务更新后调用
+        self._server_invalidation_handlers: list[Callable[[Optional[str]], None]] = []
+
+        config = app_settings.mcp_proxy
+        self.route_ttl = config.get("notification_route_ttl", 90)
+        self.pending_size = config.get("notification_pending_size", 100)
+        self.pending_ttl = config.get("notification_pending_ttl", 300)
+
+    @property
+    def node_id(self) -> str:
+        return self._node_id
+
+    @property
+    def node_channel(self) -> str:
+        return f"{NODE_CHANNEL_PREFIX}{self._node_id}"
+
+    @property
+    def local_session_count(self) -> int:
+        return len(self._queues)
+
+    async def start(self):
+        if self._listener is None:
+            self._listener = asyncio.create_task(self._listen())
+            logger.info(f"MCP notification bus started on node={self._node_id}")
+
+    async def stop(self):
+        if self._listener is not None:
+            self._listener.cancel()
+            try:
+                await self._listener
+            except asyncio.CancelledError:
+                pass
+            self._listener = None
+        if self._pending_tasks:
+            await asyncio.gather(*self._pending_tasks, return_exceptions=True)
+
+        # 节点下线，清除本节点的路由，之后的通知进入待投递队列
+        for session_id in list(self._queues):
+            await self._delete_route(session_id)
+        self._queues.clear()
+
+    async def subscribe(self, session_id: str) -> asyncio.Queue:
+        """SSE 长连接建立：登记路由，并补发连接建立前积压的通知"""
+        queue: asyncio.Queue = asyncio.Queue()
+        self._queues[session_id] = queue
+        await self._redis.setex(self._route_key(session_id), self.route_ttl, self._node_id)
+
+        pending_key = self._pending_key(session_id)
+        async with self._redis.pipeline(transaction=True) as pipe:
+            pipe.lrange(pending_key, 0, -1)
+            pipe.delete(pending_key)
+            pending, _ = await pipe.execute()
+        for raw in pending:
+            queue.put_nowait(json.loads(raw))
+        if pending:
+            logger.info(f"Delivered {len(pending)} pending notifications to session={session_id}")
+        return queue
+
+    async def refresh(self, session_id: str):
+        """随 SSE 心跳续期路由"""
+        await self._redis.setex(self._route_key(session_id), self.route_ttl, self._node_id)
+
+    async def unsubscribe(self, session_id: str, queue: Optional[asyncio.Queue] = None):
+        """SSE 长连接断开；传入 queue 时只在其仍是当前连接的队列时清理"""
+        if queue is not None and self._queues.get(session_id) is not queue:
+            return
+        self._queues.pop(session_id, None)
+        await self._delete_route(session_id)
+
+    async def close_session(self, session_id: str):
+        """Session 关闭，清除路由以及待投递的通知"""
+        self._queues.pop(session_id, None)
+        await self._redis.delete(self._route_key(session_id), self._pending_key(session_id))
+
+    async def publish(self, session_id: str, notification: dict) -> bool:
+        """
+        向指定 session 推送通知，无论 SSE 长连接在哪个节点
+        返回 True 表示已投递到长连接，False 表示暂存到待投递队列
+        """
+        if queue := self._queues.get(session_id):
+            await queue.put(notification)
+            return True
+
+        node_id = await self._redis.get(self._route_key(session_id))
+        if node_id:
+            message = json.dumps({"session_id": session_id, "notification": notification})
+            if await self._redis.publish(f"{NODE_CHANNEL_PREFIX}{node_id}", message):
+                return True
+            # 节点已下线但路由尚未过期
+            await self._redis.eval(_DELETE_ROUTE_SCRIPT, 1, self._route_key(session_id), node_id)
+
+        await self._store_pending(session_id, notification)
+        return False
+
+    async def broadcast(self, notification: dict) -> int:
+        """向所有节点上的活跃 SSE 长连接广播，返回接收到广播的节点数量"""
+        return await self._redis.publish(BROADCAST_CHANNEL, json.dumps({"notification": notification}))
+
+    def on_server_invalidated(self, handler: Callable[[Optional[str]], None]):
+        """注册服务失效的处理函数，server_key 为 None 时表示清除全部缓存"""
+        self._server_invalidation_handlers.append(handler)
+
+    async def invalidate_server(self, server_key: str):
+        """通知其他节点清除该 MCP 服务的本地缓存"""
+        await self._redis.publish(SERVER_INVALIDATION_CHANNEL, json.dumps({
+            "node_id": self._node_id,
+            "server_key": server_key,
+        }))
+
+    async def _listen(self):
+        while True:
+            pubsub = self._redis.pubsub(ignore_subscribe_messages=True)
+            try:
+                await pubsub.subscribe(self.node_channel, BROADCAST_CHANNEL, SERVER_INVALIDATION_CHANNEL)
+                async for message in pubsub.listen():
+                    self._dispatch(message["channel"], json.loads(message["data"]))
+            except asyncio.CancelledError:
+                raise
+            except Exception as err:
+                logger.error(f"MCP notification bus disconnected: {err}, reconnecting")
+                # 断开期间可能错过服务失效消息
+                for handler in self._server_invalidation_handlers:
+                    handler(None)
+                await asyncio.sleep(1)
+            finally:
+                await pubsub.aclose()
+
+    def _dispatch(self, channel: str, message: dict):
+        if channel == SERVER_INVALIDATION_CHANNEL:
+            if message.get("node_id") != self._node_id:
+                for handler in self._server_invalidation_handlers:
+                    handler(message["server_key"])
+            return
+
+        notification = message["notification"]
+        if channel == BROADCAST_CHANNEL:
+            for queue in self._queues.values():
+                queue.put_nowait(notification)
+            return
+
+        session_id = message["session_id"]
+        if queue := self._queues.get(session_id):
+            queue.put_nowait(notification)
+        else:
+            # 长连接刚刚断开，暂存等待客户端重连
+            logger.warning(f"No active SSE listener for session={session_id} on node={self._node_id}, stored as pending")
+            task = asyncio.create_task(self._store_pending(session_id, notification))
+            self._pending_tasks.add(task)
+            task.add_done_callback(self._on_pending_stored)
+
+    def _on_pending_stored(self, task: asyncio.Task):
+        self._pending_tasks.discard(task)
+        if not task.cancelled() and task.exception():
+            logger.error(f"Store pending MCP notification error: {task.exception()}")
+
+    async def _store_pending(self, session_id: str, notification: dict):
+        pending_key = self._pending_key(session_id)
+        async with self._redis.pipeline(transaction=True) as pipe:
+            pipe.rpush(pending_key, json.dumps(notification))
+            pipe.ltrim(pending_key, -self.pending_size, -1)
+            pipe.expire(pending_key, self.pending_ttl)
+            await pipe.execute()
+
+    async def _delete_route(self, session_id: str):
+        await self._redis.eval(_DELETE_ROUTE_SCRIPT, 1, self._route_key(session_id), self._node_id)
+
+    @staticmethod
+    def _route_key(session_id: str) -> str:
+        return f"{ROUTE_KEY_PREFIX}{session_id}"
+
+    @staticmethod
+    def _pending_key(session_id: str) -> str:
+        return f"{PENDING_KEY_PREFIX}{session_id}"
+
+
+_notification_bus: Optional[NotificationBus] = None
+
+
+def init_notification_bus(redis_client: aioredis.Redis) -> NotificationBus:
+    global _notification_bus
+    _notification_bus = NotificationBus(redis_client)
+    return _notification_bus
+
+
+def get_notification_bus() -> NotificationBus:
+    if _notification_bus is None:
+        raise RuntimeError("MCP notification bus is not initialized")
+    return _notification_bus
@@ -66,6 +66,13 @@ class StorageConfig(BaseModel):
     oss: Optional[OSSConfig] = None
     minio: Optional[MinioConfig] = None
 
+    # 异步存储层配置
+    max_concurrency: int = 8 # 同时进行的上传/下载数量
+    pool_size: int = 16 # HTTP 连接池大小
+    part_size: int = 10 * 1024 * 1024 # 分片上传的分片大小（字节），MinIO 要求不小于 5MB
+    timeout: int = 60 # 单次请求的超时时间，单位秒
+    presign_expiration: int = 3600 # 预签名直传链接的有效期，单位秒
+
     @model_validator(mode="after")
     def validate_storage(self):
         if self.mode == "oss" and not self.oss:
@@ -0,0 +1,194 @@
+"""
+DeepSearch 的证据压缩
+
+搜索结果的原文（raw_content）很长，直接拼接到反思和回答的 Prompt 中会随 查询数 × 循环次数 × 网页长度 增长，
+这里在每次搜索之后把网页压缩成少量相关的段落：
+    - 网页按段落切分，过长的段落再按长度切分
+    - 基于字符 shingle 的 MinHash + LSH 去除近似重复的段落（转载、镜像站、同一网页的不同搜索结果），
+      同一次研究的多个查询、多轮循环共用去重索引
+    - 按与研究主题、当前查询的 Embedding 相似度选出最相关的段落
+    - 每个查询的证据不超过分配给它的 Token 预算（每轮循环的预算按查询数量平均分配）
+"""
+import re
+import zlib
+from itertools import zip_longest
+import numpy as np
+from loguru import logger
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+from agentchat.services.rag.embedding import get_embedding
+from agentchat.settings import app_settings
+from agentchat.utils.common import count_tokens_usage, truncate_text_tokens
+
+_MERSENNE_PRIME = (1 << 31) - 1
+_SPLIT_PATTERN = re.compile(r"\n\s*\n|\n(?=#)")
+
+
+@dataclass
+class Passage:
+    source_index: int  # 在本次搜索结果中的序号
+    position: int  # 在网页中的序号
+    title: str
+    text: str
+    score: float = 0.0
+
+
+def get_evidence_config() -> dict:
+    return {
+        "max_results": 10,  # 每个查询的搜索结果数量
+        "passage_chars": 600,  # 段落的最大字符数
+        "max_candidates": 64,  # 每个查询参与 Embedding 排序的候选段落数量
+        "passage_top_k": 8,  # 每个查询最多保留的段落数量
+        "dedup_threshold": 0.8,  # 估计的 Jaccard 相似度超过该值视为重复
+        "loop_token_budget": 6000,  # 每轮循环全部查询的证据 Token 预算
+        "answer_token_budget": 16000,  # 生成最终答案时证据的 Token 预算
+        **(app_settings.deepsearch or {}),
+    }
+
+
+def split_passages(text: str, max_chars: int) -> List[str]:
+    """按空行 / 标题切分段落，合并过短的段落，切分过长的段落"""
+    passages, buffer = [], ""
+    for block in _SPLIT_PATTERN.split(text or ""):
+        block = block.strip()
+        if not block:
+            continue
+        if len(buffer) + len(block) + 1 <= max_chars:
+            buffer = f"{buffer}\n{block}" if buffer else block
+            continue
+        if buffer:
+            passages.append(buffer)
+        while len(block) > max_chars:
+            passages.append(block[:max_chars])
+            block = block[max_chars:]
+        buffer = block
+    if buffer:
+        passages.append(buffer)
+    return passages
+
+
+class MinHashDeduplicator:
+    """MinHash + LSH 的近似重复检测，shingle 使用字符 n-gram，对中文同样有效"""
+
+    def __init__(self, threshold: float = 0.8, num_perm: int = 64, bands: int = 16, shingle_size: int = 5):
+        self.threshold = threshold
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.shingle_size = shingle_size
+        rng = np.random.default_rng(20240601)
+        self._a = rng.integers(1, _MERSENNE_PRIME, size=num_perm, dtype=np.uint64)
+        self._b = rng.integers(0, _MERSENNE_PRIME, size=num_perm, dtype=np.uint64)
+        self._buckets: Dict[Tuple[int, bytes], List[int]] = {}
+        self._signatures: List[np.ndarray] = []
+
+    def _signature(self, text: str) -> Optional[np.ndarray]:
+        text = re.sub(r"\s+", " ", text).strip().lower()
+        if not text:
+            return None
+        shingles = {text[i:i + self.shingle_size] for i in range(max(1, len(text) - self.shingle_size + 1))}
+        hashes = np.fromiter((zlib.crc32(shingle.encode("utf-8")) for shingle in shingles),
+                             dtype=np.uint64, count=len(shingles))
+        # a < 2^31, hash < 2^32，乘积不会超出 uint64
+        return ((self._a[:, None] * hashes[None, :] + self._b[:, None]) % _MERSENNE_PRIME).min(axis=1)
+
+    def add_if_new(self, text: str) -> bool:
+        """文本与已有文本都不重复时加入索引并返回 True"""
+        signature = self._signature(text)
+        if signature is None:
+            return False
+
+        keys = [(band, signature[band * self.rows:(band + 1) * self.rows].tobytes()) for band in range(self.bands)]
+        candidates = {index for key in keys for index in self._buckets.get(key, [])}
+        for index in candidates:
+            if np.mean(self._signatures[index] == signature) >= self.threshold:
+                return False
+
+        index = len(self._signatures)
+        self._signatures.append(signature)
+        for key in keys:
+            self._buckets.setdefault(key, []).append(index)
+        return True
+
+
+def _normalize(matrix) -> np.ndarray:
+    matrix = np.asarray(matrix, dtype=np.float32)
+    norms = np.linalg.norm(matrix, axis=-1, keepdims=True)
+    return matrix / np.where(norms == 0, 1, norms)
+
+
+class EvidenceCompressor:
+    """一次 DeepSearch 研究使用一个实例，多个查询、多轮循环共用去重索引"""
+
+    def __init__(self, research_topic: str, config: Optional[dict] = None):
+        self.research_topic = research_topic
+        self.config = config or get_evidence_config()
+        self.deduplicator = MinHashDeduplicator(self.config["dedup_threshold"])
+        self._topic_embedding: Optional[np.ndarray] = None
+
+    def _candidate_passages(self, results: List[dict]) -> List[Passage]:
+        """切分段落并去重，各个搜索结果轮流取段落，保证候选段落覆盖多个来源"""
+        per_result = []
+        for index, result in enumerate(results):
+            text = result.get("raw_content") or result.get("content") or ""
+            per_result.append([Passage(index, position, result.get("title", ""), passage)
+                               for position, passage in enumerate(split_passages(text, self.config["passage_chars"]))])
+
+        candidates = []
+        max_candidates = self.config["max_candidates"]
+        for round_passages in zip_longest(*per_result):
+            for passage in round_passages:
+                if passage is not None and self.deduplicator.add_if_new(passage.text):
+                    candidates.append(passage)
+                    if len(candidates) >= max_candidates:
+                        return candidates
+        return candidates
+
+    async def _rank(self, query: str, passages: List[Passage]) -> List[Passage]:
+        try:
+            if self._topic_embedding is None:
+                self._topic_embedding = _normalize(await get_embedding(self.research_topic))
+            embeddings = _normalize(await get_embedding([query] + [passage.text for passage in passages]))
+        except Exception as err:
+            # Embedding 失败时保持搜索引擎给出的顺序
+            logger.warning(f"Rank evidence passages failed: {err}")
+            return passages
+
+        scores = 0.5 * (embeddings[1:] @ self._topic_embedding) + 0.5 * (embeddings[1:] @ embeddings[0])
+        for passage, score in zip(passages, scores):
+            passage.score = float(score)
+        return sorted(passages, key=lambda passage: passage.score, reverse=True)
+
+    async def compress(self, query: str, results: List[dict], query_id, token_budget: int) -> str:
+        """把一次搜索的结果压缩为不超过 token_budget 的证据文本，引用使用 short_url"""
+        passages = self._candidate_passages(results)
+        if not passages:
+            return "未找到相关结果"
+
+        selected, used_tokens = [], 0
+        for passage in (await self._rank(query, passages))[:self.config["passage_top_k"]]:
+            tokens = count_tokens_usage(passage.text)
+            if selected and used_tokens + tokens > token_budget:
+                continue
+            selected.append(passage)
+            used_tokens += tokens
+
+        # 同一来源的段落放在一起，按原网页中的顺序排列
+        grouped: Dict[int, List[Passage]] = {}
+        for passage in sorted(selected, key=lambda passage: (passage.source_index, passage.position)):
+            grouped.setdefault(passage.source_index, []).append(passage)
+
+        evidence = []
+        for source_index, source_passages in grouped.items():
+            title = source_passages[0].title
+            short_url = f"https://search.result/{query_id}-{source_index}"
+            content = "\n".join(passage.text for passage in source_passages)
+            evidence.append(f"[{title}]({short_url})\n内容: {content}")
+
+        logger.info(f"Compressed {len(results)} results of '{query}' into {len(selected)} passages, ~{used_tokens} tokens")
+        return truncate_text_tokens("\n\n".join(evidence), token_budget)
+
+
+def join_evidence(web_research_result: List[str], separator: str, token_budget: int) -> str:
+    """拼接多个查询的证据，超出预算时压缩中间部分"""
+    return truncate_text_tokens(separator.join(web_research_result), token_budget)
@@ -1,16 +1,14 @@
-import os
-from typing import Dict, List
+import json
+import contextvars
+from dataclasses import dataclass
+from typing import Callable, Dict, Optional
 
-from agentchat.services.deepsearch.tools_and_schemas import SearchQueryList, Reflection
-from dotenv import load_dotenv
 from langchain_core.messages import AIMessage
 from langgraph.types import Send
 from langgraph.graph import StateGraph
 from langgraph.graph import START, END
 from langchain_core.runnables import RunnableConfig
-from tavily import TavilyClient
 from loguru import logger
-import json
 
 from agentchat.services.deepsearch.state import (
     OverallState,
@@ -22,28 +20,65 @@ from agentchat.services.deepsearch.configuration import Configuration
 from agentchat.services.deepsearch.prompts import (
     get_current_date,
     query_writer_instructions,
-    web_searcher_instructions,
     reflection_instructions,
     answer_instructions,
 )
 from agentchat.core.models.manager import ModelManager
+from agentchat.services.web_search import get_web_search_service
+from agentchat.services.deepsearch.evidence import EvidenceCompressor, get_evidence_config, join_evidence
+
+"""
+DeepSearch 图，全部节点都是异步的，不占用 LangGraph 的线程池：
+    - 多个查询的 web_research 并发执行，Tavily 的并发数和搜索结果的缓存（跨会话，按查询参数）由 WebSearchService 统一管理
+    - 反思认为信息足够、达到最大循环次数或者没有新的后续查询时直接生成答案
+    - 编译后的图在进程内共用，流式输出和证据压缩通过 contextvars 按单次运行隔离
+"""
+
+# 流式输出回调，由 StreamingGraph 在每次运行时设置
+stream_callback: contextvars.ContextVar[Optional[Callable]] = contextvars.ContextVar('stream_callback', default=None)
+# 单次研究共用的证据压缩器（多个查询、多轮循环共用去重索引）
+evidence_compressor: contextvars.ContextVar[Optional[EvidenceCompressor]] = \
+    contextvars.ContextVar('evidence_compressor', default=None)
+
+
+@dataclass
+class StreamOutput:
+    """流式输出数据结构"""
+    type: str  # streaming, start, complete, error, info
+    node: str
+    content: str
+    metadata: Optional[Dict] = None
+
+
+async def stream_output(node_name: str, content: str, output_type: str = "content", metadata: Optional[Dict] = None):
+    """发送流式输出，没有设置回调时忽略"""
+    callback = stream_callback.get()
+    if callback:
+        try:
+            output = StreamOutput(
+                type=output_type,
+                node=node_name,
+                content=content,
+                metadata=metadata or {}
+            )
+            await callback(output)
+        except Exception as e:
+            logger.error(f"流式输出回调失败: {e}")
+
 
-load_dotenv()
+def parse_json_response(content: str) -> dict:
+    return json.loads(content.replace("```json", "").replace("```", ""))
 
-# 检查Tavily API密钥
-if os.getenv("TAVILY_API_KEY") is None:
-    raise ValueError("TAVILY_API_KEY is not set")
 
-# 初始化Tavily客户端
-tavily_client = TavilyClient(api_key=os.getenv("TAVILY_API_KEY"))
+def query_token_budget(query_count: int) -> int:
+    """每轮循环的证据预算按查询数量平均分配"""
+    return get_evidence_config()["loop_token_budget"] // max(1, query_count)
 
 
 # 节点
-def generate_query(state: OverallState, config: RunnableConfig) -> QueryGenerationState:
+async def generate_query(state: OverallState, config: RunnableConfig) -> QueryGenerationState:
     """LangGraph节点，根据用户问题生成搜索查询。
 
-    使用本地LLM模型基于用户问题创建优化的网络研究搜索查询。
-
     参数:
         state: 包含用户问题的当前图状态
         config: 可运行的配置，包括LLM提供者设置
@@ -57,61 +92,55 @@ def generate_query(state: OverallState, config: RunnableConfig) -> QueryGenerati
     if state.get("initial_search_query_count") is None:
         state["initial_search_query_count"] = configurable.number_of_initial_queries
 
-    # 使用ModelManager获取模型
-    llm = ModelManager.get_conversation_model()
-
-    # 格式化提示词
     current_date = get_current_date()
     research_topic = get_research_topic(state["messages"])
-    
+
     formatted_prompt = f"""
     {query_writer_instructions.format(
         current_date=current_date,
         research_topic=research_topic,
         number_queries=state["initial_search_query_count"],
     )}
-    
+
     请用JSON格式回复，包含以下两个键:
     {{
         "rationale": "简要解释这些查询与研究主题的相关性",
         "query": ["查询1", "查询2", ...]
     }}
     """
-    
-    # 生成搜索查询
-    response = llm.invoke(formatted_prompt)
-    content = response.content
-    
-    # 解析JSON响应
+
+    await stream_output("generate_query", f"开始生成搜索查询，主题：{research_topic}", "start")
+
+    content = ""
+    async for chunk in ModelManager.get_conversation_model().astream(formatted_prompt):
+        content += chunk.content
+
     try:
-        result = json.loads(content)
-        queries = result.get("query", [])
+        queries = parse_json_response(content).get("query", [])
         if not queries:
             # 如果没有查询，使用原始研究主题作为查询
             queries = [research_topic]
+
+        await stream_output("generate_query", f"生成了{len(queries)}个搜索查询", "complete", {"queries": queries})
         return {"search_query": queries}
-    except:
-        # 如果解析失败，使用原始研究主题作为查询
-        logger.error("解析查询生成结果失败，使用原始问题作为查询")
+    except Exception as e:
+        logger.error(f"解析查询生成结果失败: {e}")
+        await stream_output("generate_query", "解析失败，使用原始问题作为查询", "error")
         return {"search_query": [research_topic]}
 
 
 def continue_to_web_research(state: QueryGenerationState):
-    """LangGraph节点，将搜索查询发送到网络研究节点。
-
-    用于为每个搜索查询生成n个网络研究节点。
-    """
+    """LangGraph节点，将搜索查询发送到网络研究节点，多个查询并发执行。"""
+    token_budget = query_token_budget(len(state["search_query"]))
     return [
-        Send("web_research", {"search_query": search_query, "id": int(idx)})
+        Send("web_research", {"search_query": search_query, "id": int(idx), "token_budget": token_budget})
         for idx, search_query in enumerate(state["search_query"])
     ]
 
 
-def web_research(state: WebSearchState, config: RunnableConfig) -> OverallState:
+async def web_research(state: WebSearchState, config: RunnableConfig) -> OverallState:
     """LangGraph节点，使用Tavily搜索API执行网络研究。
 
-    执行网络搜索并格式化结果。
-
     参数:
         state: 包含搜索查询和ID的当前图状态
         config: 可运行的配置
@@ -121,72 +150,61 @@ def web_research(state: WebSearchState, config: RunnableConfig) -> OverallState:
     """
     search_query = state["search_query"]
     query_id = state["id"]
-    
+    evidence_config = get_evidence_config()
+
+    await stream_output("web_research", f"开始搜索：{search_query}", "start", {"query_id": query_id})
     logger.info(f"🔍 执行搜索: {search_query}")
-    
+
     try:
-        # 使用Tavily执行搜索
-        response = tavily_client.search(
+        # 相同的查询参数在缓存有效期内直接复用结果，并发数量由 WebSearchService 限制
+        response = await get_web_search_service().tavily_search(
             query=search_query,
-            max_results=10,
+            max_results=evidence_config["max_results"],
             time_range="month",  # 时间跨度为近一月内的事情
-            include_raw_content="markdown",
-            country="china"
+            include_raw_content="markdown"
         )
-        
-        # 格式化搜索结果
-        formatted_results = format_tavily_results(response)
-        
+
+        # 原文切分为段落后去重、按相关性筛选，控制在预算以内
+        compressor = evidence_compressor.get() or EvidenceCompressor(search_query, evidence_config)
+        formatted_results = await compressor.compress(
+            search_query, response.get("results", []), query_id,
+            state.get("token_budget") or query_token_budget(1)
+        )
+
         # 创建简单的引用标记
         sources = []
         for idx, result in enumerate(response.get("results", [])):
             source_id = f"{query_id}-{idx}"
-            source_url = result.get("url", "")
-            source_title = result.get("title", "未知标题")
             sources.append({
                 "short_url": f"https://search.result/{source_id}",
-                "value": source_url,
-                "label": source_title
+                "value": result.get("url", ""),
+                "label": result.get("title", "未知标题")
             })
-        
-        logger.info(f"✅ 找到 {len(response.get('results', []))} 个结果")
-        
+
+        result_count = len(response.get("results", []))
+        await stream_output("web_research", f"找到 {result_count} 个搜索结果", "complete",
+                            {"result_count": result_count, "query_id": query_id})
+        logger.info(f"✅ 找到 {result_count} 个结果")
+
         return {
             "sources_gathered": sources,
             "search_query": [search_query],
             "web_research_result": [formatted_results],
         }
-    
     except Exception as e:
-        logger.error(f"❌ 搜索失败: {e}")
+        error_msg = f"搜索失败: {str(e)}"
+        await stream_output("web_research", error_msg, "error", {"query_id": query_id})
+        logger.error(f"❌ {error_msg}")
         return {
             "sources_gathered": [],
             "search_query": [search_query],
-            "web_research_result": [f"搜索失败: {str(e)}"],
+            "web_research_result": [error_msg],
         }
 
 
-def format_tavily_results(response: Dict) -> str:
-    """格式化Tavily搜索结果"""
-    if not response.get("results"):
-        return "未找到相关结果"
-
-    formatted = []
-    for idx, result in enumerate(response["results"]):
-        url = result.get("url", "")
-        title = result.get("title", "")
-        content = result.get("content", "")
-        formatted.append(f"[{title}]({url})\n内容: {content}")
-
-    return "\n\n".join(formatted)
-
-
-def reflection(state: OverallState, config: RunnableConfig) -> ReflectionState:
+async def reflection(state: OverallState, config: RunnableConfig) -> ReflectionState:
     """LangGraph节点，识别知识缺口并生成潜在的后续查询。
 
-    分析当前摘要以识别进一步研究的领域，并生成潜在的后续查询。
-    使用结构化输出以JSON格式提取后续查询。
-
     参数:
         state: 包含运行摘要和研究主题的当前图状态
         config: 可运行的配置，包括LLM提供者设置
@@ -194,18 +212,17 @@ def reflection(state: OverallState, config: RunnableConfig) -> ReflectionState:
     返回:
         包含状态更新的字典，包括包含生成的后续查询的search_query键
     """
-    configurable = Configuration.from_runnable_config(config)
     # 增加研究循环计数
     state["research_loop_count"] = state.get("research_loop_count", 0) + 1
-    
-    # 使用ModelManager获取模型
-    llm = ModelManager.get_conversation_model()
 
-    # 格式化提示词
+    await stream_output("reflection", "开始分析研究结果，识别知识缺口", "start",
+                        {"loop_count": state["research_loop_count"]})
+
     current_date = get_current_date()
     research_topic = get_research_topic(state["messages"])
-    summaries = "\n\n---\n\n".join(state["web_research_result"])
-    
+    summaries = join_evidence(state["web_research_result"], "\n\n---\n\n",
+                              get_evidence_config()["answer_token_budget"])
+
     formatted_prompt = f"""
     {reflection_instructions.format(
         current_date=current_date,
@@ -213,23 +230,25 @@ def reflection(state: OverallState, config: RunnableConfig) -> ReflectionState:
         summaries=summaries,
     )}
     """
-    
-    # 生成反思结果
-    response = llm.invoke(formatted_prompt)
-    content = response.content
-    
-    # 解析JSON响应
+
+    response = await ModelManager.get_conversation_model().ainvoke(formatted_prompt)
+
     try:
-        result = json.loads(content)
+        result = parse_json_response(response.content)
         is_sufficient = result.get("is_sufficient", True)
         knowledge_gap = result.get("knowledge_gap", "")
         follow_up_queries = result.get("follow_up_queries", [])
-        
-        logger.info(f"📊 反思结果: {'足够' if is_sufficient else '不足够'}")
+
+        status = "足够" if is_sufficient else "不足够"
+        await stream_output("reflection", f"分析完成：当前信息{status}", "complete",
+                            {"is_sufficient": is_sufficient, "follow_up_count": len(follow_up_queries)})
+
+        logger.info(f"📊 反思结果: {status}")
         if not is_sufficient:
             logger.info(f"💭 知识缺口: {knowledge_gap}")
             logger.info(f"🔄 后续查询: {follow_up_queries}")
-        
+            await stream_output("reflection", f"需要进行{len(follow_up_queries)}个后续查询", "info")
+
         return {
             "is_sufficient": is_sufficient,
             "knowledge_gap": knowledge_gap,
@@ -237,8 +256,9 @@ def reflection(state: OverallState, config: RunnableConfig) -> ReflectionState:
             "research_loop_count": state["research_loop_count"],
             "number_of_ran_queries": len(state["search_query"]),
         }
-    except:
-        logger.error("解析反思结果失败，默认为足够")
+    except Exception as e:
+        logger.error(f"解析反思结果失败: {e}")
+        await stream_output("reflection", "解析反思结果失败，默认为足够", "error")
         return {
             "is_sufficient": True,
             "knowledge_gap": "",
@@ -248,13 +268,10 @@ def reflection(state: OverallState, config: RunnableConfig) -> ReflectionState:
         }
 
 
-def evaluate_research(
-    state: ReflectionState,
-    config: RunnableConfig,
-) -> OverallState:
+async def evaluate_research(state: ReflectionState, config: RunnableConfig) -> OverallState:
     """LangGraph路由函数，确定研究流程中的下一步。
 
-    通过决定是继续收集信息还是基于配置的最大研究循环数来完成摘要，控制研究循环。
+    信息足够、达到最大研究循环数或者没有新的后续查询时生成最终答案，否则并发执行后续查询。
 
     参数:
         state: 包含研究循环计数的当前图状态
@@ -269,43 +286,50 @@ def evaluate_research(
         if state.get("max_research_loops") is not None
         else configurable.max_research_loops
     )
-    if state["is_sufficient"] or state["research_loop_count"] >= max_research_loops:
+
+    # follow_up_queries 会跨循环累加，已经搜索过的查询不再重复执行
+    ran_queries = set(state.get("search_query", []))
+    follow_up_queries = [query for query in dict.fromkeys(state["follow_up_queries"]) if query not in ran_queries]
+
+    if state["is_sufficient"] or state["research_loop_count"] >= max_research_loops or not follow_up_queries:
+        await stream_output("evaluate_research", "研究完成，准备生成最终答案", "complete")
         logger.info("✅ 研究完成，准备生成最终答案")
         return "finalize_answer"
-    else:
-        logger.info("🔄 继续研究，执行后续查询")
-        return [
-            Send(
-                "web_research",
-                {
-                    "search_query": follow_up_query,
-                    "id": state["number_of_ran_queries"] + int(idx),
-                },
-            )
-            for idx, follow_up_query in enumerate(state["follow_up_queries"])
-        ]
+
+    await stream_output("evaluate_research", "继续研究，执行后续查询", "continue")
+    logger.info("🔄 继续研究，执行后续查询")
+    token_budget = query_token_budget(len(follow_up_queries))
+    return [
+        Send(
+            "web_research",
+            {
+                "search_query": follow_up_query,
+                "id": state["number_of_ran_queries"] + int(idx),
+                "token_budget": token_budget,
+            },
+        )
+        for idx, follow_up_query in enumerate(follow_up_queries)
+    ]
 
 
-def finalize_answer(state: OverallState, config: RunnableConfig):
+async def finalize_answer(state: OverallState, config: RunnableConfig):
     """LangGraph节点，完成研究摘要。
 
-    通过去重和格式化源，然后将它们与运行摘要结合，创建一个结构良好的
-    带有适当引用的研究报告，准备最终输出。
+    将收集到的证据与研究主题结合生成带引用的研究报告，并把短URL替换为原始URL。
 
     参数:
         state: 包含运行摘要和收集的源的当前图状态
 
     返回:
-        包含状态更新的字典，包括包含格式化最终摘要和源的running_summary键
+        包含状态更新的字典，包括最终答案和引用到的源
     """
-    # 使用ModelManager获取模型
-    llm = ModelManager.get_conversation_model()
+    await stream_output("finalize_answer", "开始生成最终答案\n", "start")
 
-    # 格式化提示词
     current_date = get_current_date()
     research_topic = get_research_topic(state["messages"])
-    summaries = "\n---\n\n".join(state["web_research_result"])
-    
+    summaries = join_evidence(state["web_research_result"], "\n---\n\n",
+                              get_evidence_config()["answer_token_budget"])
+
     formatted_prompt = f"""
     {answer_instructions.format(
         current_date=current_date,
@@ -313,13 +337,15 @@ def finalize_answer(state: OverallState, config: RunnableConfig):
         summaries=summaries,
     )}
     """
-    
-    # 生成最终答案
-    response = llm.invoke(formatted_prompt)
-    content = response.content
-    
+
+    content = ""
+    async for chunk in ModelManager.get_conversation_model().astream(formatted_prompt):
+        content += chunk.content
+        await stream_output("finalize_answer", chunk.content, "streaming")
+
     logger.info("🎯 生成最终答案完成")
-    
+    await stream_output("finalize_answer", "最终答案生成完成", "complete")
+
     # 将短URL替换为原始URL
     unique_sources = []
     for source in state["sources_gathered"]:
@@ -337,45 +363,48 @@ def get_research_topic(messages):
     """从消息中获取研究主题"""
     if not messages:
         return ""
-    
+
     # 如果只有一条消息，直接返回内容
     if len(messages) == 1:
         return messages[-1].content
-    
+
     # 否则，组合最近的用户消息
     for message in reversed(messages):
         if hasattr(message, 'type') and message.type == 'human':
             return message.content
         if hasattr(message, 'role') and message.role == 'user':
             return message.content
-    
+
     # 如果没有找到用户消息，返回最后一条消息
     return messages[-1].content
 
 
-# 创建我们的智能体图
-builder = StateGraph(OverallState, config_schema=Configuration)
+def create_graph():
+    """创建 DeepSearch 图"""
+    builder = StateGraph(OverallState, config_schema=Configuration)
 
-# 定义我们将循环的节点
-builder.add_node("generate_query", generate_query)
-builder.add_node("web_research", web_research)
-builder.add_node("reflection", reflection)
-builder.add_node("finalize_answer", finalize_answer)
+    # 定义我们将循环的节点
+    builder.add_node("generate_query", generate_query)
+    builder.add_node("web_research", web_research)
+    builder.add_node("reflection", reflection)
+    builder.add_node("finalize_answer", finalize_answer)
+
+    # 将入口点设置为`generate_query`
+    builder.add_edge(START, "generate_query")
+    # 添加条件边以在并行分支中继续搜索查询
+    builder.add_conditional_edges(
+        "generate_query", continue_to_web_research, ["web_research"]
+    )
+    # 对网络研究进行反思
+    builder.add_edge("web_research", "reflection")
+    # 评估研究
+    builder.add_conditional_edges(
+        "reflection", evaluate_research, ["web_research", "finalize_answer"]
+    )
+    # 完成答案
+    builder.add_edge("finalize_answer", END)
+
+    return builder.compile(name="pro-search-agent")
 
-# 将入口点设置为`generate_query`
-# 这意味着这个节点是第一个被调用的
-builder.add_edge(START, "generate_query")
-# 添加条件边以在并行分支中继续搜索查询
-builder.add_conditional_edges(
-    "generate_query", continue_to_web_research, ["web_research"]
-)
-# 对网络研究进行反思
-builder.add_edge("web_research", "reflection")
-# 评估研究
-builder.add_conditional_edges(
-    "reflection", evaluate_research, ["web_research", "finalize_answer"]
-)
-# 完成答案
-builder.add_edge("finalize_answer", END)
 
-graph = builder.compile(name="pro-search-agent")
\ No newline at end of file
+graph = create_graph()
@@ -41,6 +41,7 @@ class QueryGenerationState(TypedDict):
 class WebSearchState(TypedDict):
     search_query: str
     id: str
+    token_budget: int  # 本次搜索的证据 Token 预算
 
 
 @dataclass(kw_only=True)
@@ -0,0 +1,130 @@
+"""
+对话滚动总结调度器
+
+之前每次 AI 回复结束后都会在流式响应里同步检查并调用模型生成总结，总结的耗时会直接算进用户可见的这一轮。
+现在改为后台调度：
+    - 高水位：短期消息（上次总结之后）的 token 总数超过 completion.summary_high_water_tokens 才触发，
+      token 数量直接使用 HistoryTable.token_usage，不重新计算
+    - 后台 worker 从队列中取出对话执行总结，不阻塞请求
+    - 同一对话不会同时进行两次总结：进程内通过待执行集合去重，多节点之间通过 Redis 锁互斥；
+      总结进行中又触发的请求只记录一次，当前总结完成后重新检查
+"""
+import asyncio
+import uuid
+from loguru import logger
+from typing import Optional
+import redis.asyncio as aioredis
+
+from agentchat.settings import app_settings
+
+LOCK_KEY_PREFIX = "dialog:summary:lock:"
+
+# 只有锁仍属于自己时才释放
+_RELEASE_LOCK_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+
+class DialogSummaryScheduler:
+
+    def __init__(self, redis_client: Optional[aioredis.Redis] = None):
+        self._redis = redis_client
+        self._queue: asyncio.Queue = asyncio.Queue()
+        # 已入队或正在执行的对话 dialog_id -> user_id
+        self._scheduled: dict[str, str] = {}
+        self._running: set[str] = set()
+        # 执行过程中再次触发的对话，执行完后重新入队
+        self._rerun: set[str] = set()
+        self._workers: list[asyncio.Task] = []
+
+        config = app_settings.completion
+        self.high_water_tokens = config.get("summary_high_water_tokens", 6000)
+        self.keep_tokens = config.get("summary_keep_tokens", 3000)
+        self.worker_count = config.get("summary_workers", 2)
+        self.lock_ttl = config.get("summary_lock_ttl", 300)
+
+    async def start(self):
+        if not self._workers:
+            self._workers = [asyncio.create_task(self._worker(i)) for i in range(self.worker_count)]
+            logger.info(f"Dialog summary scheduler started with {self.worker_count} workers")
+
+    async def stop(self):
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+
+    def maybe_schedule(self, dialog_id: str, user_id: str, short_term_tokens: int) -> bool:
+        """短期消息 token 数超过高水位时调度一次后台总结，返回是否调度"""
+        if short_term_tokens < self.high_water_tokens:
+            return False
+
+        if dialog_id in self._running:
+            self._rerun.add(dialog_id)
+            return True
+        if dialog_id in self._scheduled:
+            return True
+
+        self._scheduled[dialog_id] = user_id
+        self._queue.put_nowait(dialog_id)
+        return True
+
+    async def _worker(self, index: int):
+        while True:
+            dialog_id = await self._queue.get()
+            user_id = self._scheduled.get(dialog_id)
+            self._running.add(dialog_id)
+            try:
+                await self._summarize(dialog_id, user_id)
+            except asyncio.CancelledError:
+                raise
+            except Exception as err:
+                logger.error(f"Dialog summary worker-{index} failed for dialog={dialog_id}: {err}")
+            finally:
+                self._running.discard(dialog_id)
+                self._scheduled.pop(dialog_id, None)
+                self._queue.task_done()
+
+            if dialog_id in self._rerun:
+                # 总结期间产生了新消息，重新按高水位检查
+                from agentchat.api.services.dialog import DialogService
+                self._rerun.discard(dialog_id)
+                try:
+                    tokens = await DialogService.get_short_term_tokens(dialog_id)
+                    self.maybe_schedule(dialog_id, user_id, tokens)
+                except Exception as err:
+                    logger.error(f"Recheck dialog summary failed for dialog={dialog_id}: {err}")
+
+    async def _summarize(self, dialog_id: str, user_id: str):
+        # 延迟导入，避免与 DialogService 循环导入
+        from agentchat.api.services.dialog import DialogService
+
+        lock_key = f"{LOCK_KEY_PREFIX}{dialog_id}"
+        token = uuid.uuid4().hex
+        if self._redis is not None and not await self._redis.set(lock_key, token, nx=True, ex=self.lock_ttl):
+            logger.info(f"Dialog {dialog_id} is being summarized on another node, skip")
+            return
+
+        try:
+            await DialogService.update_dialog_summary(dialog_id, user_id, cutoff_tokens=self.keep_tokens)
+        finally:
+            if self._redis is not None:
+                await self._redis.eval(_RELEASE_LOCK_SCRIPT, 1, lock_key, token)
+
+
+_summary_scheduler: Optional[DialogSummaryScheduler] = None
+
+
+def init_summary_scheduler(redis_client: Optional[aioredis.Redis] = None) -> DialogSummaryScheduler:
+    global _summary_scheduler
+    _summary_scheduler = DialogSummaryScheduler(redis_client)
+    return _summary_scheduler
+
+
+def get_summary_scheduler() -> DialogSummaryScheduler:
+    if _summary_scheduler is None:
+        raise RuntimeError("Dialog summary scheduler is not initialized")
+    return _summary_scheduler
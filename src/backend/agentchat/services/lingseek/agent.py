@@ -5,10 +5,11 @@ from langchain_core.messages import SystemMessage, HumanMessage, AIMessage, Tool
 from langchain_core.utils.function_calling import convert_to_openai_tool
 
 from agentchat.api.services.mcp_server import MCPService
-from agentchat.api.services.mcp_user_config import MCPUserConfigService
+from agentchat.api.services.mcp_user_config import MCPUserConfigCache
 from agentchat.api.services.usage_stats import UsageStatsService
 from agentchat.api.services.workspace_session import WorkSpaceSessionService
 from agentchat.core.callbacks import usage_metadata_callback
+from agentchat.core.tool_executor import execute_tool_calls, run_sync_tool
 from agentchat.database.models.workspace_session import WorkSpaceSessionCreate, WorkSpaceSessionContext
 from agentchat.prompts.template import GuidePromptTemplate
 from agentchat.schemas.workspace import WorkSpaceAgents
@@ -20,6 +21,8 @@ from agentchat.core.models.manager import ModelManager
 from agentchat.utils.convert import mcp_tool_to_args_schema, convert_mcp_config
 from agentchat.utils.date_utils import get_beijing_time
 from agentchat.services.mcp.manager import MCPManager
+from agentchat.services.lingseek.scheduler import LingSeekTaskScheduler
+from agentchat.settings import app_settings
 from agentchat.prompts.lingseek import GenerateGuidePrompt, FeedBackGuidePrompt, GenerateTitlePrompt, \
     GenerateTaskPrompt, FixJsonPrompt, ToolCallPrompt, SystemMessagePrompt
 from agentchat.schemas.lingseek import LingSeekGuidePrompt, LingSeekGuidePromptFeedBack, LingSeekTask, \
@@ -36,6 +39,8 @@ class LingSeekAgent:
         self.tool_mcp_server_dict = {}
 
         self.user_id = user_id
+        # MCP 用户配置在本次任务中只加载一次
+        self.mcp_user_configs = MCPUserConfigCache(user_id)
 
     async def _generate_guide_prompt(self, lingseek_guide_prompt):
         """
@@ -96,17 +101,11 @@ class LingSeekAgent:
                 agent=WorkSpaceAgents.LingSeekAgent.value))
 
     async def _parse_function_call_response(self, message: AIMessage):
-        tool_messages = []
-        if message.tool_calls:
-            for tool_call in message.tool_calls:
-                tool_name = tool_call.get("name")
-                tool_args = tool_call.get("args")
-                tool_call_id = tool_call.get("id")
+        if not message.tool_calls:
+            return []
 
-                content = await self._process_tools_result(tool_name, tool_args)
-                tool_messages.append(ToolMessage(content=content, name=tool_name, tool_call_id=tool_call_id))
-
-        return tool_messages
+        # 同一轮中的多个工具调用并发执行，结果顺序与 tool_calls 保持一致
+        return await execute_tool_calls(message.tool_calls, self._process_tools_result)
 
     async def generate_tasks(self, lingseek_task: LingSeekTask):
         tools = await self._obtain_lingseek_tools(lingseek_task.plugins, lingseek_task.mcp_servers, lingseek_task.web_search)
@@ -182,38 +181,38 @@ class LingSeekAgent:
         tools = await self._obtain_lingseek_tools(lingseek_task.plugins, lingseek_task.mcp_servers, lingseek_task.web_search)
         tool_call_model = self.tool_call_model.bind_tools(tools) if len(tools) else self.tool_call_model
 
+        # 按照步骤的 input 依赖并发执行，步骤完成即推送结果
+        scheduler = LingSeekTaskScheduler(
+            tasks_graph,
+            max_concurrency=app_settings.lingseek.get("max_concurrency", 4),
+            step_timeout=app_settings.lingseek.get("step_timeout", 120)
+        )
+        step_outputs = {}
+        async for step_id, step_output, step_error in scheduler.run(
+            lambda step: self._execute_task_step(step, tasks_graph, tool_call_model, lingseek_task.query)
+        ):
+            step_info = tasks_graph[step_id]
+            if step_error:
+                step_info.result = f"步骤执行失败: {step_error!r}"
+            else:
+                step_outputs[step_id] = step_output
+            yield {
+                "event": "step_result",
+                "data": {"message": step_info.result or " ", "title": step_info.title, "step_id": step_id}
+            }
+
+        # 合到整体Messages时保持任务声明的顺序，保证最终回答的上下文稳定
         messages: List[BaseMessage] = [SystemMessage(content=SystemMessagePrompt), HumanMessage(content=lingseek_task.query)]
         context_task = []
         for step_id, step_info in tasks_graph.items():
-            step_context = []
-            for input_step in step_info.input:
-                if input_step in tasks_graph:
-                    step_context.append(
-                        tasks_graph[input_step].model_dump()
-                    )
-
-            step_prompt = ToolCallPrompt.format(
-                step_info=step_info,
-                step_context=str(step_context)
-            )
-            step_messages = [SystemMessage(content=step_prompt), HumanMessage(content=lingseek_task.query)]
-            response = await tool_call_model.ainvoke(input=step_messages, config={"callbacks": [usage_metadata_callback]})
-
-            tools_messages = await self._parse_function_call_response(response)
-
-            step_info.result = "\n".join([msg.content for msg in tools_messages])
-
             context_task.append(step_info.model_dump())
-            if tools_messages: # 合到整体Messages
+            response, tools_messages = step_outputs.get(step_id, (None, []))
+            if tools_messages:
                 messages.append(response)
                 messages.extend(tools_messages)
             else:
                 messages.append(HumanMessage(content=lingseek_task.query))
-                messages.append(AIMessage(content=response.content))
-            yield {
-                "event": "step_result",
-                "data": {"message": step_info.result or " ", "title": step_info.title}
-            }
+                messages.append(AIMessage(content=response.content if response else step_info.result))
 
         final_response = ""
         async for chunk in self.conversation_model.astream(messages):
@@ -233,6 +232,26 @@ class LingSeekAgent:
                 answer=final_response
             ))
 
+    async def _execute_task_step(self, step_info: LingSeekTaskStep, tasks_graph, tool_call_model, query):
+        step_context = []
+        for input_step in step_info.input:
+            if input_step in tasks_graph:
+                step_context.append(
+                    tasks_graph[input_step].model_dump()
+                )
+
+        step_prompt = ToolCallPrompt.format(
+            step_info=step_info,
+            step_context=str(step_context)
+        )
+        step_messages = [SystemMessage(content=step_prompt), HumanMessage(content=query)]
+        response = await tool_call_model.ainvoke(input=step_messages, config={"callbacks": [usage_metadata_callback]})
+
+        tools_messages = await self._parse_function_call_response(response)
+
+        step_info.result = "\n".join([msg.content for msg in tools_messages])
+        return response, tools_messages
+
     async def _process_tools_result(self, tool_name, tool_args):
         def find_mcp_tool(tool_name):
             """Find MCP tool by name"""
@@ -242,12 +261,13 @@ class LingSeekAgent:
             return None
 
         if tool := find_mcp_tool(tool_name):
-            mcp_config = await MCPUserConfigService.get_mcp_user_config(self.user_id,
-                                                                        self.tool_mcp_server_dict[tool_name])
+            mcp_config = await self.mcp_user_configs.get(self.tool_mcp_server_dict[tool_name])
             tool_args.update(mcp_config)
             text_content, no_text_content = await tool.coroutine(**tool_args)
+        elif LingSeekPlugins[tool_name].coroutine:
+            text_content = await LingSeekPlugins[tool_name].ainvoke(tool_args)
         else:
-            text_content = LingSeekPlugins[tool_name].invoke(tool_args)
+            text_content = await run_sync_tool(LingSeekPlugins[tool_name].invoke, tool_args)
         return text_content
 
     async def _obtain_lingseek_tools(self, plugins, mcp_servers, enable_web_search=False):
@@ -0,0 +1,90 @@
+import asyncio
+from loguru import logger
+from typing import Dict, Any, Callable, Awaitable, AsyncGenerator, Tuple, Optional
+
+from agentchat.schemas.lingseek import LingSeekTaskStep
+
+
+class LingSeekTaskScheduler:
+    """
+    按照步骤之间声明的 input 依赖关系（DAG）并发执行灵寻的任务列表
+
+    - 所有依赖步骤完成后，该步骤才会被调度执行
+    - 同一时间执行的步骤数量不超过 max_concurrency
+    - 每个步骤单独超时，超时或报错不会中断整个任务图
+    - 步骤每完成一个就产出一个结果，调用方可以立即推送给前端
+    """
+
+    def __init__(self,
+                 tasks_graph: Dict[str, LingSeekTaskStep],
+                 max_concurrency: int = 4,
+                 step_timeout: Optional[float] = 120):
+        self.tasks_graph = tasks_graph
+        self.max_concurrency = max(1, max_concurrency)
+        self.step_timeout = step_timeout
+
+        # 只保留任务图中存在的依赖，"用户问题" 等外部输入不参与调度
+        self.dependencies = {
+            step_id: {input_step for input_step in step.input
+                      if input_step in tasks_graph and input_step != step_id}
+            for step_id, step in tasks_graph.items()
+        }
+
+    async def run(
+        self,
+        execute_step: Callable[[LingSeekTaskStep], Awaitable[Any]]
+    ) -> AsyncGenerator[Tuple[str, Any, Optional[BaseException]], None]:
+        """
+        执行整个任务图，按完成顺序产出 (step_id, result, error)
+
+        Args:
+            execute_step: 执行单个步骤的协程函数
+
+        Yields:
+            step_id: 完成的步骤ID
+            result: 步骤的执行结果，出错时为 None
+            error: 步骤执行中的异常（包含超时），成功时为 None
+        """
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+        pending = list(self.tasks_graph.keys())
+        completed = set()
+        running: Dict[asyncio.Task, str] = {}
+
+        async def run_step(step: LingSeekTaskStep):
+            async with semaphore:
+                return await asyncio.wait_for(execute_step(step), timeout=self.step_timeout)
+
+        def schedule_ready_steps():
+            for step_id in list(pending):
+                if self.dependencies[step_id] <= completed:
+                    pending.remove(step_id)
+                    task = asyncio.create_task(run_step(self.tasks_graph[step_id]))
+                    running[task] = step_id
+
+        try:
+            schedule_ready_steps()
+            while running or pending:
+                if not running:
+                    # 剩余步骤的依赖无法满足（存在环），按照声明顺序放行第一个步骤
+                    step_id = pending[0]
+                    logger.warning(f"LingSeek step {step_id} has unresolvable inputs "
+                                   f"{self.dependencies[step_id] - completed}, run it anyway")
+                    self.dependencies[step_id] = set()
+                    schedule_ready_steps()
+                    continue
+
+                done, _ = await asyncio.wait(running.keys(), return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    step_id = running.pop(task)
+                    completed.add(step_id)
+                    if error := task.exception():
+                        logger.error(f"LingSeek step {step_id} failed: {error!r}")
+                        yield step_id, None, error
+                    else:
+                        yield step_id, task.result(), None
+
+                schedule_ready_steps()
+        finally:
+            # 客户端断开或调用方提前结束时，取消仍在执行的步骤
+            for task in running:
+                task.cancel()
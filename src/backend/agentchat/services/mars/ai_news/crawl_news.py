@@ -178,7 +178,7 @@ def crawl_today_ai_news(url=None):
         session.close()
 
 
-async def crawl_single_ai_news(url):
+def fetch_single_ai_news(url):
     ua = UserAgent()
     headers = {
         "User-Agent": ua.random,
@@ -251,6 +251,11 @@ async def crawl_single_ai_news(url):
         logger.error(f"错误：{e}")
         return None, None
 
+
+async def crawl_single_ai_news(url):
+    # requests 和随机等待都是阻塞调用，放到线程中执行，多个链接可以并发抓取
+    return await asyncio.to_thread(fetch_single_ai_news, url)
+
 if __name__ == "__main__":
     target_url = "https://news.aibase.com/zh/news"
     print(f"开始爬取 {target_url} ...")
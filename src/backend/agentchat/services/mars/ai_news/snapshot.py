@@ -0,0 +1,237 @@
+"""
+AI 日报快照
+
+之前每次有用户调用 crawl_ai_news 都会现场启动浏览器爬取新闻列表、逐条抓取正文、调用模型生成日报并截图，
+一次调用需要几十秒，而同一天里所有用户拿到的日报内容几乎一样。现在改为按天生成共享的快照：
+    - 后台定时刷新：爬取新闻列表，只抓取快照中还没有的新闻（增量），有新内容时才重新生成日报
+    - 快照（新闻原文、Markdown 日报、新闻简述、Markdown 文件和图片的链接）以 JSON 保存在 Redis 中，
+      文件上传到对象存储，所有用户共用
+    - 工具调用时直接读取当天的快照；快照不存在时（刚启动或刚过零点）触发一次刷新并等待，
+      进程内同一时间只有一个刷新任务，多节点之间通过 Redis 锁互斥，未拿到锁的节点等待快照生成
+"""
+import asyncio
+import json
+import time
+import uuid
+import pytz
+from datetime import datetime
+from loguru import logger
+from typing import Optional
+from urllib.parse import urljoin
+import redis.asyncio as aioredis
+
+from agentchat.core.models.manager import ModelManager
+from agentchat.services.mars.ai_news.crawl_news import crawl_single_ai_news, sync_crawl_with_selenium
+from agentchat.services.mars.ai_news.detial_news import NEWS_PROMPT
+from agentchat.services.mars.ai_news.report import generate_news_items, render_report_png
+from agentchat.services.storage import async_storage_client
+from agentchat.settings import app_settings
+from agentchat.utils.file_utils import get_object_storage_base_path
+
+SNAPSHOT_KEY_PREFIX = "mars:ai_news:snapshot:"
+LOCK_KEY_PREFIX = "mars:ai_news:lock:"
+
+# 只有锁仍属于自己时才释放
+_RELEASE_LOCK_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+
+def today_str() -> str:
+    """日报按北京时间的日期划分"""
+    return datetime.now(pytz.timezone('Asia/Shanghai')).strftime("%Y-%m-%d")
+
+
+def public_url(object_name: str) -> str:
+    return urljoin(app_settings.storage.active.base_url.rstrip("/") + "/", object_name.lstrip("/"))
+
+
+def format_news_content(articles: list) -> str:
+    return "".join(f"\n {idx + 1}. 标题：{article['title']}\n内容:{article['content']}\n"
+                   for idx, article in enumerate(articles))
+
+
+class AINewsSnapshotService:
+
+    def __init__(self, redis_client: Optional[aioredis.Redis] = None):
+        self._redis = redis_client
+        # 没有 Redis 时快照只保存在进程内
+        self._local: dict[str, dict] = {}
+        self._refreshing: Optional[asyncio.Task] = None
+        self._task: Optional[asyncio.Task] = None
+
+        config = (app_settings.mars or {}).get("ai_news", {})
+        self.enabled = config.get("enabled", True)
+        self.refresh_interval = config.get("refresh_interval", 1800)
+        self.max_articles = config.get("max_articles", 10)
+        self.crawl_concurrency = config.get("crawl_concurrency", 4)
+        self.render_image = config.get("render_image", True)
+        self.snapshot_ttl = config.get("snapshot_ttl", 172800)
+        self.lock_ttl = config.get("lock_ttl", 600)
+        self.wait_timeout = config.get("wait_timeout", 180)
+
+    async def start(self):
+        if self.enabled and self._task is None:
+            self._task = asyncio.create_task(self._loop())
+            logger.info(f"AI news snapshot refresher started, interval={self.refresh_interval}s")
+
+    async def stop(self):
+        for task in (self._task, self._refreshing):
+            if task is not None:
+                task.cancel()
+                await asyncio.gather(task, return_exceptions=True)
+        self._task = None
+        self._refreshing = None
+
+    async def _loop(self):
+        while True:
+            try:
+                await self.trigger_refresh()
+            except asyncio.CancelledError:
+                raise
+            except Exception as err:
+                logger.error(f"Refresh AI news snapshot failed: {err}")
+            await asyncio.sleep(self.refresh_interval)
+
+    async def get_snapshot(self, day: Optional[str] = None) -> Optional[dict]:
+        day = day or today_str()
+        if self._redis is None:
+            return self._local.get(day)
+        data = await self._redis.get(f"{SNAPSHOT_KEY_PREFIX}{day}")
+        return json.loads(data) if data else None
+
+    async def _save_snapshot(self, snapshot: dict):
+        if self._redis is None:
+            self._local = {snapshot["date"]: snapshot}
+            return
+        await self._redis.set(f"{SNAPSHOT_KEY_PREFIX}{snapshot['date']}", json.dumps(snapshot, ensure_ascii=False),
+                              ex=self.snapshot_ttl)
+
+    async def ensure_snapshot(self) -> dict:
+        """返回当天已生成日报的快照，不存在时触发刷新并等待"""
+        snapshot = await self.get_snapshot()
+        if snapshot and snapshot.get("report_markdown"):
+            return snapshot
+
+        # shield: 等待超时或调用方取消时，刷新任务继续执行，生成的快照留给后续请求
+        await asyncio.wait_for(asyncio.shield(self.trigger_refresh()), timeout=self.wait_timeout)
+        snapshot = await self.get_snapshot()
+        if not snapshot or not snapshot.get("report_markdown"):
+            raise RuntimeError("今日AI日报暂未生成，请稍后再试")
+        return snapshot
+
+    def trigger_refresh(self) -> asyncio.Task:
+        """进程内同一时间只有一个刷新任务，并发的调用方共用同一个任务"""
+        if self._refreshing is None or self._refreshing.done():
+            self._refreshing = asyncio.create_task(self._refresh(today_str()))
+        return self._refreshing
+
+    async def _refresh(self, day: str):
+        lock_key = f"{LOCK_KEY_PREFIX}{day}"
+        token = uuid.uuid4().hex
+        if self._redis is not None and not await self._redis.set(lock_key, token, nx=True, ex=self.lock_ttl):
+            logger.info(f"AI news snapshot of {day} is being refreshed on another node, wait for it")
+            await self._wait_for_other_node(day, lock_key)
+            return
+
+        try:
+            await self._build(day)
+        finally:
+            if self._redis is not None:
+                await self._redis.eval(_RELEASE_LOCK_SCRIPT, 1, lock_key, token)
+
+    async def _wait_for_other_node(self, day: str, lock_key: str):
+        while await self._redis.exists(lock_key):
+            snapshot = await self.get_snapshot(day)
+            if snapshot and snapshot.get("report_markdown"):
+                return
+            await asyncio.sleep(1)
+
+    async def _build(self, day: str):
+        start_time = time.time()
+        snapshot = await self.get_snapshot(day) or {"date": day, "revision": 0, "articles": []}
+
+        _, links = await asyncio.to_thread(sync_crawl_with_selenium, app_settings.default_config.get("mars_daily_url"))
+        # 列表页按发布时间从新到旧排列，只保留最新的若干条
+        links = list(dict.fromkeys(links or []))[:self.max_articles]
+
+        known = {article["link"]: article for article in snapshot["articles"]}
+        new_links = [link for link in links if link not in known]
+        new_articles = await self._crawl_articles(new_links)
+
+        snapshot["checked_at"] = time.time()
+        if not new_articles and snapshot.get("report_markdown"):
+            logger.info(f"No new AI news for {day}, keep snapshot revision {snapshot['revision']}")
+            await self._save_snapshot(snapshot)
+            return
+
+        known.update({article["link"]: article for article in new_articles})
+        articles = [known[link] for link in links if link in known]
+        # 列表页中已经看不到、但之前抓取过的新闻排在后面
+        articles += [article for article in snapshot["articles"] if article["link"] not in links]
+        articles = articles[:self.max_articles]
+        if not articles:
+            raise RuntimeError("未抓取到任何AI新闻")
+
+        news_content = format_news_content(articles)
+        llm_client = ModelManager.get_conversation_model()
+        response = await llm_client.ainvoke(NEWS_PROMPT.format(today=day, news_content=news_content))
+        report_markdown = response.content
+
+        markdown_object = get_object_storage_base_path(f"AI日报-{day}.md")
+        await async_storage_client.upload_file(markdown_object, report_markdown)
+
+        image_url, news_items = None, []
+        if self.render_image:
+            # 图片生成失败不影响 Markdown 日报，继续使用上一版的图片
+            try:
+                news_items = await generate_news_items(news_content)
+                report_date = datetime.strptime(day, "%Y-%m-%d").strftime("%Y年%m月%d日")
+                png_content = await asyncio.to_thread(render_report_png, report_date, news_items)
+                image_object = get_object_storage_base_path(f"AI日报-{day}.png")
+                await async_storage_client.upload_file(image_object, png_content)
+                image_url = public_url(image_object)
+            except Exception as err:
+                logger.error(f"Render AI news report image failed: {err}")
+
+        snapshot.update({
+            "revision": snapshot["revision"] + 1,
+            "articles": articles,
+            "report_markdown": report_markdown,
+            "news_items": news_items or snapshot.get("news_items", []),
+            "markdown_url": public_url(markdown_object),
+            "image_url": image_url or snapshot.get("image_url"),
+            "updated_at": time.time(),
+        })
+        await self._save_snapshot(snapshot)
+        logger.info(f"AI news snapshot of {day} refreshed to revision {snapshot['revision']}: "
+                    f"{len(new_articles)} new / {len(articles)} articles, {time.time() - start_time:.1f}s")
+
+    async def _crawl_articles(self, links: list) -> list:
+        semaphore = asyncio.Semaphore(self.crawl_concurrency)
+
+        async def crawl(link):
+            async with semaphore:
+                title, content = await crawl_single_ai_news(link)
+                return {"link": link, "title": title, "content": content} if title else None
+
+        results = await asyncio.gather(*(crawl(link) for link in links))
+        return [article for article in results if article]
+
+
+_ai_news_snapshot: Optional[AINewsSnapshotService] = None
+
+
+def init_ai_news_snapshot(redis_client: Optional[aioredis.Redis] = None) -> AINewsSnapshotService:
+    global _ai_news_snapshot
+    _ai_news_snapshot = AINewsSnapshotService(redis_client)
+    return _ai_news_snapshot
+
+
+def get_ai_news_snapshot() -> AINewsSnapshotService:
+    if _ai_news_snapshot is None:
+        raise RuntimeError("AI news snapshot service is not initialized")
+    return _ai_news_snapshot
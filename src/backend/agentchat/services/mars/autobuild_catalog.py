@@ -0,0 +1,75 @@
+"""
+Mars 自动构建智能体工具的可选配置目录
+
+auto_build_agent 的工具描述中需要列出用户可见的模型、插件工具、MCP 服务和知识库，
+之前每次 Mars 会话都要查询四张表重新拼接，现在按用户缓存在 Redis 中：
+    - 缓存键带有全局版本号，系统资源（对所有用户可见）变更时更新版本号，所有用户的缓存同时失效
+    - 只影响单个用户的变更只删除该用户的缓存
+    - 缓存带过期时间，兜底没有经过 Service 的变更
+"""
+import time
+from loguru import logger
+from typing import Optional
+
+from agentchat.database.models.user import AdminUser, SystemUser
+from agentchat.services.redis import redis_client
+from agentchat.settings import app_settings
+
+CATALOG_VERSION_KEY = "mars:autobuild_catalog:version"
+CATALOG_CACHE_KEY = "mars:autobuild_catalog:{}:{}"
+
+
+def _catalog_ttl() -> int:
+    return (app_settings.mars or {}).get("autobuild_catalog_ttl", 600)
+
+
+def _current_version():
+    try:
+        return redis_client.get(CATALOG_VERSION_KEY) or 0
+    except Exception as err:
+        logger.warning(f"Read autobuild catalog version error: {err}")
+        return None
+
+
+async def get_auto_build_catalog(user_id: Optional[str]) -> str:
+    """返回用户的自动构建配置目录，缓存未命中时查询数据库并写回缓存"""
+    # 延迟导入，避免 api.services 与 mars 工具之间循环导入
+    from agentchat.services.mars.mars_tools.autobuild import construct_auto_build_prompt
+
+    version = _current_version()
+    if version is None:
+        return await construct_auto_build_prompt(user_id)
+
+    cache_key = CATALOG_CACHE_KEY.format(version, user_id)
+    try:
+        catalog = redis_client.get(cache_key)
+        if catalog is not None:
+            return catalog
+    except Exception as err:
+        logger.warning(f"Read autobuild catalog cache error: {err}")
+
+    catalog = await construct_auto_build_prompt(user_id)
+    try:
+        redis_client.set(cache_key, catalog, expiration=_catalog_ttl())
+    except Exception as err:
+        logger.warning(f"Write autobuild catalog cache error: {err}")
+    return catalog
+
+
+def invalidate_auto_build_catalog(user_id: Optional[str] = None):
+    """
+    模型、工具、MCP 服务、知识库变更后调用
+    不传 user_id 或者是系统 / 管理员的资源时，所有用户的目录都会失效
+    """
+    try:
+        if user_id and user_id not in (SystemUser, AdminUser):
+            version = redis_client.get(CATALOG_VERSION_KEY) or 0
+            # 管理员可以看到所有用户的知识库
+            for cached_user_id in (user_id, AdminUser):
+                redis_client.delete(CATALOG_CACHE_KEY.format(version, cached_user_id))
+        else:
+            # 版本号使用时间戳，过期后也不会与旧版本重复；版本号的保存时间长于目录缓存，
+            # 版本号过期时旧版本的目录缓存一定已经过期
+            redis_client.set(CATALOG_VERSION_KEY, time.time_ns(), expiration=_catalog_ttl() * 2)
+    except Exception as err:
+        logger.warning(f"Invalidate autobuild catalog cache error: {err}")
@@ -1,22 +1,22 @@
-import asyncio
-import copy
 import time
 from loguru import logger
 from typing import List, Dict, Any
 from pydantic import BaseModel
 from langgraph.types import Command
 from langchain_core.tools import BaseTool
-from langchain.agents.middleware import wrap_tool_call, after_model, ToolCallLimitMiddleware
+from langchain.agents.middleware import wrap_tool_call, ToolCallLimitMiddleware
 from langgraph.prebuilt.tool_node import ToolCallRequest
-from langchain.agents import AgentState, create_agent
+from langchain.agents import create_agent
 from langchain_core.messages import BaseMessage, AIMessage, ToolMessage, AIMessageChunk
 
 from agentchat.api.services.usage_stats import UsageStatsService
 from agentchat.core.callbacks.usage_metadata import UsageMetadataCallbackHandler
 from agentchat.core.models.manager import ModelManager
 from agentchat.schemas.usage_stats import UsageStatsAgentType
+from agentchat.services.mars.autobuild_catalog import get_auto_build_catalog
 from agentchat.services.mars.mars_tools import MarsTool
-from agentchat.services.mars.mars_tools.autobuild import construct_auto_build_prompt
+from agentchat.services.mars.stream_mux import StreamMultiplexer
+from agentchat.settings import app_settings
 
 
 class MarsConfig(BaseModel):
@@ -34,6 +34,7 @@ class MarsAgent:
     def __init__(self, mars_config: MarsConfig):
         self.mars_tools = None
         self.mars_config = mars_config
+        self.stream_mux = None
 
 
     async def init_mars_agent(self):
@@ -47,10 +48,9 @@ class MarsAgent:
         mars_tools = []
         for name in MarsTool:
             if name == "auto_build_agent":
-                auto_build_prompt = await construct_auto_build_prompt(self.mars_config.user_id)
-                mars_tool = copy.deepcopy(MarsTool[name])
-                mars_tool.description = mars_tool.description.replace("{{{user_configs_placeholder}}}", auto_build_prompt)
-                mars_tools.append(mars_tool)
+                auto_build_prompt = await get_auto_build_catalog(self.mars_config.user_id)
+                description = MarsTool[name].description.replace("{{{user_configs_placeholder}}}", auto_build_prompt)
+                mars_tools.append(MarsTool[name].model_copy(update={"description": description}))
             else:
                 mars_tools.append(MarsTool[name])
         return mars_tools
@@ -77,16 +77,6 @@ class MarsAgent:
             thread_limit=1
         )
 
-        @after_model
-        async def handler_after_model(
-            state: AgentState,
-            runtime,
-        ) -> dict[str, Any] | None:
-            last_message = state["messages"][-1]
-            if not last_message.tool_calls:
-                await self.mars_output_queue.put(None)
-            return None
-
         @wrap_tool_call
         async def handler_tool_call(
             request: ToolCallRequest,
@@ -96,21 +86,18 @@ class MarsAgent:
             tool_result = await handler(request)
             return ToolMessage(content=tool_result, name=request.tool_call["name"], tool_call_id=request.tool_call["id"])
 
-        return [tool_call_limiter, handler_after_model, handler_tool_call]
+        return [tool_call_limiter, handler_tool_call]
 
 
     async def ainvoke_stream(self, messages: List[BaseMessage]):
-        # 用于中断推理模型输出的事件
-        self.reasoning_interrupt = asyncio.Event()
-        # 用于存放Mars Agent输出的队列
-        self.mars_output_queue = asyncio.Queue()
-
         self.is_call_tool = False
+        # 推理模型和 Mars Agent 的事件流在后台并行读取，Agent 的输出在推理结束后再输出
+        self.stream_mux = StreamMultiplexer((app_settings.mars or {}).get("stream_buffer_size", 64))
 
         callback = UsageMetadataCallbackHandler()
         async def run_mars_agent():
             """
-            运行Mars Agent，执行工具调用并将其输出放入队列。
+            运行Mars Agent，执行工具调用并输出工具中的信息。
             """
             async for token, chunk in self.react_agent.astream(
                 input={"messages": messages},
@@ -118,40 +105,28 @@ class MarsAgent:
                 stream_mode=["custom"]
             ):
                 self.is_call_tool = True
-                await self.mars_output_queue.put(chunk)
-
-            await self.mars_output_queue.put(None)
+                yield chunk
 
         async def run_reasoning_model():
             """
-            运行推理模型，流式输出思考过程，并随时响应中断事件。
+            运行推理模型，流式输出思考过程。
             """
-            try:
-                response = await self.reasoning_model.astream(messages)
-                async for chunk in response:
-                    # 在每次输出前检查是否需要中断
-                    if self.reasoning_interrupt.is_set():
-                        break
-
-                    delta = chunk.choices[0].delta
-                    if hasattr(delta, "reasoning_content") and delta.reasoning_content is not None:
-                        yield {
-                            "type": "reasoning_chunk",
-                            "time": time.time(),
-                            "data": delta.reasoning_content
-                        }
-
-                    if hasattr(delta, "content") and delta.content:
-                        if self.is_call_tool: # 如果调用Mars工具的话 使用工具里面的信息进行回答
-                            break
-                        else:
-                            yield {
-                                "type": "response_chunk",
-                                "time": time.time(),
-                                "data": delta.content
-                            }
-            except Exception as e:
-                logger.error(f"推理模型流式输出错误: {e}")
+            response = await self.reasoning_model.astream(messages)
+            async for chunk in response:
+                delta = chunk.choices[0].delta
+                if hasattr(delta, "reasoning_content") and delta.reasoning_content is not None:
+                    yield {
+                        "type": "reasoning_chunk",
+                        "time": time.time(),
+                        "data": delta.reasoning_content
+                    }
+
+                if hasattr(delta, "content") and delta.content:
+                    yield {
+                        "type": "response_chunk",
+                        "time": time.time(),
+                        "data": delta.content
+                    }
 
         # --- 主执行流程 ---
 
@@ -162,22 +137,28 @@ class MarsAgent:
             "data": "#### 现在开始，我会边梳理思路边完成这项任务😊\n"
         }
 
-        # 在后台启动Mars Agent任务
-        mars_task = asyncio.create_task(run_mars_agent())
-
-        # 首先，流式输出推理模型的思考过程，直到被中断
-        async for reasoning_chunk in run_reasoning_model():
-            yield reasoning_chunk
-
-        # 推理过程结束后，开始处理并输出Mars Agent的结果
-        while True:
-            mars_chunk = await self.mars_output_queue.get()
-            if mars_chunk is None:  # 收到结束信号
-                break
-            yield mars_chunk
-
-        # 确保Mars Agent任务已彻底完成
-        await mars_task
+        self.stream_mux.add("mars_agent", run_mars_agent())
+        self.stream_mux.add("reasoning", run_reasoning_model())
+        try:
+            # 首先，流式输出推理模型的思考过程
+            async for reasoning_chunk in self.stream_mux.iterate("reasoning"):
+                # 如果调用Mars工具的话 使用工具里面的信息进行回答，不再输出推理模型的回答
+                if reasoning_chunk["type"] == "response_chunk" and self.is_call_tool:
+                    await self.stream_mux.cancel("reasoning")
+                    break
+                yield reasoning_chunk
+
+            # 推理过程结束后，开始处理并输出Mars Agent的结果
+            async for mars_chunk in self.stream_mux.iterate("mars_agent"):
+                yield mars_chunk
+        finally:
+            # 正常结束、客户端断开或者消费方提前退出时，都取消仍在执行的事件流
+            await self.stream_mux.close()
+
+    def stop_streaming(self):
+        """客户端断开连接时的回调"""
+        if self.stream_mux is not None:
+            self.stream_mux.close_nowait()
 
     async def _record_agent_token_usage(self, response: AIMessage | AIMessageChunk | BaseMessage, model):
         if response.usage_metadata:
@@ -0,0 +1,80 @@
+"""
+Mars 事件流的多路复用
+
+Mars 同时运行推理模型和工具调用 Agent 两个事件流，之前 Agent 的输出放在无界队列中，
+客户端断开后两个流都会继续执行到结束。这里统一管理：
+    - 每个事件流由一个后台任务读取，写入各自的有界队列；队列满时后台任务等待消费（背压），
+      推理模型输出期间 Agent 的工具输出最多缓冲 maxsize 条
+    - 消费方按需要的顺序读取各个事件流，提前结束某个流时取消对应的后台任务
+    - close() 取消全部后台任务，客户端断开或响应结束时调用
+"""
+import asyncio
+from loguru import logger
+from typing import Any, AsyncIterator, Dict
+
+_END = object()
+
+
+class _Source:
+
+    def __init__(self, name: str, stream: AsyncIterator[Any], maxsize: int):
+        self.name = name
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize)
+        self.task = asyncio.create_task(self._pump(stream))
+
+    async def _pump(self, stream: AsyncIterator[Any]):
+        try:
+            async for item in stream:
+                await self.queue.put(item)
+        except asyncio.CancelledError:
+            raise
+        except Exception as err:
+            logger.error(f"Mars stream '{self.name}' failed: {err}")
+        finally:
+            # 在 put 处被取消时事件流停在 yield 上，需要主动关闭，执行其中的清理逻辑
+            if hasattr(stream, "aclose"):
+                await stream.aclose()
+            # 队列已满且没有消费者时不能阻塞在结束标记上
+            if not self.queue.full():
+                self.queue.put_nowait(_END)
+
+
+class StreamMultiplexer:
+
+    def __init__(self, maxsize: int = 64):
+        self.maxsize = maxsize
+        self._sources: Dict[str, _Source] = {}
+
+    def add(self, name: str, stream: AsyncIterator[Any]):
+        """在后台开始读取一个事件流"""
+        self._sources[name] = _Source(name, stream, self.maxsize)
+
+    async def iterate(self, name: str) -> AsyncIterator[Any]:
+        """按顺序读取某个事件流的输出，直到该流结束"""
+        source = self._sources[name]
+        while True:
+            if source.task.done() and source.queue.empty():
+                return
+            item = await source.queue.get()
+            if item is _END:
+                return
+            yield item
+
+    async def cancel(self, name: str):
+        source = self._sources.get(name)
+        if source is not None and not source.task.done():
+            source.task.cancel()
+            await asyncio.gather(source.task, return_exceptions=True)
+
+    async def close(self):
+        tasks = [source.task for source in self._sources.values() if not source.task.done()]
+        for task in tasks:
+            task.cancel()
+        if tasks:
+            await asyncio.gather(*tasks, return_exceptions=True)
+            logger.info(f"Cancelled {len(tasks)} unfinished Mars streams")
+
+    def close_nowait(self):
+        """在同步回调（例如客户端断开）中取消全部后台任务"""
+        for source in self._sources.values():
+            source.task.cancel()
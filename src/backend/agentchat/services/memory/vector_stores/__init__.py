@@ -1,10 +1,11 @@
 from agentchat.settings import app_settings
-from agentchat.services.memory.vector_stores.chroma import ChromaDB
 
 class VectorStoreManager:
 
     @classmethod
     def get_chroma_vector(cls):
+        # 第一次使用时再导入 chromadb
+        from agentchat.services.memory.vector_stores.chroma import ChromaDB
         return ChromaDB(
             collection_name=app_settings.default_config.get("memory_collection_name")
         )
@@ -1,14 +1,12 @@
 import asyncio
 import os
 import tempfile
-import aiofiles
-import pymupdf4llm
 import pathlib
 from urllib.parse import urljoin
 from loguru import logger
 
 from agentchat.settings import app_settings
-from agentchat.services.storage import storage_client
+from agentchat.services.storage import async_storage_client
 from agentchat.services.rag.doc_parser.markdown import markdown_parser
 from agentchat.services.rewrite.markdown_rewrite import markdown_rewriter
 from agentchat.utils.file_utils import get_object_storage_base_path, get_convert_markdown_images_dir, \
@@ -23,6 +21,7 @@ class PDFParser:
     async def convert_markdown(self, file_path: str):
         # 保证markdown和images 在同一目录下
         markdown_dir, images_dir = get_convert_markdown_images_dir()
+        import pymupdf4llm  # 导入较慢，第一次解析 PDF 时再导入
         md_text_words = pymupdf4llm.to_markdown(
             doc=file_path,
             write_images=True,
@@ -49,14 +48,12 @@ class PDFParser:
         return await markdown_parser.parse_into_chunks(file_id, markdown_file, knowledge_id)
 
     async def upload_file_to_oss(self, file_path):
-        async with aiofiles.open(file_path, "rb") as file:
-            file_content = await file.read()
-            oss_object_name = get_object_storage_base_path(os.path.basename(file_path))
-            sign_url = urljoin(app_settings.storage.active.base_url, oss_object_name)
+        oss_object_name = get_object_storage_base_path(os.path.basename(file_path))
+        sign_url = urljoin(app_settings.storage.active.base_url, oss_object_name)
 
-            storage_client.sign_url_for_get(sign_url)
-            storage_client.upload_file(oss_object_name, file_content)
-            return sign_url
+        # 流式上传，并发数量由存储客户端统一限制
+        await async_storage_client.upload_local_file(oss_object_name, file_path)
+        return sign_url
 
     async def upload_folder_to_oss(self, file_dir):
         tasks = []
@@ -0,0 +1,79 @@
+import math
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+from agentchat.schemas.search import SearchModel
+
+RRF = "rrf"
+MIN_MAX = "minmax"
+Z_SCORE = "zscore"
+
+
+@dataclass
+class RankedList:
+    """某个检索后端对某个（重写后的）查询返回的结果，按分数从高到低排列"""
+    source: str  # es / milvus
+    query: str
+    documents: List[SearchModel]
+
+
+def _normalized_scores(documents: List[SearchModel], method: str) -> List[float]:
+    scores = [float(doc.score) for doc in documents]
+    if not scores:
+        return []
+
+    if method == Z_SCORE:
+        mean = sum(scores) / len(scores)
+        std = math.sqrt(sum((score - mean) ** 2 for score in scores) / len(scores))
+        if std == 0:
+            return [0.0] * len(scores)
+        return [(score - mean) / std for score in scores]
+
+    low, high = min(scores), max(scores)
+    if high == low:
+        return [1.0] * len(scores)
+    return [(score - low) / (high - low) for score in scores]
+
+
+def fuse_ranked_lists(ranked_lists: List[RankedList], method: str = RRF, weights: Optional[Dict[str, float]] = None,
+                      rrf_k: int = 60, list_depth: Optional[int] = None, limit: Optional[int] = None) -> List[SearchModel]:
+    """
+    融合多个检索结果列表，按 chunk_id 去重，返回按融合分数从高到低排列的文档
+
+    BM25 与向量相似度的分数不在同一个尺度上，不能直接混合排序：
+        - rrf: 只使用名次，score = Σ weight / (rrf_k + rank)
+        - minmax / zscore: 每个列表内部先归一化分数，再按权重求和
+
+    文档的 score 会被替换为融合后的分数
+    """
+    weights = weights or {}
+    fused_scores: Dict[str, float] = {}
+    documents: Dict[str, SearchModel] = {}
+
+    for ranked_list in ranked_lists:
+        weight = weights.get(ranked_list.source, 1.0)
+        candidates = ranked_list.documents[:list_depth] if list_depth else ranked_list.documents
+        if method == RRF:
+            scores = [1.0 / (rrf_k + rank) for rank in range(1, len(candidates) + 1)]
+        else:
+            scores = _normalized_scores(candidates, method)
+
+        seen = set()
+        for doc, score in zip(candidates, scores):
+            # 同一个列表中重复的文档（例如多个知识库返回相同的分块）只计算名次最高的一次
+            if doc.chunk_id in seen:
+                continue
+            seen.add(doc.chunk_id)
+            fused_scores[doc.chunk_id] = fused_scores.get(doc.chunk_id, 0.0) + weight * score
+            documents.setdefault(doc.chunk_id, doc)
+
+    ranked_ids = sorted(fused_scores, key=fused_scores.get, reverse=True)
+    if limit:
+        ranked_ids = ranked_ids[:limit]
+
+    results = []
+    for chunk_id in ranked_ids:
+        doc = documents[chunk_id]
+        doc.score = fused_scores[chunk_id]
+        results.append(doc)
+    return results
@@ -1,6 +1,7 @@
 from loguru import logger
 from typing import Optional
 from agentchat.services.rag.retrieval import MixRetrival
+from agentchat.services.rag.fusion import fuse_ranked_lists
 from agentchat.services.rewrite.query_write import query_rewriter
 from agentchat.services.rag.es_client import client as es_client
 from agentchat.services.rag.vector_stores import milvus_client
@@ -24,32 +25,20 @@ class RagHandler:
 
     @classmethod
     async def mix_retrival_documents(cls, query_list, knowledges_id, search_field="summary"):
-
-        if app_settings.rag.enable_elasticsearch:
-            es_documents, milvus_documents = await MixRetrival.mix_retrival_documents(query_list, knowledges_id, search_field)
-            # 先对ES和Milvus结果分别排序
-            es_documents.sort(key=lambda x: x.score, reverse=True)
-            milvus_documents.sort(key=lambda x: x.score, reverse=True)
-            all_documents = es_documents + milvus_documents
-        else:
-            all_documents = await MixRetrival.retrival_milvus_documents(query_list, knowledges_id, search_field)
-
-        # 合并并去重，保留分数更高的文档
-        documents = []
-        seen_chunk_ids = set()
-
-        # 按分数从高到低排序
-        all_documents.sort(key=lambda x: x.score, reverse=True)
-        
-        # 去重，保留分数最高的
-        for doc in all_documents:
-            if doc.chunk_id not in seen_chunk_ids:
-                seen_chunk_ids.add(doc.chunk_id)
-                documents.append(doc)
-                if len(documents) >= 10:  # 限制返回10个文档
-                    break
-        
-        return documents
+        fusion_config = app_settings.rag.retrival.get("fusion") or {}
+        ranked_lists = await MixRetrival.retrival_ranked_lists(
+            query_list, knowledges_id, search_field, app_settings.rag.enable_elasticsearch)
+
+        # ES 的 BM25 分数与向量相似度不可直接比较，按后端、按查询分别排名后融合，
+        # 只把融合后排名靠前的候选文档送去重排序
+        return fuse_ranked_lists(
+            ranked_lists,
+            method=fusion_config.get("method", "rrf"),
+            weights=fusion_config.get("weights"),
+            rrf_k=fusion_config.get("rrf_k", 60),
+            list_depth=fusion_config.get("list_depth", 20),
+            limit=fusion_config.get("candidate_depth", 10),
+        )
 
     @classmethod
     async def rag_query_summary(cls, query, knowledges_id, min_score: Optional[float]=None,
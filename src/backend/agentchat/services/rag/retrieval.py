@@ -1,4 +1,8 @@
+import asyncio
+from typing import List
+
 from agentchat.services.rag.es_client import client as es_client
+from agentchat.services.rag.fusion import RankedList
 from agentchat.services.rag.vector_stores import milvus_client
 
 
@@ -10,7 +14,12 @@ class MixRetrival:
         documents = []
         queries = query if isinstance(query, list) else [query]
 
+        # 支持跨知识库检索的向量库一次调用检索全部知识库
+        cross_knowledge = hasattr(milvus_client, "search_knowledges")
         for query in queries:
+            if cross_knowledge:
+                documents += await milvus_client.search_knowledges(query, knowledges_id, search_field=search_field)
+                continue
             for knowledge_id in knowledges_id:
                 if search_field == "summary":
                     documents += await milvus_client.search_summary(query, knowledge_id)
@@ -43,3 +52,16 @@ class MixRetrival:
             milvus_documents += await cls.retrival_milvus_documents(query, knowledges_id, search_field)
 
         return es_documents, milvus_documents
+
+    @classmethod
+    async def retrival_ranked_lists(cls, query_list, knowledges_id, search_field, enable_es: bool) -> List[RankedList]:
+        """每个重写后的查询、每个检索后端分别得到一个按分数排序的结果列表，各查询并发检索"""
+        async def ranked(source, query, retrival):
+            documents = await retrival(query, knowledges_id, search_field)
+            documents.sort(key=lambda doc: doc.score, reverse=True)
+            return RankedList(source=source, query=query, documents=documents)
+
+        tasks = [ranked("milvus", query, cls.retrival_milvus_documents) for query in query_list]
+        if enable_es:
+            tasks += [ranked("es", query, cls.retrival_es_documents) for query in query_list]
+        return list(await asyncio.gather(*tasks))
@@ -1,12 +1,42 @@
-from agentchat.services.rag.vector_stores.milvus import MilvusClient
-from agentchat.services.rag.vector_stores.chroma import ChromaClient
-from agentchat.services.rag.vector_stores.milvus_lite import MilvusLiteClient
+import threading
+from typing import Any
+
 from agentchat.settings import app_settings
 
-milvus_client = None
-if app_settings.rag.vector_db.get("mode") == "chroma":
-    milvus_client = ChromaClient()
-elif app_settings.rag.vector_db.get("mode") == "lite":
-    milvus_client = MilvusLiteClient()
-else:
-    milvus_client = MilvusClient()
\ No newline at end of file
+
+class LazyVectorDBClient:
+    """
+    向量库客户端的延迟初始化代理
+
+    chromadb / pymilvus / numpy 导入较慢，并且客户端初始化时会建立连接，
+    这里推迟到第一次使用时再导入和连接，不影响服务启动速度
+    """
+
+    def __init__(self):
+        self._client = None
+        self._lock = threading.Lock()
+
+    def get_client(self):
+        if self._client is None:
+            with self._lock:
+                if self._client is None:
+                    mode = app_settings.rag.vector_db.get("mode")
+                    if mode == "chroma":
+                        from agentchat.services.rag.vector_stores.chroma import ChromaClient
+                        self._client = ChromaClient()
+                    elif mode == "numpy":
+                        from agentchat.services.rag.vector_stores.numpy_store import NumpyVectorClient
+                        self._client = NumpyVectorClient()
+                    elif mode == "lite":
+                        from agentchat.services.rag.vector_stores.milvus_lite import MilvusLiteClient
+                        self._client = MilvusLiteClient()
+                    else:
+                        from agentchat.services.rag.vector_stores.milvus import MilvusClient
+                        self._client = MilvusClient()
+        return self._client
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self.get_client(), name)
+
+
+milvus_client = LazyVectorDBClient()
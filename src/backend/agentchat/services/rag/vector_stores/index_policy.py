@@ -0,0 +1,160 @@
+import json
+import math
+from loguru import logger
+from typing import Dict, List, Optional
+
+# 相似度越大越相近的度量
+SIMILARITY_METRICS = {"COSINE", "IP"}
+
+# 默认的索引分级：按集合的数据量从小到大匹配第一个满足 max_entities 的档位
+DEFAULT_INDEX_TIERS = [
+    # 数据量很小时暴力检索即可，召回率 100%，没有建索引的开销
+    {"max_entities": 20000, "index_type": "FLAT"},
+    # 中等规模使用 HNSW，延迟低、召回率高，但每个向量额外占用 M * 8 字节左右的图结构
+    {"max_entities": 2000000, "index_type": "HNSW", "params": {"M": 16, "efConstruction": 200}},
+    # 大规模使用标量量化，每个向量从 4 字节/维压缩到 1 字节/维
+    {"max_entities": None, "index_type": "IVF_SQ8"},
+]
+
+# 不同召回目标下的检索参数倍数（HNSW 的 ef、IVF 的 nprobe、DiskANN 的 search_list）
+RECALL_FACTORS = {"fast": 0.5, "balanced": 1.0, "high": 2.0}
+
+
+class IndexPolicy:
+    """
+    Milvus 向量索引的选择策略
+
+    按集合的数据量选择索引类型（FLAT / HNSW / IVF_SQ8 / IVF_PQ / DISKANN），并生成对应的建索引参数和检索参数：
+        - 数据量跨过档位时需要重建索引（只向更大的档位升级，删除数据不会触发降级，避免在阈值附近反复重建），
+          重建期间集合不可检索，写入时只提示，由运维在低峰期执行 agentchat.services.rag.vector_stores.rebuild
+        - 度量方式与 Embedding 模型保持一致（COSINE / IP / L2），检索时使用集合实际的索引参数
+        - 检索参数随召回目标（fast / balanced / high）和 top_k 调整
+    """
+
+    def __init__(self, config: Optional[dict] = None):
+        config = config or {}
+        self.metric_type: str = config.get("metric_type", "COSINE").upper()
+        self.recall: str = config.get("recall", "balanced")
+        self.tiers: List[dict] = config.get("tiers") or DEFAULT_INDEX_TIERS
+
+    def select_tier(self, num_entities: int) -> dict:
+        for tier in self.tiers:
+            if tier.get("max_entities") is None or num_entities <= tier["max_entities"]:
+                return tier
+        return self.tiers[-1]
+
+    def tier_rank(self, index_type: str) -> int:
+        """索引类型在分级中的位置，不在分级中的索引（例如旧版本的 IVF_FLAT）视为最低档"""
+        for rank, tier in enumerate(self.tiers):
+            if tier["index_type"].upper() == index_type.upper():
+                return rank
+        return -1
+
+    def build_index_params(self, num_entities: int, dim: int, metric_type: Optional[str] = None) -> dict:
+        """为指定数据量生成 create_index 的参数"""
+        tier = self.select_tier(num_entities)
+        index_type = tier["index_type"].upper()
+        params = dict(tier.get("params") or {})
+
+        if index_type.startswith("IVF"):
+            # nlist 取 4 * sqrt(n)，限制在 Milvus 允许的范围内
+            params.setdefault("nlist", int(min(65536, max(128, 4 * math.sqrt(max(num_entities, 1))))))
+        if index_type == "IVF_PQ":
+            # m 需要整除向量维度，每个子空间 8 ~ 16 维
+            m = params.get("m") or max(1, dim // 16)
+            while dim % m:
+                m -= 1
+            params["m"] = m
+            params.setdefault("nbits", 8)
+
+        return {"index_type": index_type, "metric_type": (metric_type or self.metric_type).upper(), "params": params}
+
+    def build_search_params(self, index_params: dict, top_k: int) -> dict:
+        """根据集合实际的索引参数生成检索参数"""
+        index_type = index_params.get("index_type", "FLAT").upper()
+        metric_type = index_params.get("metric_type", "L2").upper()
+        factor = RECALL_FACTORS.get(self.recall, 1.0)
+
+        if index_type == "HNSW":
+            # ef 必须不小于 top_k
+            params = {"ef": max(top_k, int(64 * factor))}
+        elif index_type.startswith("IVF"):
+            nlist = int(index_params.get("params", {}).get("nlist", 128))
+            params = {"nprobe": max(1, min(nlist, int(max(16, nlist / 32) * factor)))}
+        elif index_type == "DISKANN":
+            params = {"search_list": max(top_k, int(100 * factor))}
+        else:
+            params = {}
+        return {"metric_type": metric_type, "params": params}
+
+    def needs_rebuild(self, current_index_type: str, num_entities: int) -> bool:
+        target = self.select_tier(num_entities)["index_type"]
+        return self.tier_rank(target) > self.tier_rank(current_index_type)
+
+    @staticmethod
+    def to_similarity(metric_type: str, distance: float) -> float:
+        """
+        将 Milvus 返回的距离统一转换为越大越相似的分数
+
+        L2 返回的是平方距离，对归一化向量有 cos = 1 - d / 2，与 COSINE / IP 的分数可以直接比较
+        """
+        if metric_type.upper() in SIMILARITY_METRICS:
+            return distance
+        return 1.0 - distance / 2
+
+
+def read_index_params(collection, field_name: str) -> Dict[str, object]:
+    """读取集合中某个向量字段实际的索引参数，没有索引时返回空 dict"""
+    try:
+        for index in collection.indexes:
+            if index.field_name == field_name:
+                params = dict(index.params)
+                # 不同版本的 pymilvus 中 params 可能是 JSON 字符串
+                if isinstance(params.get("params"), str):
+                    params["params"] = json.loads(params["params"])
+                return params
+    except Exception as err:
+        logger.warning(f"Read index of '{collection.name}.{field_name}' failed: {err}")
+    return {}
+
+
+def vector_fields(collection) -> Dict[str, int]:
+    """集合中的向量字段及其维度"""
+    return {field.name: field.params["dim"] for field in collection.schema.fields
+            if field.params and "dim" in field.params}
+
+
+def rebuild_collection_index(collection, policy: IndexPolicy, num_entities: int):
+    """
+    按当前数据量重建集合全部向量字段的索引，度量方式沿用原来的索引
+
+    Milvus 要求集合处于释放状态才能删除索引，调用方需要先 release()，重建完成后再重新 load()
+    """
+    for field_name, dim in vector_fields(collection).items():
+        current = read_index_params(collection, field_name)
+        index_params = policy.build_index_params(num_entities, dim, current.get("metric_type"))
+        for index in collection.indexes:
+            if index.field_name == field_name:
+                collection.drop_index(index_name=index.index_name)
+        collection.create_index(field_name, index_params)
+        logger.info(f"Rebuilt index of '{collection.name}.{field_name}': "
+                    f"{current.get('index_type')} -> {index_params['index_type']} ({num_entities} entities)")
+
+
+def rebuild_collection(collection, policy: IndexPolicy, residency, num_entities: Optional[int] = None):
+    """
+    重建集合的索引并重新加载，MilvusClient 和 MilvusLiteClient 共用
+
+    重建期间通过驻留管理禁止该集合被加载（并等待正在进行的加载完成），否则 drop_index 会因集合已加载而失败
+    """
+    residency.block(collection.name)
+    try:
+        residency.release(collection.name)
+        # 集合也可能是由其他进程加载的，没有记录在驻留管理中
+        collection.release()
+        if num_entities is None:
+            num_entities = collection.num_entities
+        rebuild_collection_index(collection, policy, num_entities)
+    finally:
+        residency.unblock(collection.name)
+    residency.ensure_loaded(collection)
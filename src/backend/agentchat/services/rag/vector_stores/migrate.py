@@ -0,0 +1,66 @@
+"""
+将旧版本按知识库创建的 Milvus 集合迁移到共享集合（knowledge_id 作为 Partition Key）
+
+用法（在 src/backend 目录下执行）：
+    python -m agentchat.services.rag.vector_stores.migrate                 # 迁移全部旧集合
+    python -m agentchat.services.rag.vector_stores.migrate --knowledge-ids id1 id2
+    python -m agentchat.services.rag.vector_stores.migrate --drop-legacy   # 迁移完成后删除旧集合
+    python -m agentchat.services.rag.vector_stores.migrate --dry-run       # 只列出需要迁移的集合
+
+只有知识库（knowledge 表）对应的集合会被迁移，其他集合不受影响；重复执行是安全的。
+迁移开始时旧集合改名为 {knowledge_id}__migrating，完成后改名为 {knowledge_id}__migrated（--drop-legacy 时删除），
+运行中的服务发现旧集合被改名后自动切换到共享集合，不需要重启；中断的迁移在下次执行时继续。
+迁移期间删除的文件可能被重新复制到共享集合，建议在低峰期执行。
+"""
+import asyncio
+import argparse
+from loguru import logger
+
+
+async def migrate(config_path: str, knowledge_ids: list[str], batch_size: int, drop_legacy: bool, dry_run: bool):
+    from agentchat.settings import init_app_settings
+    await init_app_settings(config_path)
+
+    from agentchat.database.dao.knowledge import KnowledgeDao
+    from agentchat.services.rag.vector_stores.milvus import MilvusClient, SHARED_LAYOUT
+    from agentchat.settings import app_settings
+
+    if app_settings.rag.vector_db.get("mode") not in (None, "standalone"):
+        raise SystemExit("Migration only applies to vector_db.mode = standalone")
+    if app_settings.rag.vector_db.get("layout", SHARED_LAYOUT) != SHARED_LAYOUT:
+        raise SystemExit("Set rag.vector_db.layout to 'shared' before migrating")
+
+    client = MilvusClient()
+    if not knowledge_ids:
+        knowledge_ids = [knowledge.id for knowledge in await KnowledgeDao.get_all_knowledge()]
+
+    pending = client.legacy_collections | set(client.migrating_collections())
+    targets = [knowledge_id for knowledge_id in knowledge_ids if knowledge_id in pending]
+    logger.info(f"{len(targets)} per-knowledge collections to migrate: {targets}")
+    if dry_run:
+        return
+
+    total = 0
+    for knowledge_id in targets:
+        try:
+            total += await client.migrate_legacy_collection(knowledge_id, batch_size, drop_legacy)
+        except Exception as err:
+            logger.error(f"Migrate collection '{knowledge_id}' failed: {err}")
+    logger.info(f"Migration finished, {total} chunks migrated into '{client.shared_collection_name}'")
+    client.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Migrate per-knowledge Milvus collections into the shared collection")
+    parser.add_argument("--config", default="agentchat/config.yaml", help="配置文件路径")
+    parser.add_argument("--knowledge-ids", nargs="*", default=[], help="只迁移指定的知识库")
+    parser.add_argument("--batch-size", type=int, default=1000, help="每批读取和写入的数据条数")
+    parser.add_argument("--drop-legacy", action="store_true", help="迁移完成后删除旧集合，默认改名为 {knowledge_id}__migrated 保留")
+    parser.add_argument("--dry-run", action="store_true", help="只列出需要迁移的集合")
+    args = parser.parse_args()
+
+    asyncio.run(migrate(args.config, args.knowledge_ids, args.batch_size, args.drop_legacy, args.dry_run))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,20 +1,83 @@
+import json
 from loguru import logger
 from agentchat.settings import app_settings
 from agentchat.services.rag.embedding import get_embedding
 from agentchat.schemas.search import SearchModel
+from agentchat.services.rag.vector_stores.residency import CollectionResidencyManager
+from agentchat.services.rag.vector_stores.index_policy import IndexPolicy, read_index_params, rebuild_collection, vector_fields
 from pymilvus import connections, Collection, utility, FieldSchema, DataType, CollectionSchema
 from typing import Dict, Optional, List
 
+# 共享集合布局：所有知识库写入同一个集合，knowledge_id 作为 Partition Key
+SHARED_LAYOUT = "shared"
+# 旧布局：每个知识库一个集合
+PER_KNOWLEDGE_LAYOUT = "per_knowledge"
+# 迁移状态记录在旧集合的名称上：迁移开始时改名为 {knowledge_id}__migrating，
+# 复制并校验完成后改名为 {knowledge_id}__migrated（或直接删除），改名后该知识库的读写都走共享集合
+MIGRATING_SUFFIX = "__migrating"
+MIGRATED_SUFFIX = "__migrated"
+
+OUTPUT_FIELDS = ["content", "chunk_id", "summary", "file_id", "file_name", "knowledge_id", "update_time"]
+# 写入时的字段顺序（不包含自增主键）
+INSERT_FIELDS = ["chunk_id", "content", "embedding", "summary", "embedding_summary",
+                 "file_id", "file_name", "knowledge_id", "update_time"]
+# Milvus 单次搜索 limit 的上限
+MAX_SEARCH_LIMIT = 16384
+
 
 class MilvusClient:
+    """
+    Milvus 向量库客户端
+
+    默认使用共享集合布局：所有知识库的数据写入同一个集合，knowledge_id 作为 Partition Key，
+    检索时通过 knowledge_id 过滤，一次调用即可跨多个知识库检索。
+    内存占用和索引质量随数据总量增长，而不是随知识库数量增长。
+
+    旧版本按知识库创建的集合（per_knowledge 布局）在迁移之前仍可以被检索和删除，
+    迁移工具见 agentchat.services.rag.vector_stores.migrate；迁移时旧集合会被改名，
+    运行中的服务发现旧集合不存在后自动切换到共享集合
+    """
+
     def __init__(self, **kwargs):
-        self.milvus_host = app_settings.rag.vector_db.get('host')
-        self.milvus_port = app_settings.rag.vector_db.get('port')
+        config = app_settings.rag.vector_db
+        self.milvus_host = config.get('host')
+        self.milvus_port = config.get('port')
+        self.layout = config.get("layout", SHARED_LAYOUT)
+        self.shared_collection_name = config.get("shared_collection", "agentchat_rag")
+        self.num_partitions = config.get("num_partitions", 64)
+        # 向量维度需要与 Embedding 模型的输出一致
+        self.dim = config.get("dim", 1024)
+        self.index_policy = IndexPolicy(config.get("index"))
+
         self.collections: Dict[str, Collection] = {}
-        self.loaded_collections: set = set()  # 跟踪已加载的集合
+        # 已加载集合的 LRU 驻留管理
+        residency_config = config.get("residency") or {}
+        self.residency = CollectionResidencyManager(
+            max_collections=residency_config.get("max_collections", 64),
+            max_memory_mb=residency_config.get("max_memory_mb", 0),
+        )
+        # 共享布局下尚未迁移的旧集合
+        self.legacy_collections: set = set()
+        # collection_name -> {向量字段: 实际的索引参数}
+        self._index_params: Dict[str, Dict[str, dict]] = {}
+        # 正在重建索引的集合，重建期间集合处于释放状态，不可检索和写入
+        self._rebuilding: set = set()
+        # 已经提示过需要重建索引的集合
+        self._pending_rebuilds: set = set()
 
         # 连接管理
         self._connect()
+        if self.layout == SHARED_LAYOUT:
+            # 共享集合承载全部知识库，始终驻留
+            self.residency.pin(self.shared_collection_name)
+            self.legacy_collections = {
+                name for name in self.get_all_collections()
+                if name != self.shared_collection_name and not name.endswith((MIGRATING_SUFFIX, MIGRATED_SUFFIX))
+            }
+            if self.legacy_collections:
+                logger.warning(f"Found {len(self.legacy_collections)} per-knowledge collections, "
+                               f"run agentchat.services.rag.vector_stores.migrate to move them into "
+                               f"'{self.shared_collection_name}'")
 
     def _connect(self):
         """建立 Milvus 连接"""
@@ -25,37 +88,19 @@ class MilvusClient:
             logger.error(f"Failed to connect to Milvus: {e}")
             raise
 
-    def _initialize_collections(self):
-        """移除此方法，改为懒加载模式"""
-        pass
+    @property
+    def is_shared_layout(self) -> bool:
+        return self.layout == SHARED_LAYOUT
 
     def _ensure_collection_loaded(self, collection: Collection) -> bool:
-        """确保集合被加载到内存中（懒加载）"""
-        collection_name = collection.name
-
-        # 如果已经加载过，直接返回
-        if collection_name in self.loaded_collections:
-            return True
-
-        try:
-            # 尝试加载集合
-            collection.load()
-            self.loaded_collections.add(collection_name)
-            logger.info(f"Collection '{collection_name}' loaded successfully")
-            return True
-        except Exception as e:
-            # 如果加载失败，可能是因为集合已经加载或其他原因
-            try:
-                # 尝试通过简单查询来验证集合是否可用
-                self.loaded_collections.add(collection_name)
-                logger.info(f"Collection '{collection_name}' is already loaded")
-                return True
-            except Exception as inner_e:
-                logger.error(f"Failed to load collection '{collection_name}': {e}, verification failed: {inner_e}")
-                return False
+        """确保集合被加载到内存中（懒加载），超过驻留预算时按 LRU 释放其他集合"""
+        return self.residency.ensure_loaded(collection)
 
     def _get_collection_safe(self, collection_name: str) -> Optional[Collection]:
         """安全地获取集合，按需加载（懒加载）"""
+        if collection_name in self._rebuilding:
+            logger.warning(f"Collection '{collection_name}' is rebuilding index")
+            return None
         try:
             # 如果集合不在缓存中，先检查是否存在
             if collection_name not in self.collections:
@@ -84,35 +129,39 @@ class MilvusClient:
         """检查集合是否存在"""
         return utility.has_collection(collection_name)
 
+    def _build_schema(self, collection_name: str, partition_key: bool) -> CollectionSchema:
+        fields = [
+            FieldSchema(name="id", dtype=DataType.INT64, is_primary=True, auto_id=True),
+            FieldSchema(name="chunk_id", dtype=DataType.VARCHAR, max_length=256),
+            FieldSchema(name="content", dtype=DataType.VARCHAR, max_length=2048),
+            FieldSchema(name="embedding", dtype=DataType.FLOAT_VECTOR, dim=self.dim),
+            FieldSchema(name="summary", dtype=DataType.VARCHAR, max_length=1024),
+            FieldSchema(name="embedding_summary", dtype=DataType.FLOAT_VECTOR, dim=self.dim),
+            FieldSchema(name="file_id", dtype=DataType.VARCHAR, max_length=128),
+            FieldSchema(name="file_name", dtype=DataType.VARCHAR, max_length=256),
+            FieldSchema(name="knowledge_id", dtype=DataType.VARCHAR, max_length=128, is_partition_key=partition_key),
+            FieldSchema(name="update_time", dtype=DataType.VARCHAR, max_length=128),
+        ]
+        return CollectionSchema(fields, description=f"RAG Collection: {collection_name}")
+
     async def create_collection(self, collection_name: str):
-        """创建 Milvus 集合（如果不存在）"""
+        """创建 Milvus 集合（如果不存在），共享布局下只会创建共享集合"""
+        if self.is_shared_layout:
+            collection_name = self.shared_collection_name
+
         if self._collection_exists(collection_name):
             logger.info(f"Collection '{collection_name}' already exists")
             return
 
         try:
-            fields = [
-                FieldSchema(name="id", dtype=DataType.INT64, is_primary=True, auto_id=True),
-                FieldSchema(name="chunk_id", dtype=DataType.VARCHAR, max_length=256),
-                FieldSchema(name="content", dtype=DataType.VARCHAR, max_length=2048),
-                FieldSchema(name="embedding", dtype=DataType.FLOAT_VECTOR, dim=1024),
-                FieldSchema(name="summary", dtype=DataType.VARCHAR, max_length=1024),
-                FieldSchema(name="embedding_summary", dtype=DataType.FLOAT_VECTOR, dim=1024),
-                FieldSchema(name="file_id", dtype=DataType.VARCHAR, max_length=128),
-                FieldSchema(name="file_name", dtype=DataType.VARCHAR, max_length=256),
-                FieldSchema(name="knowledge_id", dtype=DataType.VARCHAR, max_length=128),
-                FieldSchema(name="update_time", dtype=DataType.VARCHAR, max_length=128),
-            ]
-
-            schema = CollectionSchema(fields, description=f"RAG Collection: {collection_name}")
-            collection = Collection(collection_name, schema)
-
-            # 创建索引
-            index_params = {
-                "index_type": "IVF_FLAT",
-                "metric_type": "L2",
-                "params": {"nlist": 128}
-            }
+            schema = self._build_schema(collection_name, partition_key=self.is_shared_layout)
+            if self.is_shared_layout:
+                collection = Collection(collection_name, schema, num_partitions=self.num_partitions)
+            else:
+                collection = Collection(collection_name, schema)
+
+            # 新集合的数据量为 0，先使用最小档位的索引，数据增长后按档位重建
+            index_params = self.index_policy.build_index_params(0, self.dim)
             collection.create_index("embedding", index_params)
             collection.create_index("embedding_summary", index_params)
 
@@ -120,200 +169,243 @@ class MilvusClient:
             collection.load()
 
             self.collections[collection_name] = collection
+            self.residency.track(collection)
             logger.info(f'Successfully created and loaded collection: {collection_name}')
 
         except Exception as e:
             logger.error(f"Failed to create collection '{collection_name}': {e}")
             raise
 
-    async def search(self, query: str, collection_name: str, top_k: int = 10) -> List[SearchModel]:
-        """在指定集合中搜索相似数据"""
-        collection = self._get_collection_safe(collection_name)
-        if not collection:
-            logger.error(f"Cannot search in collection '{collection_name}' - collection not available")
-            return []
-
-        try:
-            # 生成查询向量
-            query_embedding = await get_embedding(query)
-
-            # 定义搜索参数
-            search_params = {
-                "metric_type": "L2",
-                "params": {"nprobe": 16}
-            }
-
-            # 执行搜索
-            results = collection.search(
-                data=[query_embedding],
-                anns_field="embedding",
-                param=search_params,
-                limit=top_k,
-                output_fields=["content", "chunk_id", "summary", "file_id", "file_name", "knowledge_id", "update_time"]
-            )
-
-            # 格式化结果
-            documents = []
-            for hit in results[0]:
-                documents.append(
-                    SearchModel(
-                        content=hit.entity.content,
-                        chunk_id=hit.entity.chunk_id,
-                        file_id=hit.entity.file_id,
-                        file_name=hit.entity.file_name,
-                        knowledge_id=hit.entity.knowledge_id,
-                        update_time=hit.entity.update_time,
-                        summary=hit.entity.summary,
-                        score=hit.distance
-                    )
+    def _get_shared_collection(self) -> Optional[Collection]:
+        return self._get_collection_safe(self.shared_collection_name)
+
+    @staticmethod
+    def _knowledge_filter(knowledge_ids: List[str]) -> str:
+        if len(knowledge_ids) == 1:
+            return f"knowledge_id == {json.dumps(knowledge_ids[0])}"
+        return f"knowledge_id in {json.dumps(knowledge_ids)}"
+
+    def _get_index_params(self, collection: Collection, field_name: str) -> dict:
+        """集合实际的索引参数，旧版本创建的集合使用 IVF_FLAT + L2"""
+        cached = self._index_params.setdefault(collection.name, {})
+        if field_name not in cached:
+            cached[field_name] = read_index_params(collection, field_name) or \
+                {"index_type": "IVF_FLAT", "metric_type": "L2", "params": {"nlist": 128}}
+        return cached[field_name]
+
+    def _search_collection(self, collection: Collection, query_embedding, anns_field: str,
+                           limit: int, expr: Optional[str] = None) -> List[SearchModel]:
+        # 检索参数与集合实际的索引类型、度量方式保持一致
+        index_params = self._get_index_params(collection, anns_field)
+        search_params = self.index_policy.build_search_params(index_params, limit)
+        metric_type = search_params["metric_type"]
+
+        # 执行搜索
+        results = collection.search(
+            data=[query_embedding],
+            anns_field=anns_field,
+            param=search_params,
+            limit=limit,
+            expr=expr,
+            output_fields=OUTPUT_FIELDS
+        )
+
+        # 格式化结果
+        documents = []
+        for hit in results[0]:
+            documents.append(
+                SearchModel(
+                    content=hit.entity.get("content", ""),
+                    chunk_id=hit.entity.get("chunk_id", ""),
+                    file_id=hit.entity.get("file_id", ""),
+                    file_name=hit.entity.get("file_name", ""),
+                    knowledge_id=hit.entity.get("knowledge_id", ""),
+                    update_time=hit.entity.get("update_time", ""),
+                    summary=hit.entity.get("summary", ""),
+                    score=self.index_policy.to_similarity(metric_type, hit.distance)
                 )
+            )
+        return documents
 
-            return documents
+    async def search_knowledges(self, query: str, knowledge_ids: List[str], top_k: int = 10,
+                                search_field: str = "content") -> List[SearchModel]:
+        """
+        一次调用在多个知识库中检索，每个知识库平均返回 top_k 条，结果按相似度从高到低排列
 
-        except Exception as e:
-            logger.error(f"Search failed in collection '{collection_name}': {e}")
+        search_field 为 summary 时基于摘要的向量检索
+        """
+        knowledge_ids = list(dict.fromkeys(knowledge_ids))
+        if not knowledge_ids:
             return []
 
-    async def search_summary(self, query: str, collection_name: str, top_k: int = 10) -> List[SearchModel]:
-        """在指定集合中搜索相似数据（基于摘要）"""
-        collection = self._get_collection_safe(collection_name)
-        if not collection:
-            logger.error(f"Cannot search in collection '{collection_name}' - collection not available")
-            return []
+        anns_field = "embedding_summary" if search_field == "summary" else "embedding"
+        limit = min(top_k * len(knowledge_ids), MAX_SEARCH_LIMIT)
 
         try:
-            # 生成查询向量
+            # 生成查询向量，多个知识库共用一次 Embedding
             query_embedding = await get_embedding(query)
+        except Exception as e:
+            logger.error(f"Embedding query failed: {e}")
+            return []
 
-            # 定义搜索参数
-            search_params = {
-                "metric_type": "L2",
-                "params": {"nprobe": 16}
-            }
-
-            # 执行搜索
-            results = collection.search(
-                data=[query_embedding],
-                anns_field="embedding_summary",
-                param=search_params,
-                limit=top_k,
-                output_fields=["content", "chunk_id", "summary", "file_id", "file_name", "knowledge_id", "update_time"]
-            )
+        documents: List[SearchModel] = []
+        if rebuilding := self._rebuilding.intersection(knowledge_ids + [self.shared_collection_name]):
+            logger.warning(f"Collections {rebuilding} are rebuilding index, results may be incomplete")
+        if self.is_shared_layout:
+            legacy_ids = [kid for kid in knowledge_ids if kid in self.legacy_collections]
+            shared_ids = [kid for kid in knowledge_ids if kid not in self.legacy_collections]
+        else:
+            legacy_ids, shared_ids = knowledge_ids, []
+
+        # 旧布局的集合（或尚未迁移的旧集合）逐个检索
+        for knowledge_id in legacy_ids:
+            if knowledge_id in self._rebuilding:
+                continue
+            if collection := self._get_collection_safe(knowledge_id):
+                try:
+                    documents += self._search_collection(collection, query_embedding, anns_field, top_k)
+                    continue
+                except Exception as e:
+                    logger.error(f"Search failed in collection '{knowledge_id}': {e}")
+                    self._index_params.pop(knowledge_id, None)
+            # 旧集合已被迁移命令改名，改为在共享集合中检索
+            if self._legacy_migrated(knowledge_id):
+                shared_ids.append(knowledge_id)
+
+        if shared_ids and self.shared_collection_name not in self._rebuilding \
+                and (collection := self._get_shared_collection()):
+            try:
+                documents += self._search_collection(
+                    collection, query_embedding, anns_field,
+                    min(top_k * len(shared_ids), MAX_SEARCH_LIMIT), self._knowledge_filter(shared_ids))
+            except Exception as e:
+                logger.error(f"Search failed in shared collection for knowledges {shared_ids}: {e}")
+                # 索引可能已被重建命令替换，下次检索重新读取索引参数
+                self._index_params.pop(self.shared_collection_name, None)
+
+        # 分数已统一为相似度，不同度量方式的集合可以直接合并排序
+        documents.sort(key=lambda doc: doc.score, reverse=True)
+        return documents[:limit]
 
-            # 格式化结果
-            documents = []
-            for hit in results[0]:
-                documents.append(
-                    SearchModel(
-                        content=hit.entity.get("content", ""),
-                        chunk_id=hit.entity.get("chunk_id", ""),
-                        file_id=hit.entity.get("file_id", ""),
-                        file_name=hit.entity.get("file_name", ""),
-                        knowledge_id=hit.entity.get("knowledge_id", ""),
-                        update_time=hit.entity.get("update_time", ""),
-                        summary=hit.entity.get("summary", ""),
-                        score=hit.distance
-                    )
-                )
+    async def search(self, query: str, collection_name: str, top_k: int = 10) -> List[SearchModel]:
+        """在指定知识库中搜索相似数据"""
+        return await self.search_knowledges(query, [collection_name], top_k)
 
-            return documents
+    async def search_summary(self, query: str, collection_name: str, top_k: int = 10) -> List[SearchModel]:
+        """在指定知识库中搜索相似数据（基于摘要）"""
+        return await self.search_knowledges(query, [collection_name], top_k, search_field="summary")
 
-        except Exception as e:
-            logger.error(f"Summary search failed in collection '{collection_name}': {e}")
-            return []
+    def _delete_by_expr(self, collection: Collection, expr: str) -> int:
+        # Milvus 2.3+ 支持直接按标量字段表达式删除
+        result = collection.delete(expr)
+        collection.flush()  # 确保删除操作立即生效
+        return result.delete_count
 
     async def delete_by_file_id(self, file_id: str, collection_name: str) -> bool:
         """根据文件ID删除数据"""
-        collection = self._get_collection_safe(collection_name)
-        if not collection:
-            logger.error(f"Cannot delete from collection '{collection_name}' - collection not available")
-            return False
-
+        file_filter = f"file_id == {json.dumps(file_id)}"
         try:
-            # 构造查询表达式
-            query_expr = f'file_id == "{file_id}"'
-
-            # 查询符合条件的文档
-            results = collection.query(query_expr, output_fields=["id"])
-            delete_ids = [result['id'] for result in results]
-
-            # 如果找到匹配的文档，执行删除操作
-            if delete_ids:
-                delete_expr = f"id in {delete_ids}"
-                collection.delete(delete_expr)
-                collection.flush()  # 确保删除操作立即生效
-                logger.info(f'Successfully deleted {len(delete_ids)} documents for file_id: {file_id}')
-                return True
+            if self.is_shared_layout and collection_name not in self.legacy_collections:
+                collection = self._get_shared_collection()
+                if not collection:
+                    return True
+                expr = f"{self._knowledge_filter([collection_name])} and {file_filter}"
             else:
-                logger.info(f'No documents found for file_id: {file_id}')
-                return True
+                collection = self._get_collection_safe(collection_name)
+                if not collection:
+                    if self._legacy_migrated(collection_name):
+                        return await self.delete_by_file_id(file_id, collection_name)
+                    logger.error(f"Cannot delete from collection '{collection_name}' - collection not available")
+                    return False
+                expr = file_filter
+
+            delete_count = self._delete_by_expr(collection, expr)
+            logger.info(f'Successfully deleted {delete_count} documents for file_id: {file_id}')
+            return True
 
         except Exception as e:
+            if self._legacy_migrated(collection_name):
+                return await self.delete_by_file_id(file_id, collection_name)
             logger.error(f'Error deleting file_id {file_id} from collection {collection_name}: {e}')
             return False
 
+    def _to_rows(self, collection_name: str, chunks, embedding_list, embedding_summary_list) -> List[dict]:
+        rows = []
+        for chunk, embedding, embedding_summary in zip(chunks, embedding_list, embedding_summary_list):
+            rows.append({
+                "chunk_id": chunk.chunk_id,
+                "content": chunk.content,
+                "embedding": embedding,
+                "summary": chunk.summary,
+                "embedding_summary": embedding_summary,
+                "file_id": chunk.file_id,
+                "file_name": chunk.file_name,
+                # 以写入的知识库为准，保证与检索时的过滤条件一致
+                "knowledge_id": collection_name if self.is_shared_layout else chunk.knowledge_id,
+                "update_time": chunk.update_time,
+            })
+        return rows
+
     async def insert(self, collection_name: str, chunks) -> bool:
-        """插入数据到指定集合"""
-        if collection_name not in self.collections:
-            await self.create_collection(collection_name)
+        """插入数据到指定知识库"""
+        target_name = collection_name
+        if self.is_shared_layout and collection_name not in self.legacy_collections:
+            target_name = self.shared_collection_name
+        if target_name in self._rebuilding:
+            logger.error(f"Cannot insert into collection '{target_name}' - index is rebuilding")
+            return False
+
+        if target_name not in self.collections:
+            await self.create_collection(target_name)
 
-        collection = self._get_collection_safe(collection_name)
+        collection = self._get_collection_safe(target_name)
         if not collection:
-            logger.error(f"Cannot insert into collection '{collection_name}' - collection not available")
+            if self._legacy_migrated(target_name):
+                return await self.insert(collection_name, chunks)
+            logger.error(f"Cannot insert into collection '{target_name}' - collection not available")
             return False
 
         try:
-            # 准备数据
-            content_list, summary_list, chunk_id_list = [], [], []
-            file_id_list, file_name_list, update_time_list, knowledge_id_list = [], [], [], []
-
-            for chunk in chunks:
-                content_list.append(chunk.content)
-                summary_list.append(chunk.summary)
-                chunk_id_list.append(chunk.chunk_id)
-                file_id_list.append(chunk.file_id)
-                file_name_list.append(chunk.file_name)
-                update_time_list.append(chunk.update_time)
-                knowledge_id_list.append(chunk.knowledge_id)
-
             # 生成嵌入向量
-            embedding_list = await get_embedding(content_list)
-            embedding_summary_list = await get_embedding(summary_list)
-
-            # 组织数据
-            data = [
-                chunk_id_list,
-                content_list,
-                embedding_list,
-                summary_list,
-                embedding_summary_list,
-                file_id_list,
-                file_name_list,
-                knowledge_id_list,
-                update_time_list
-            ]
+            embedding_list = await get_embedding([chunk.content for chunk in chunks])
+            embedding_summary_list = await get_embedding([chunk.summary for chunk in chunks])
 
             # 插入数据
-            collection.insert(data)
+            collection.insert(self._to_rows(collection_name, chunks, embedding_list, embedding_summary_list))
             collection.flush()
+            self.residency.refresh_size(target_name)
+            self._check_index_tier(target_name)
 
-            logger.info(f"Successfully inserted {len(chunks)} chunks into collection '{collection_name}'")
+            logger.info(f"Successfully inserted {len(chunks)} chunks of '{collection_name}' into collection '{target_name}'")
             return True
 
         except Exception as e:
-            logger.error(f"Failed to insert data into collection '{collection_name}': {e}")
+            if self._legacy_migrated(target_name):
+                return await self.insert(collection_name, chunks)
+            logger.error(f"Failed to insert data into collection '{target_name}': {e}")
             return False
 
     async def delete_collection(self, collection_name: str) -> bool:
-        """删除集合"""
-        if collection_name not in self.collections:
-            logger.warning(f"Collection '{collection_name}' not found in cache")
-            return False
-
+        """删除知识库的全部数据，共享布局下按 knowledge_id 删除"""
         try:
-            # 删除集合
-            Collection(collection_name).drop()
-            self.collections.pop(collection_name, None)
+            if self.is_shared_layout and collection_name != self.shared_collection_name:
+                if collection := self._get_shared_collection():
+                    self._delete_by_expr(collection, self._knowledge_filter([collection_name]))
+
+            # 旧布局的集合直接删除
+            is_shared = self.is_shared_layout and collection_name == self.shared_collection_name
+            if not is_shared and (collection_name in self.collections or collection_name in self.legacy_collections):
+                # 旧集合可能已被迁移命令改名
+                if self._collection_exists(collection_name):
+                    Collection(collection_name).drop()
+                self._forget_collection(collection_name)
+                self.legacy_collections.discard(collection_name)
+            # 迁移中或迁移后保留的旧集合
+            if self.is_shared_layout and not is_shared:
+                for suffix in (MIGRATING_SUFFIX, MIGRATED_SUFFIX):
+                    if self._collection_exists(f"{collection_name}{suffix}"):
+                        Collection(f"{collection_name}{suffix}").drop()
+
             logger.info(f"Collection '{collection_name}' deleted successfully")
             return True
 
@@ -321,13 +413,161 @@ class MilvusClient:
             logger.error(f"Failed to delete collection '{collection_name}': {e}")
             return False
 
+    def _forget_collection(self, collection_name: str):
+        self.collections.pop(collection_name, None)
+        self.residency.forget(collection_name)
+        self._index_params.pop(collection_name, None)
+
+    def _legacy_migrated(self, collection_name: str) -> bool:
+        """
+        旧集合访问失败时调用：集合已被迁移命令改名（或删除）时，之后该知识库的读写都走共享集合
+
+        每个进程在启动时计算旧集合，迁移命令在其他进程中执行，运行中的服务通过这里发现迁移
+        """
+        if collection_name not in self.legacy_collections or self._collection_exists(collection_name):
+            return False
+        self.legacy_collections.discard(collection_name)
+        self._forget_collection(collection_name)
+        logger.info(f"Legacy collection '{collection_name}' has been migrated, "
+                    f"route it to '{self.shared_collection_name}'")
+        return True
+
+    def _count(self, collection: Collection, expr: str) -> int:
+        return collection.query(expr=expr, output_fields=["count(*)"])[0]["count(*)"]
+
+    async def migrate_legacy_collection(self, collection_name: str, batch_size: int = 1000,
+                                        drop_legacy: bool = False) -> int:
+        """
+        将旧布局的知识库集合迁移到共享集合，返回迁移的数据条数
+
+        向量直接复制，不会重新计算 Embedding。迁移开始时旧集合改名为 {knowledge_id}__migrating，
+        此后新的读写都进入共享集合；复制并校验条数后改名为 {knowledge_id}__migrated，drop_legacy 时直接删除。
+        中断后重新执行会从 __migrating 集合继续，按 chunk_id 覆盖已经复制的数据，不影响迁移期间新写入的数据
+        """
+        if not self.is_shared_layout:
+            raise ValueError("Migration requires vector_db.layout to be 'shared'")
+        if collection_name == self.shared_collection_name:
+            raise ValueError("Cannot migrate the shared collection into itself")
+
+        await self.create_collection(self.shared_collection_name)
+        shared_collection = self._get_shared_collection()
+        knowledge_filter = self._knowledge_filter([collection_name])
+
+        migrating_name = f"{collection_name}{MIGRATING_SUFFIX}"
+        resuming = self._collection_exists(migrating_name)
+        if not resuming:
+            if not self._collection_exists(collection_name):
+                raise ValueError(f"Collection '{collection_name}' does not exist")
+            # 旧集合仍在使用时共享集合中不会有该知识库的数据，清理旧版本迁移工具留下的副本
+            self._delete_by_expr(shared_collection, knowledge_filter)
+            self.residency.release(collection_name)
+            utility.rename_collection(collection_name, migrating_name)
+            self.legacy_collections.discard(collection_name)
+            self._forget_collection(collection_name)
+
+        legacy_collection = Collection(migrating_name)
+        self.residency.ensure_loaded(legacy_collection)
+
+        field_names = {field.name for field in legacy_collection.schema.fields}
+        migrated = 0
+        iterator = legacy_collection.query_iterator(
+            batch_size=batch_size,
+            expr="id >= 0",
+            output_fields=[field for field in INSERT_FIELDS if field in field_names]
+        )
+        try:
+            while rows := iterator.next():
+                for row in rows:
+                    row.pop("id", None)
+                    row["knowledge_id"] = collection_name
+                    # 旧版本 Lite 集合没有摘要向量，使用正文向量代替
+                    row.setdefault("embedding_summary", row["embedding"])
+                if resuming:
+                    chunk_ids = json.dumps([row["chunk_id"] for row in rows])
+                    shared_collection.delete(f"{knowledge_filter} and chunk_id in {chunk_ids}")
+                shared_collection.insert(rows)
+                migrated += len(rows)
+        finally:
+            iterator.close()
+        shared_collection.flush()
+        self._check_index_tier(self.shared_collection_name)
+
+        # 共享集合中还包含迁移期间新写入的数据，条数只会更多
+        legacy_count = self._count(legacy_collection, "id >= 0")
+        shared_count = self._count(shared_collection, knowledge_filter)
+        if shared_count < legacy_count:
+            raise RuntimeError(f"Migration of '{collection_name}' is incomplete: {shared_count} of {legacy_count} "
+                               f"chunks in '{self.shared_collection_name}', keep '{migrating_name}' and retry")
+
+        self.residency.release(migrating_name)
+        if drop_legacy:
+            legacy_collection.drop()
+        else:
+            utility.rename_collection(migrating_name, f"{collection_name}{MIGRATED_SUFFIX}")
+
+        logger.info(f"Migrated {migrated} chunks from '{collection_name}' into '{self.shared_collection_name}'")
+        return migrated
+
+    def migrating_collections(self) -> List[str]:
+        """迁移中断、需要继续迁移的知识库"""
+        return [name[:-len(MIGRATING_SUFFIX)] for name in self.get_all_collections()
+                if name.endswith(MIGRATING_SUFFIX)]
+
+    def _index_needs_rebuild(self, collection: Collection) -> bool:
+        current = self._get_index_params(collection, "embedding")
+        return self.index_policy.needs_rebuild(current.get("index_type", ""), collection.num_entities)
+
+    def _check_index_tier(self, collection_name: str):
+        """
+        写入数据后检查数据量是否跨过索引档位
+
+        重建期间集合不可检索，共享布局下会影响所有知识库，所以写入时不自动重建，只提示一次
+        """
+        collection = self.collections.get(collection_name)
+        if collection is None or collection_name in self._pending_rebuilds:
+            return
+        if self._index_needs_rebuild(collection):
+            self._pending_rebuilds.add(collection_name)
+            logger.warning(f"Collection '{collection_name}' has outgrown its index tier, "
+                           f"run agentchat.services.rag.vector_stores.rebuild during off-peak hours")
+
+    def pending_index_rebuilds(self) -> List[str]:
+        """数据量已经跨过索引档位、需要重建索引的集合"""
+        pending = []
+        for collection_name in self.get_all_collections():
+            collection = self.collections.get(collection_name) or Collection(collection_name)
+            # 跳过不是由知识库创建的集合
+            if "embedding" in vector_fields(collection) and self._index_needs_rebuild(collection):
+                pending.append(collection_name)
+        return pending
+
+    def rebuild_index(self, collection_name: str) -> bool:
+        """
+        按数据量重建集合的向量索引，维护操作，重建期间该集合不可检索和写入
+
+        由 agentchat.services.rag.vector_stores.rebuild 在低峰期调用
+        """
+        if collection_name in self._rebuilding:
+            return False
+        self._rebuilding.add(collection_name)
+        try:
+            collection = self.collections.get(collection_name) or Collection(collection_name)
+            self.collections[collection_name] = collection
+            rebuild_collection(collection, self.index_policy, self.residency)
+            self._index_params.pop(collection_name, None)
+            self._pending_rebuilds.discard(collection_name)
+            return True
+        except Exception as e:
+            logger.error(f"Failed to rebuild index of collection '{collection_name}': {e}")
+            return False
+        finally:
+            self._rebuilding.discard(collection_name)
+
     def unload_collection(self, collection_name: str) -> bool:
         """卸载集合以释放内存"""
         try:
             if collection_name in self.collections:
-                collection = self.collections[collection_name]
-                collection.release()
-                self.loaded_collections.discard(collection_name)
+                self.residency.release(collection_name)
                 logger.info(f"Collection '{collection_name}' unloaded successfully")
                 return True
             else:
@@ -337,9 +577,24 @@ class MilvusClient:
             logger.error(f"Failed to unload collection '{collection_name}': {e}")
             return False
 
+    @property
+    def loaded_collections(self) -> List[str]:
+        """已加载的集合，按最近使用顺序排列"""
+        return list(self.residency.loaded_collections())
+
     def get_loaded_collections(self) -> List[str]:
         """获取当前已加载的集合列表"""
-        return list(self.loaded_collections)
+        return self.loaded_collections
+
+    def preload_collections(self, collection_names: List[str]):
+        """预加载热点集合，不存在的集合直接跳过"""
+        for collection_name in collection_names:
+            if self._collection_exists(collection_name):
+                self._get_collection_safe(collection_name)
+
+    def residency_metrics(self) -> dict:
+        """集合驻留的统计信息：命中率、加载耗时、释放次数等"""
+        return self.residency.metrics()
 
     def get_all_collections(self) -> List[str]:
         """获取所有可用集合列表（不加载）"""
@@ -2,16 +2,31 @@ from loguru import logger
 from agentchat.settings import app_settings
 from agentchat.services.rag.embedding import get_embedding
 from agentchat.schemas.search import SearchModel
+from agentchat.services.rag.vector_stores.residency import CollectionResidencyManager
+from agentchat.services.rag.vector_stores.index_policy import IndexPolicy, read_index_params, rebuild_collection, vector_fields
 from pymilvus import connections, Collection, utility, FieldSchema, DataType, CollectionSchema
 from typing import Dict, Optional, List
 
 
 class MilvusLiteClient:
     def __init__(self, **kwargs):
+        config = app_settings.rag.vector_db
         self.milvus_host = app_settings.rag.vector_db.get('host')
         self.milvus_port = app_settings.rag.vector_db.get('port')
         self.collections: Dict[str, Collection] = {}
-        self.loaded_collections: set = set()  # 跟踪已加载的集合
+        # 向量维度需要与 Embedding 模型的输出一致
+        self.dim = config.get("dim", 1024)
+        self.index_policy = IndexPolicy(config.get("index"))
+        # 已加载集合的 LRU 驻留管理
+        residency_config = config.get("residency") or {}
+        self.residency = CollectionResidencyManager(
+            max_collections=residency_config.get("max_collections", 64),
+            max_memory_mb=residency_config.get("max_memory_mb", 0),
+        )
+        # 正在重建索引的集合，重建期间集合处于释放状态，不可检索和写入
+        self._rebuilding: set = set()
+        # 已经提示过需要重建索引的集合
+        self._pending_rebuilds: set = set()
 
         # 连接管理
         self._connect()
@@ -30,32 +45,14 @@ class MilvusLiteClient:
         pass
 
     def _ensure_collection_loaded(self, collection: Collection) -> bool:
-        """确保集合被加载到内存中（懒加载）"""
-        collection_name = collection.name
-
-        # 如果已经加载过，直接返回
-        if collection_name in self.loaded_collections:
-            return True
-
-        try:
-            # 尝试加载集合
-            collection.load()
-            self.loaded_collections.add(collection_name)
-            logger.info(f"Collection '{collection_name}' loaded successfully")
-            return True
-        except Exception as e:
-            # 如果加载失败，可能是因为集合已经加载或其他原因
-            try:
-                # 尝试通过简单查询来验证集合是否可用
-                self.loaded_collections.add(collection_name)
-                logger.info(f"Collection '{collection_name}' is already loaded")
-                return True
-            except Exception as inner_e:
-                logger.error(f"Failed to load collection '{collection_name}': {e}, verification failed: {inner_e}")
-                return False
+        """确保集合被加载到内存中（懒加载），超过驻留预算时按 LRU 释放其他集合"""
+        return self.residency.ensure_loaded(collection)
 
     def _get_collection_safe(self, collection_name: str) -> Optional[Collection]:
         """安全地获取集合，按需加载（懒加载）"""
+        if collection_name in self._rebuilding:
+            logger.warning(f"Collection '{collection_name}' is rebuilding index")
+            return None
         try:
             # 如果集合不在缓存中，先检查是否存在
             if collection_name not in self.collections:
@@ -95,7 +92,7 @@ class MilvusLiteClient:
                 FieldSchema(name="id", dtype=DataType.INT64, is_primary=True, auto_id=True),
                 FieldSchema(name="chunk_id", dtype=DataType.VARCHAR, max_length=256),
                 FieldSchema(name="content", dtype=DataType.VARCHAR, max_length=2048),
-                FieldSchema(name="embedding", dtype=DataType.FLOAT_VECTOR, dim=1024),
+                FieldSchema(name="embedding", dtype=DataType.FLOAT_VECTOR, dim=self.dim),
                 FieldSchema(name="summary", dtype=DataType.VARCHAR, max_length=1024),
                 FieldSchema(name="file_id", dtype=DataType.VARCHAR, max_length=128),
                 FieldSchema(name="file_name", dtype=DataType.VARCHAR, max_length=256),
@@ -106,18 +103,15 @@ class MilvusLiteClient:
             schema = CollectionSchema(fields, description=f"RAG Collection: {collection_name}")
             collection = Collection(collection_name, schema)
 
-            # 创建索引
-            index_params = {
-                "index_type": "IVF_FLAT",
-                "metric_type": "L2",
-                "params": {"nlist": 128}
-            }
+            # 新集合的数据量为 0，先使用最小档位的索引，数据增长后按档位重建
+            index_params = self.index_policy.build_index_params(0, self.dim)
             collection.create_index("embedding", index_params)
 
             # 加载集合
             collection.load()
 
             self.collections[collection_name] = collection
+            self.residency.track(collection)
             logger.info(f'Successfully created and loaded collection: {collection_name}')
 
         except Exception as e:
@@ -135,11 +129,10 @@ class MilvusLiteClient:
             # 生成查询向量
             query_embedding = await get_embedding(query)
 
-            # 定义搜索参数
-            search_params = {
-                "metric_type": "L2",
-                "params": {"nprobe": 16}
-            }
+            # 检索参数与集合实际的索引类型、度量方式保持一致，旧版本创建的集合使用 IVF_FLAT + L2
+            index_params = read_index_params(collection, "embedding") or \
+                {"index_type": "IVF_FLAT", "metric_type": "L2", "params": {"nlist": 128}}
+            search_params = self.index_policy.build_search_params(index_params, top_k)
 
             # 执行搜索
             results = collection.search(
@@ -162,7 +155,7 @@ class MilvusLiteClient:
                         knowledge_id=hit.entity.knowledge_id,
                         update_time=hit.entity.update_time,
                         summary=hit.entity.summary,
-                        score=hit.distance
+                        score=self.index_policy.to_similarity(search_params["metric_type"], hit.distance)
                     )
                 )
 
@@ -209,6 +202,10 @@ class MilvusLiteClient:
 
     async def insert(self, collection_name: str, chunks) -> bool:
         """插入数据到指定集合"""
+        if collection_name in self._rebuilding:
+            logger.error(f"Cannot insert into collection '{collection_name}' - index is rebuilding")
+            return False
+
         if collection_name not in self.collections:
             await self.create_collection(collection_name)
 
@@ -249,6 +246,8 @@ class MilvusLiteClient:
             # 插入数据
             collection.insert(data)
             collection.flush()
+            self.residency.refresh_size(collection_name)
+            self._check_index_tier(collection)
 
             logger.info(f"Successfully inserted {len(chunks)} chunks into collection '{collection_name}'")
             return True
@@ -267,6 +266,7 @@ class MilvusLiteClient:
             # 删除集合
             Collection(collection_name).drop()
             self.collections.pop(collection_name, None)
+            self.residency.forget(collection_name)
             logger.info(f"Collection '{collection_name}' deleted successfully")
             return True
 
@@ -274,13 +274,51 @@ class MilvusLiteClient:
             logger.error(f"Failed to delete collection '{collection_name}': {e}")
             return False
 
+    def _index_needs_rebuild(self, collection: Collection) -> bool:
+        current = read_index_params(collection, "embedding")
+        return self.index_policy.needs_rebuild(current.get("index_type", ""), collection.num_entities)
+
+    def _check_index_tier(self, collection: Collection):
+        """数据量跨过索引档位时提示一次，重建期间集合不可检索，不在写入时自动重建"""
+        if collection.name in self._pending_rebuilds:
+            return
+        if self._index_needs_rebuild(collection):
+            self._pending_rebuilds.add(collection.name)
+            logger.warning(f"Collection '{collection.name}' has outgrown its index tier, "
+                           f"run agentchat.services.rag.vector_stores.rebuild during off-peak hours")
+
+    def pending_index_rebuilds(self) -> List[str]:
+        """数据量已经跨过索引档位、需要重建索引的集合"""
+        pending = []
+        for collection_name in self.get_all_collections():
+            collection = self.collections.get(collection_name) or Collection(collection_name)
+            # 跳过不是由知识库创建的集合
+            if "embedding" in vector_fields(collection) and self._index_needs_rebuild(collection):
+                pending.append(collection_name)
+        return pending
+
+    def rebuild_index(self, collection_name: str) -> bool:
+        """按数据量重建集合的向量索引，维护操作，重建期间该集合不可检索和写入"""
+        if collection_name in self._rebuilding:
+            return False
+        self._rebuilding.add(collection_name)
+        try:
+            collection = self.collections.get(collection_name) or Collection(collection_name)
+            self.collections[collection_name] = collection
+            rebuild_collection(collection, self.index_policy, self.residency)
+            self._pending_rebuilds.discard(collection_name)
+            return True
+        except Exception as e:
+            logger.error(f"Failed to rebuild index of collection '{collection_name}': {e}")
+            return False
+        finally:
+            self._rebuilding.discard(collection_name)
+
     def unload_collection(self, collection_name: str) -> bool:
         """卸载集合以释放内存"""
         try:
             if collection_name in self.collections:
-                collection = self.collections[collection_name]
-                collection.release()
-                self.loaded_collections.discard(collection_name)
+                self.residency.release(collection_name)
                 logger.info(f"Collection '{collection_name}' unloaded successfully")
                 return True
             else:
@@ -290,9 +328,24 @@ class MilvusLiteClient:
             logger.error(f"Failed to unload collection '{collection_name}': {e}")
             return False
 
+    @property
+    def loaded_collections(self) -> List[str]:
+        """已加载的集合，按最近使用顺序排列"""
+        return list(self.residency.loaded_collections())
+
     def get_loaded_collections(self) -> List[str]:
         """获取当前已加载的集合列表"""
-        return list(self.loaded_collections)
+        return self.loaded_collections
+
+    def preload_collections(self, collection_names: List[str]):
+        """预加载热点集合，不存在的集合直接跳过"""
+        for collection_name in collection_names:
+            if self._collection_exists(collection_name):
+                self._get_collection_safe(collection_name)
+
+    def residency_metrics(self) -> dict:
+        """集合驻留的统计信息：命中率、加载耗时、释放次数等"""
+        return self.residency.metrics()
 
     def get_all_collections(self) -> List[str]:
         """获取所有可用集合列表（不加载）"""
@@ -0,0 +1,419 @@
+import os
+import json
+import shutil
+import asyncio
+import threading
+import numpy as np
+from loguru import logger
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional, Tuple
+
+from agentchat.settings import app_settings
+from agentchat.services.rag.embedding import get_embedding
+from agentchat.schemas.search import SearchModel
+
+"""
+进程内的向量库：每个知识库一个目录，向量以 float16 的 .npy 文件保存并通过 mmap 读取
+
+目录结构：
+    {path}/{knowledge_id}/manifest.json        维度、段列表
+    {path}/{knowledge_id}/tombstones.json      已删除的行 {segment_id: [row, ...]}
+    {path}/{knowledge_id}/{segment_id}.content.npy / .summary.npy / .meta.jsonl
+
+每次写入追加一个新的段（append-only），删除只记录墓碑，段数量或已删除比例超过阈值时合并（compaction）
+"""
+
+META_FIELDS = ["chunk_id", "content", "summary", "file_id", "file_name", "knowledge_id", "update_time"]
+# 计算相似度时每次从 mmap 中读取并转换为 float32 的行数
+SEARCH_BLOCK_ROWS = 65536
+
+
+@dataclass(frozen=True)
+class _Segment:
+    segment_id: int
+    content: np.ndarray  # (n, dim) float16，已归一化
+    summary: np.ndarray  # (n, dim) float16，没有摘要的行为全 0
+    metadata: List[dict]
+    deleted: np.ndarray  # (n,) bool
+
+    @property
+    def live_count(self) -> int:
+        return len(self.metadata) - int(self.deleted.sum())
+
+
+def _normalize(vectors) -> np.ndarray:
+    vectors = np.asarray(vectors, dtype=np.float32)
+    if vectors.ndim == 1:
+        vectors = vectors[None, :]
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.where(norms == 0, 1, norms)
+
+
+def _atomic_write(path: str, write: Callable):
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        write(f)
+    os.replace(tmp_path, path)
+
+
+def _write_json(path: str, data):
+    _atomic_write(path, lambda f: f.write(json.dumps(data, ensure_ascii=False).encode("utf-8")))
+
+
+class _KnowledgeStore:
+    """单个知识库的向量存储，写操作串行执行，检索读取的是不可变的段列表快照"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.lock = threading.Lock()
+        self.dim: Optional[int] = None
+        self.next_segment = 0
+        self.segments: Tuple[_Segment, ...] = ()
+        self._load()
+
+    def _file(self, name: str) -> str:
+        return os.path.join(self.path, name)
+
+    def _load(self):
+        manifest_path = self._file("manifest.json")
+        if not os.path.exists(manifest_path):
+            return
+        with open(manifest_path, encoding="utf-8") as f:
+            manifest = json.load(f)
+        tombstones = {}
+        if os.path.exists(self._file("tombstones.json")):
+            with open(self._file("tombstones.json"), encoding="utf-8") as f:
+                tombstones = json.load(f)
+
+        self.dim = manifest.get("dim")
+        self.next_segment = manifest.get("next_segment", 0)
+        self.segments = tuple(self._open_segment(segment_id, tombstones.get(str(segment_id), []))
+                              for segment_id in manifest.get("segments", []))
+
+    def _open_segment(self, segment_id: int, deleted_rows: List[int]) -> _Segment:
+        with open(self._file(f"{segment_id}.meta.jsonl"), encoding="utf-8") as f:
+            metadata = [json.loads(line) for line in f if line.strip()]
+        deleted = np.zeros(len(metadata), dtype=bool)
+        deleted[deleted_rows] = True
+        return _Segment(
+            segment_id=segment_id,
+            content=np.load(self._file(f"{segment_id}.content.npy"), mmap_mode="r"),
+            summary=np.load(self._file(f"{segment_id}.summary.npy"), mmap_mode="r"),
+            metadata=metadata,
+            deleted=deleted,
+        )
+
+    def _write_segment(self, segment_id: int, content: np.ndarray, summary: np.ndarray, metadata: List[dict]):
+        _atomic_write(self._file(f"{segment_id}.content.npy"), lambda f: np.save(f, content.astype(np.float16)))
+        _atomic_write(self._file(f"{segment_id}.summary.npy"), lambda f: np.save(f, summary.astype(np.float16)))
+        _atomic_write(self._file(f"{segment_id}.meta.jsonl"), lambda f: f.write("".join(
+            json.dumps(item, ensure_ascii=False) + "\n" for item in metadata).encode("utf-8")))
+
+    def _write_manifest(self):
+        _write_json(self._file("manifest.json"), {
+            "dim": self.dim,
+            "next_segment": self.next_segment,
+            "segments": [segment.segment_id for segment in self.segments],
+        })
+
+    def _write_tombstones(self):
+        _write_json(self._file("tombstones.json"), {
+            str(segment.segment_id): np.flatnonzero(segment.deleted).tolist()
+            for segment in self.segments if segment.deleted.any()
+        })
+
+    @property
+    def total_count(self) -> int:
+        return sum(len(segment.metadata) for segment in self.segments)
+
+    @property
+    def live_count(self) -> int:
+        return sum(segment.live_count for segment in self.segments)
+
+    def append(self, content_vectors: np.ndarray, summary_vectors: np.ndarray, metadata: List[dict]):
+        with self.lock:
+            dim = content_vectors.shape[1]
+            if self.dim is None:
+                self.dim = dim
+            elif self.dim != dim:
+                raise ValueError(f"Embedding dim {dim} does not match knowledge store dim {self.dim}")
+
+            os.makedirs(self.path, exist_ok=True)
+            segment_id = self.next_segment
+            self._write_segment(segment_id, content_vectors, summary_vectors, metadata)
+            self.next_segment += 1
+            self.segments = self.segments + (self._open_segment(segment_id, []),)
+            # 段文件写完之后再更新 manifest，中途失败时多出来的段文件会被忽略
+            self._write_manifest()
+
+    def delete(self, predicate: Callable[[dict], bool]) -> int:
+        with self.lock:
+            deleted_count = 0
+            segments = []
+            for segment in self.segments:
+                rows = [row for row, item in enumerate(segment.metadata)
+                        if not segment.deleted[row] and predicate(item)]
+                if rows:
+                    deleted = segment.deleted.copy()
+                    deleted[rows] = True
+                    segment = _Segment(segment.segment_id, segment.content, segment.summary, segment.metadata, deleted)
+                    deleted_count += len(rows)
+                segments.append(segment)
+            if deleted_count:
+                self.segments = tuple(segments)
+                self._write_tombstones()
+            return deleted_count
+
+    def needs_compaction(self, max_segments: int, max_deleted_ratio: float) -> bool:
+        total = self.total_count
+        if total and (total - self.live_count) / total > max_deleted_ratio:
+            return True
+        return len(self.segments) > max_segments
+
+    def compact(self):
+        """把全部段中未删除的行合并成一个新段，并删除旧的段文件"""
+        with self.lock:
+            old_segments = self.segments
+            live = [(segment, ~segment.deleted) for segment in old_segments]
+            metadata = [item for segment, mask in live for item, keep in zip(segment.metadata, mask) if keep]
+
+            if metadata:
+                segment_id = self.next_segment
+                self._write_segment(
+                    segment_id,
+                    np.concatenate([np.asarray(segment.content)[mask] for segment, mask in live]),
+                    np.concatenate([np.asarray(segment.summary)[mask] for segment, mask in live]),
+                    metadata,
+                )
+                self.next_segment += 1
+                self.segments = (self._open_segment(segment_id, []),)
+            else:
+                self.segments = ()
+            self._write_manifest()
+            self._write_tombstones()
+
+            for segment in old_segments:
+                for suffix in ("content.npy", "summary.npy", "meta.jsonl"):
+                    try:
+                        os.remove(self._file(f"{segment.segment_id}.{suffix}"))
+                    except OSError as err:
+                        # Windows 下仍被 mmap 引用的文件无法删除，下次合并时不会再被引用
+                        logger.debug(f"Remove segment file failed: {err}")
+            logger.info(f"Compacted {len(old_segments)} segments of '{self.path}' into {len(self.segments)}")
+
+    def search(self, query: np.ndarray, search_field: str, top_k: int) -> List[Tuple[float, dict]]:
+        """query 为归一化后的 float32 向量，返回 (余弦相似度, 元数据)，按相似度从高到低排列"""
+        segments = self.segments
+        if not segments or top_k <= 0:
+            return []
+
+        scores_list = []
+        for segment in segments:
+            vectors = segment.summary if search_field == "summary" else segment.content
+            scores = np.empty(len(vectors), dtype=np.float32)
+            for start in range(0, len(vectors), SEARCH_BLOCK_ROWS):
+                block = np.asarray(vectors[start:start + SEARCH_BLOCK_ROWS], dtype=np.float32)
+                scores[start:start + len(block)] = block @ query
+            scores[segment.deleted] = -np.inf
+            scores_list.append(scores)
+
+        scores = np.concatenate(scores_list)
+        k = min(top_k, len(scores))
+        top_rows = np.argpartition(-scores, k - 1)[:k]
+        top_rows = top_rows[np.argsort(-scores[top_rows])]
+
+        offsets = np.cumsum([len(segment.metadata) for segment in segments])
+        results = []
+        for row in top_rows:
+            if scores[row] == -np.inf:
+                break
+            segment_index = int(np.searchsorted(offsets, row, side="right"))
+            local_row = row - (offsets[segment_index - 1] if segment_index else 0)
+            results.append((float(scores[row]), segments[segment_index].metadata[local_row]))
+        return results
+
+
+class NumpyVectorClient:
+    """
+    基于 NumPy 的进程内向量库（vector_db.mode = numpy），适合小规模部署和本地测试
+
+        - 不依赖额外的数据库服务，向量以 float16 保存，通过 mmap 按需读入
+        - 检索是一次矩阵乘法加 argpartition 取 top_k，使用余弦相似度，分数越大越相似
+        - 接口与 MilvusClient / ChromaClient 保持一致
+    """
+
+    def __init__(self, **kwargs):
+        config = app_settings.rag.vector_db.get("numpy") or {}
+        self.path = config.get("path", "./vector_db/numpy")
+        self.max_segments = config.get("max_segments", 8)
+        self.max_deleted_ratio = config.get("max_deleted_ratio", 0.3)
+
+        self.collections: Dict[str, _KnowledgeStore] = {}
+        self._lock = threading.Lock()
+        os.makedirs(self.path, exist_ok=True)
+        logger.info(f"Using NumPy vector store at {os.path.abspath(self.path)}")
+
+    def _collection_path(self, collection_name: str) -> str:
+        if not collection_name or os.path.basename(collection_name) != collection_name or collection_name in (".", ".."):
+            raise ValueError(f"Invalid collection name: {collection_name!r}")
+        return os.path.join(self.path, collection_name)
+
+    def _collection_exists(self, collection_name: str) -> bool:
+        return os.path.isdir(self._collection_path(collection_name))
+
+    def _get_collection_safe(self, collection_name: str, create: bool = False) -> Optional[_KnowledgeStore]:
+        try:
+            with self._lock:
+                if collection_name not in self.collections:
+                    if not create and not self._collection_exists(collection_name):
+                        return None
+                    self.collections[collection_name] = _KnowledgeStore(self._collection_path(collection_name))
+                return self.collections[collection_name]
+        except Exception as e:
+            logger.error(f"Error getting collection '{collection_name}': {e}")
+            return None
+
+    async def _maybe_compact(self, store: _KnowledgeStore):
+        if store.needs_compaction(self.max_segments, self.max_deleted_ratio):
+            await asyncio.to_thread(store.compact)
+
+    async def create_collection(self, collection_name: str):
+        """创建知识库目录（如果不存在）"""
+        os.makedirs(self._collection_path(collection_name), exist_ok=True)
+        self._get_collection_safe(collection_name, create=True)
+
+    async def search_knowledges(self, query: str, knowledge_ids: List[str], top_k: int = 10,
+                                search_field: str = "content") -> List[SearchModel]:
+        """一次 Embedding 在多个知识库中检索，每个知识库返回 top_k 条，结果按相似度从高到低排列"""
+        stores = [store for knowledge_id in dict.fromkeys(knowledge_ids)
+                  if (store := self._get_collection_safe(knowledge_id))]
+        if not stores:
+            return []
+
+        try:
+            query_vector = _normalize(await get_embedding(query))[0]
+        except Exception as e:
+            logger.error(f"Embedding query failed: {e}")
+            return []
+
+        documents = []
+        for store in stores:
+            if store.dim is not None and store.dim != len(query_vector):
+                logger.error(f"Query dim {len(query_vector)} does not match '{store.path}' dim {store.dim}")
+                continue
+            for score, item in store.search(query_vector, search_field, top_k):
+                # 没有摘要的行不参与摘要检索
+                if search_field == "summary" and not item.get("summary"):
+                    continue
+                documents.append(SearchModel(score=score, **{key: item.get(key, "") for key in META_FIELDS}))
+
+        documents.sort(key=lambda doc: doc.score, reverse=True)
+        return documents
+
+    async def search(self, query: str, collection_name: str, top_k: int = 10) -> List[SearchModel]:
+        """在指定知识库中搜索相似数据"""
+        return await self.search_knowledges(query, [collection_name], top_k)
+
+    async def search_summary(self, query: str, collection_name: str, top_k: int = 10) -> List[SearchModel]:
+        """在指定知识库中搜索相似数据（基于摘要）"""
+        return await self.search_knowledges(query, [collection_name], top_k, search_field="summary")
+
+    async def insert(self, collection_name: str, chunks) -> bool:
+        """插入数据到指定知识库，每次写入追加一个新段"""
+        if not chunks:
+            return True
+
+        store = self._get_collection_safe(collection_name, create=True)
+        if not store:
+            logger.error(f"Cannot insert into collection '{collection_name}' - collection not available")
+            return False
+
+        try:
+            content_vectors = _normalize(await get_embedding([chunk.content for chunk in chunks]))
+            # 只为有摘要的数据计算摘要向量
+            summary_rows = [row for row, chunk in enumerate(chunks) if chunk.summary and chunk.summary.strip()]
+            summary_vectors = np.zeros_like(content_vectors)
+            if summary_rows:
+                summary_vectors[summary_rows] = _normalize(
+                    await get_embedding([chunks[row].summary for row in summary_rows]))
+
+            metadata = [{key: getattr(chunk, key, "") or "" for key in META_FIELDS} for chunk in chunks]
+            await asyncio.to_thread(store.append, content_vectors, summary_vectors, metadata)
+            await self._maybe_compact(store)
+
+            logger.info(f"Successfully inserted {len(chunks)} chunks into collection '{collection_name}'")
+            return True
+        except Exception as e:
+            logger.error(f"Failed to insert data into collection '{collection_name}': {e}")
+            return False
+
+    async def delete_by_file_id(self, file_id: str, collection_name: str) -> bool:
+        """根据文件ID删除数据（记录墓碑，合并时真正删除）"""
+        store = self._get_collection_safe(collection_name)
+        if not store:
+            return True
+
+        try:
+            delete_count = await asyncio.to_thread(store.delete, lambda item: item.get("file_id") == file_id)
+            await self._maybe_compact(store)
+            logger.info(f'Successfully deleted {delete_count} documents for file_id: {file_id}')
+            return True
+        except Exception as e:
+            logger.error(f'Error deleting file_id {file_id} from collection {collection_name}: {e}')
+            return False
+
+    async def delete_collection(self, collection_name: str) -> bool:
+        """删除知识库的全部数据"""
+        try:
+            with self._lock:
+                self.collections.pop(collection_name, None)
+            if not self._collection_exists(collection_name):
+                logger.warning(f"Collection '{collection_name}' does not exist")
+                return False
+            await asyncio.to_thread(shutil.rmtree, self._collection_path(collection_name))
+            logger.info(f"Collection '{collection_name}' deleted successfully")
+            return True
+        except Exception as e:
+            logger.error(f"Failed to delete collection '{collection_name}': {e}")
+            return False
+
+    def compact(self, collection_name: str) -> bool:
+        """手动合并知识库的全部段"""
+        store = self._get_collection_safe(collection_name)
+        if not store:
+            return False
+        store.compact()
+        return True
+
+    def unload_collection(self, collection_name: str) -> bool:
+        """卸载知识库，释放 mmap"""
+        with self._lock:
+            if self.collections.pop(collection_name, None) is None:
+                logger.warning(f"Collection '{collection_name}' not found in cache")
+                return False
+        logger.info(f"Collection '{collection_name}' unloaded successfully")
+        return True
+
+    def get_loaded_collections(self) -> List[str]:
+        """获取当前已加载的集合列表"""
+        return list(self.collections.keys())
+
+    def get_all_collections(self) -> List[str]:
+        """获取所有可用集合列表"""
+        return [name for name in os.listdir(self.path) if os.path.isdir(os.path.join(self.path, name))]
+
+    def get_collection_count(self, collection_name: str) -> int:
+        """获取知识库中未删除的数据条数"""
+        store = self._get_collection_safe(collection_name)
+        return store.live_count if store else 0
+
+    def close(self):
+        with self._lock:
+            self.collections.clear()
+        logger.info("NumPy vector store closed")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
@@ -0,0 +1,57 @@
+"""
+按数据量重建 Milvus 集合的向量索引（例如 FLAT -> HNSW -> IVF_SQ8）
+
+重建期间集合处于释放状态，不可检索和写入，共享布局下会影响所有知识库，请在低峰期执行。
+写入数据后服务只会在日志中提示需要重建的集合，不会自动重建。
+
+用法（在 src/backend 目录下执行）：
+    python -m agentchat.services.rag.vector_stores.rebuild                       # 重建全部需要升级索引的集合
+    python -m agentchat.services.rag.vector_stores.rebuild --collections name1 name2
+    python -m agentchat.services.rag.vector_stores.rebuild --dry-run             # 只列出需要重建的集合
+"""
+import asyncio
+import argparse
+from loguru import logger
+
+
+async def rebuild(config_path: str, collection_names: list[str], dry_run: bool):
+    from agentchat.settings import init_app_settings
+    await init_app_settings(config_path)
+
+    from agentchat.settings import app_settings
+
+    mode = app_settings.rag.vector_db.get("mode")
+    if mode == "lite":
+        from agentchat.services.rag.vector_stores.milvus_lite import MilvusLiteClient
+        client = MilvusLiteClient()
+    elif mode in (None, "standalone"):
+        from agentchat.services.rag.vector_stores.milvus import MilvusClient
+        client = MilvusClient()
+    else:
+        raise SystemExit("Index rebuild only applies to vector_db.mode = standalone / lite")
+
+    pending = await asyncio.to_thread(client.pending_index_rebuilds)
+    targets = [name for name in collection_names if name in pending] if collection_names else pending
+    logger.info(f"{len(targets)} collections need index rebuild: {targets}")
+    if dry_run:
+        client.close()
+        return
+
+    for collection_name in targets:
+        if await asyncio.to_thread(client.rebuild_index, collection_name):
+            logger.info(f"Rebuilt index of collection '{collection_name}'")
+    client.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Rebuild Milvus vector indexes that have outgrown their tier")
+    parser.add_argument("--config", default="agentchat/config.yaml", help="配置文件路径")
+    parser.add_argument("--collections", nargs="*", default=[], help="只重建指定的集合")
+    parser.add_argument("--dry-run", action="store_true", help="只列出需要重建的集合")
+    args = parser.parse_args()
+
+    asyncio.run(rebuild(args.config, args.collections, args.dry_run))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,209 @@
+import time
+import threading
+from loguru import logger
+from collections import OrderedDict
+from typing import Callable, Dict, Iterable, Optional
+
+# 每个向量元素占用的字节数（FLOAT_VECTOR）
+_FLOAT_BYTES = 4
+
+
+def estimate_collection_bytes(collection) -> int:
+    """按 实体数量 × 向量维度 估算集合加载后占用的内存（不含标量字段和索引的额外开销）"""
+    try:
+        dims = sum(field.params.get("dim", 0) for field in collection.schema.fields
+                   if field.params and "dim" in field.params)
+        return collection.num_entities * dims * _FLOAT_BYTES
+    except Exception as err:
+        logger.warning(f"Estimate memory of collection '{collection.name}' failed: {err}")
+        return 0
+
+
+class CollectionResidencyManager:
+    """
+    向量库集合的驻留管理
+
+    集合按需 load() 到 Milvus 查询节点的内存中，这里按 LRU 顺序记录已加载的集合：
+        - 超过集合数量或内存预算时，通过 release() 释放最久未使用的集合
+        - 固定驻留（pinned）的集合不会被释放，例如共享布局下的共享集合
+        - 统计命中率、加载次数、加载耗时以及释放次数
+    """
+
+    def __init__(self, max_collections: int = 64, max_memory_mb: int = 0,
+                 estimate_bytes: Callable[[object], int] = estimate_collection_bytes):
+        self.max_collections = max_collections
+        # 0 表示不限制内存
+        self.max_memory_bytes = max_memory_mb * 1024 * 1024
+        self.estimate_bytes = estimate_bytes
+
+        # collection_name -> (collection, 预估内存)
+        self._resident: "OrderedDict[str, tuple[object, int]]" = OrderedDict()
+        self._pinned: set = set()
+        # 正在加载的集合，同一集合只由一个调用方执行 load()
+        self._loading: Dict[str, threading.Event] = {}
+        # 禁止加载的集合，例如正在重建索引的集合
+        self._blocked: set = set()
+        self._lock = threading.RLock()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.load_seconds_total = 0.0
+        self.load_seconds_max = 0.0
+
+    @property
+    def memory_bytes(self) -> int:
+        return sum(size for _, size in self._resident.values())
+
+    def pin(self, collection_name: str):
+        with self._lock:
+            self._pinned.add(collection_name)
+
+    def is_loaded(self, collection_name: str) -> bool:
+        return collection_name in self._resident
+
+    def block(self, collection_name: str):
+        """禁止加载集合（例如重建索引期间），并等待正在进行的加载完成"""
+        with self._lock:
+            self._blocked.add(collection_name)
+            loading = self._loading.get(collection_name)
+        if loading is not None:
+            loading.wait()
+
+    def unblock(self, collection_name: str):
+        with self._lock:
+            self._blocked.discard(collection_name)
+
+    def ensure_loaded(self, collection) -> bool:
+        """
+        保证集合已加载，命中时只更新 LRU 顺序；集合被禁止加载时返回 False
+
+        load() 和内存估算都是 RPC，不在锁内执行：同一集合只由第一个调用方加载，其他调用方等待加载完成
+        """
+        collection_name = collection.name
+        while True:
+            with self._lock:
+                if collection_name in self._blocked:
+                    return False
+                if collection_name in self._resident:
+                    self._resident.move_to_end(collection_name)
+                    self.hits += 1
+                    return True
+                loading = self._loading.get(collection_name)
+                if loading is None:
+                    loading = self._loading[collection_name] = threading.Event()
+                    self.misses += 1
+                    break
+            loading.wait()
+
+        try:
+            start = time.perf_counter()
+            try:
+                collection.load()
+            except Exception as err:
+                # 集合可能已经被其他进程加载，继续尝试使用
+                logger.warning(f"Load collection '{collection_name}' failed: {err}")
+            elapsed = time.perf_counter() - start
+            size = self.estimate_bytes(collection)
+
+            with self._lock:
+                self.load_seconds_total += elapsed
+                self.load_seconds_max = max(self.load_seconds_max, elapsed)
+                self._resident[collection_name] = (collection, size)
+                victims = self._pick_victims(keep=collection_name)
+            logger.info(f"Collection '{collection_name}' loaded in {elapsed * 1000:.0f}ms")
+        finally:
+            with self._lock:
+                self._loading.pop(collection_name, None)
+            loading.set()
+
+        self._release_victims(victims)
+        return True
+
+    def track(self, collection):
+        """记录一个已经加载的集合（例如刚刚创建并加载的集合）"""
+        size = self.estimate_bytes(collection)
+        with self._lock:
+            self._resident[collection.name] = (collection, size)
+            self._resident.move_to_end(collection.name)
+            victims = self._pick_victims(keep=collection.name)
+        self._release_victims(victims)
+
+    def refresh_size(self, collection_name: str):
+        """写入数据后重新估算内存占用"""
+        item = self._resident.get(collection_name)
+        if item is None:
+            return
+        size = self.estimate_bytes(item[0])
+        with self._lock:
+            if collection_name not in self._resident:
+                return
+            self._resident[collection_name] = (item[0], size)
+            victims = self._pick_victims(keep=collection_name)
+        self._release_victims(victims)
+
+    def release(self, collection_name: str) -> bool:
+        with self._lock:
+            item = self._resident.pop(collection_name, None)
+        if item is None:
+            return False
+        self._release_collection(collection_name, item[0])
+        return True
+
+    def forget(self, collection_name: str):
+        """集合被删除时移除记录，不调用 release()"""
+        with self._lock:
+            self._resident.pop(collection_name, None)
+            self._pinned.discard(collection_name)
+
+    def release_all(self):
+        for collection_name in list(self._resident):
+            self.release(collection_name)
+
+    @staticmethod
+    def _release_collection(collection_name: str, collection):
+        try:
+            collection.release()
+        except Exception as err:
+            logger.warning(f"Release collection '{collection_name}' failed: {err}")
+
+    def _over_budget(self) -> bool:
+        if self.max_collections and len(self._resident) > self.max_collections:
+            return True
+        return bool(self.max_memory_bytes) and self.memory_bytes > self.max_memory_bytes
+
+    def _pick_victims(self, keep: Optional[str] = None) -> list:
+        """在锁内挑出需要释放的集合并移除记录，release() 在锁外调用"""
+        victims = []
+        for collection_name in list(self._resident):
+            if not self._over_budget():
+                break
+            if collection_name == keep or collection_name in self._pinned:
+                continue
+            victims.append((collection_name, self._resident.pop(collection_name)[0]))
+            self.evictions += 1
+        return victims
+
+    def _release_victims(self, victims: list):
+        for collection_name, collection in victims:
+            self._release_collection(collection_name, collection)
+            logger.info(f"Evicted collection '{collection_name}' from memory (LRU)")
+
+    def loaded_collections(self) -> Iterable[str]:
+        return list(self._resident)
+
+    def metrics(self) -> Dict[str, object]:
+        loads = self.misses
+        requests = self.hits + self.misses
+        return {
+            "loaded_collections": len(self._resident),
+            "max_collections": self.max_collections,
+            "memory_mb": round(self.memory_bytes / 1024 / 1024, 2),
+            "max_memory_mb": round(self.max_memory_bytes / 1024 / 1024, 2),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / requests, 4) if requests else None,
+            "evictions": self.evictions,
+            "avg_load_ms": round(self.load_seconds_total / loads * 1000, 2) if loads else None,
+            "max_load_ms": round(self.load_seconds_max * 1000, 2),
+        }
@@ -51,6 +51,24 @@ class RedisClient:
         finally:
             self.close()
 
+    def mset(self, mapping: dict, expiration=3600):
+        try:
+            with self.connection.pipeline(transaction=False) as pipe:
+                for key, value in mapping.items():
+                    pipe.setex(key, expiration, pickle.dumps(value))
+                pipe.execute()
+        except TypeError as exc:
+            raise TypeError('RedisCache only accepts values that can be pickled. ') from exc
+        finally:
+            self.close()
+
+    def mget(self, keys: list):
+        try:
+            values = self.connection.mget(keys)
+            return [pickle.loads(value) if value else None for value in values]
+        finally:
+            self.close()
+
     def hsetkey(self, name, key, value, expiration=3600):
         try:
             r = self.connection.hset(name, key, value)
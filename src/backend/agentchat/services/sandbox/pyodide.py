@@ -312,8 +312,11 @@ class PyodideSandbox(BasePyodideSandbox):
             status = "error"
             stderr = f"执行超时，超过 {timeout_seconds} 秒"
         except asyncio.CancelledError:
-            # 可选：如果需要，记录取消
-            pass
+            # 请求被取消（例如客户端断开）时终止 Deno 子进程，并继续向上传递取消
+            if process.returncode is None:
+                process.kill()
+                await asyncio.shield(process.wait())
+            raise
         end_time = time.time()
 
         return CodeExecutionResult(
@@ -1,5 +1,6 @@
 from agentchat.services.storage.oss import OSSClient
 from agentchat.services.storage.minio import MinioClient
+from agentchat.services.storage.async_client import AsyncStorageClient
 from agentchat.settings import app_settings
 
 if app_settings.storage.mode == "minio":
@@ -7,5 +8,8 @@ if app_settings.storage.mode == "minio":
 else:
     storage_client = OSSClient()
 
+# 在事件循环中使用异步客户端，避免阻塞
+async_storage_client = AsyncStorageClient(storage_client, app_settings.storage.max_concurrency)
+
 if __name__ == "__main__":
     storage_client.list_files_in_folder("icons/user/")
\ No newline at end of file
@@ -0,0 +1,71 @@
+import os
+import asyncio
+import functools
+from loguru import logger
+from typing import Any, BinaryIO, Callable, Optional
+from concurrent.futures import ThreadPoolExecutor
+
+from agentchat.settings import app_settings
+
+
+class AsyncStorageClient:
+    """
+    对象存储的异步封装
+
+    MinIO / OSS 的 SDK 都是同步阻塞的，这里将调用放到专用的有界线程池中执行，
+    并通过信号量限制同时进行的传输数量：
+        - 上传、下载都以流的方式进行，不会把整个文件读入内存
+        - 大文件按 storage.part_size 分片上传
+        - 提供预签名的直传链接，客户端可以绕过 API 服务直接上传到存储桶
+    """
+
+    def __init__(self, client, max_concurrency: int = 8):
+        self.client = client
+        self.semaphore = asyncio.Semaphore(max_concurrency)
+        self.executor = ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix="agentchat-storage")
+
+    async def _run(self, func: Callable[..., Any], *args, **kwargs) -> Any:
+        async with self.semaphore:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self.executor, functools.partial(func, *args, **kwargs))
+
+    async def upload_file(self, object_name: str, data):
+        """上传内存中的数据，适用于小文件（图片、Markdown 等）"""
+        return await self._run(self.client.upload_file, object_name, data)
+
+    async def upload_fileobj(self, object_name: str, fileobj: BinaryIO, length: Optional[int] = -1,
+                             content_type: Optional[str] = None):
+        """
+        从文件对象中流式上传，例如 FastAPI UploadFile.file（磁盘上的临时文件）
+        """
+        return await self._run(self.client.upload_fileobj, object_name, fileobj, length, content_type)
+
+    async def upload_local_file(self, object_name: str, local_file: str, content_type: Optional[str] = None):
+        """流式上传本地文件，大文件自动分片"""
+        def _upload():
+            with open(local_file, "rb") as fileobj:
+                self.client.upload_fileobj(object_name, fileobj, os.path.getsize(local_file), content_type)
+
+        return await self._run(_upload)
+
+    async def download_file(self, object_name: str, local_file: str):
+        """流式下载到本地文件"""
+        await self._run(self.client.download_file, object_name, local_file)
+        if not os.path.exists(local_file):
+            raise FileNotFoundError(f"Failed to download {object_name}")
+        return local_file
+
+    async def sign_url_for_get(self, object_name: str, expiration: int = 3600):
+        return await self._run(self.client.sign_url_for_get, object_name, expiration)
+
+    async def sign_url_for_put(self, object_name: str, expiration: Optional[int] = None):
+        """生成预签名的直传链接"""
+        expiration = expiration or app_settings.storage.presign_expiration
+        return await self._run(self.client.sign_url_for_put, object_name, expiration)
+
+    async def list_files_in_folder(self, folder_path: str):
+        return await self._run(self.client.list_files_in_folder, folder_path)
+
+    def shutdown(self):
+        logger.info("Shutting down storage executor")
+        self.executor.shutdown(wait=False)
@@ -1,17 +1,30 @@
 import io
+import urllib3
+from datetime import timedelta
 from minio import Minio
 from minio.error import S3Error
 from loguru import logger
 from agentchat.settings import app_settings
 
+# MinIO 分片上传要求分片不小于 5MB
+MIN_PART_SIZE = 5 * 1024 * 1024
+
 class MinioClient:
     def __init__(self):
+        # 复用连接池，避免每次请求都重新建立连接
+        http_client = urllib3.PoolManager(
+            timeout=urllib3.Timeout(connect=10, read=app_settings.storage.timeout),
+            maxsize=app_settings.storage.pool_size,
+            retries=urllib3.Retry(total=3, backoff_factor=0.2, status_forcelist=[500, 502, 503, 504])
+        )
         self.client = Minio(
             secure=False,
             endpoint=app_settings.storage.minio.endpoint,
             access_key=app_settings.storage.minio.access_key_id,
             secret_key=app_settings.storage.minio.access_key_secret,
+            http_client=http_client,
         )
+        self.part_size = max(app_settings.storage.part_size, MIN_PART_SIZE)
         self.bucket_name = app_settings.storage.minio.bucket_name
         if not self.client.bucket_exists(self.bucket_name):
             self.client.make_bucket(self.bucket_name)
@@ -32,6 +45,24 @@ class MinioClient:
         except S3Error as e:
             logger.error(f"Failed to upload file: {e}")
 
+    def upload_fileobj(self, object_name, fileobj, length=-1, content_type=None):
+        """
+        从文件对象中流式上传，长度未知或超过分片大小时自动分片上传，不会将整个文件读入内存
+        """
+        try:
+            self.client.put_object(
+                self.bucket_name,
+                object_name,
+                fileobj,
+                length if length is not None else -1,
+                content_type=content_type or "application/octet-stream",
+                part_size=self.part_size
+            )
+            logger.info(f"File uploaded successfully: {object_name}")
+        except S3Error as e:
+            logger.error(f"Failed to upload file: {e}")
+            raise
+
     def upload_local_file(self, object_name, local_file):
         try:
             self.client.fput_object(self.bucket_name, object_name, local_file)
@@ -48,7 +79,6 @@ class MinioClient:
 
     def sign_url_for_get(self, object_name, expiration=3600):
         try:
-            from datetime import timedelta
             url = self.client.presigned_get_object(
                 self.bucket_name, object_name, expires=timedelta(seconds=expiration)
             )
@@ -56,6 +86,16 @@ class MinioClient:
         except S3Error as e:
             logger.error(f"Failed to generate GET URL for {object_name}: {e}")
 
+    def sign_url_for_put(self, object_name, expiration=3600):
+        """生成预签名的上传链接，客户端可直接 PUT 到存储桶"""
+        try:
+            return self.client.presigned_put_object(
+                self.bucket_name, object_name, expires=timedelta(seconds=expiration)
+            )
+        except S3Error as e:
+            logger.error(f"Failed to generate PUT URL for {object_name}: {e}")
+            raise
+
     def download_file(self, object_name, local_file):
         try:
             self.client.fget_object(self.bucket_name, object_name, local_file)
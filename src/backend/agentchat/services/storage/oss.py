@@ -1,4 +1,5 @@
 import oss2
+from oss2.models import PartInfo
 from loguru import logger
 from agentchat.settings import app_settings
 
@@ -8,11 +9,15 @@ class OSSClient:
             access_key_id=app_settings.storage.oss.access_key_id,
             access_key_secret=app_settings.storage.oss.access_key_secret
         )
+        # 复用连接池，避免每次请求都重新建立连接
         self.bucket = oss2.Bucket(
             auth=auth,
             endpoint=app_settings.storage.oss.endpoint,
-            bucket_name=app_settings.storage.oss.bucket_name
+            bucket_name=app_settings.storage.oss.bucket_name,
+            connect_timeout=app_settings.storage.timeout,
+            session=oss2.Session(pool_size=app_settings.storage.pool_size)
         )
+        self.part_size = app_settings.storage.part_size
 
     def upload_file(self, object_name, data):
         try:
@@ -21,6 +26,38 @@ class OSSClient:
         except oss2.exceptions.OssError as e:
             logger.error(f"Failed to upload file: {e}")
 
+    def upload_fileobj(self, object_name, fileobj, length=-1, content_type=None):
+        """
+        从文件对象中流式上传，长度未知或超过分片大小时按分片上传，不会将整个文件读入内存
+        """
+        headers = {"Content-Type": content_type} if content_type else None
+        try:
+            if length is not None and 0 <= length <= self.part_size:
+                result = self.bucket.put_object(object_name, fileobj, headers=headers)
+                logger.info(f"File uploaded successfully, status code: {result.status}")
+                return
+
+            upload_id = self.bucket.init_multipart_upload(object_name, headers=headers).upload_id
+            try:
+                parts = []
+                while chunk := fileobj.read(self.part_size):
+                    part_number = len(parts) + 1
+                    result = self.bucket.upload_part(object_name, upload_id, part_number, chunk)
+                    parts.append(PartInfo(part_number, result.etag))
+
+                if parts:
+                    self.bucket.complete_multipart_upload(object_name, upload_id, parts)
+                else:
+                    self.bucket.abort_multipart_upload(object_name, upload_id)
+                    self.bucket.put_object(object_name, b"", headers=headers)
+            except Exception:
+                self.bucket.abort_multipart_upload(object_name, upload_id)
+                raise
+            logger.info(f"File uploaded successfully by {len(parts)} parts: {object_name}")
+        except oss2.exceptions.OssError as e:
+            logger.error(f"Failed to upload file: {e}")
+            raise
+
     def upload_local_file(self, object_name, local_file):
         try:
             result = self.bucket.put_object_from_file(object_name, local_file)
@@ -42,6 +79,14 @@ class OSSClient:
         except oss2.exceptions.OssError as e:
             logger.error(f"Failed to generate GET URL for {object_name}: {e}")
 
+    def sign_url_for_put(self, object_name, expiration=3600):
+        """生成预签名的上传链接，客户端可直接 PUT 到存储桶"""
+        try:
+            return self.bucket.sign_url("PUT", object_name, expiration, slash_safe=True)
+        except oss2.exceptions.OssError as e:
+            logger.error(f"Failed to generate PUT URL for {object_name}: {e}")
+            raise
+
     def download_file(self, object_name, local_file):
         try:
             self.bucket.get_object_to_file(object_name, local_file)
@@ -0,0 +1,308 @@
+import re
+import time
+import asyncio
+import aiomysql
+from loguru import logger
+from dataclasses import dataclass, field
+from urllib.parse import urlparse
+from typing import Dict, List, Optional, AsyncGenerator, AsyncIterator, Tuple
+
+from agentchat.settings import app_settings
+
+
+@dataclass
+class TableSchema:
+    name: str
+    create_stmt: str
+    # 用于挑选相关表的关键词：表名、字段名、注释
+    keywords: set = field(default_factory=set)
+    # 外键引用的表，挑选表时一并带上，保证 JOIN 所需的结构完整
+    references: set = field(default_factory=set)
+
+
+@dataclass
+class SchemaCacheEntry:
+    tables: Dict[str, TableSchema]
+    fingerprint: Tuple
+    loaded_at: float
+    checked_at: float
+
+
+class QueryStream:
+    """
+    按页读取查询结果，读取结束后 truncated 表示结果是否超过 max_rows 行（超出的部分不会返回）
+    """
+
+    def __init__(self, engine: "Text2SQLEngine", sql: str):
+        self._engine = engine
+        self._sql = sql
+        self.truncated = False
+
+    def __aiter__(self) -> AsyncIterator[List[Dict]]:
+        return self._engine._fetch_pages(self._sql, self)
+
+
+class Text2SQLEngine:
+    """
+    Text2SQL 的异步执行引擎
+
+    - 同一数据库在进程内共享一个只读连接池
+    - 表结构在进程内缓存，按 TTL 过期，并定期对比 information_schema 的指纹，发现 DDL 后失效
+    - 根据用户问题挑选相关的表，避免 Prompt 携带整个库的 Schema
+    - 查询使用服务端游标分页读取，限制最大行数，并带有超时控制
+    """
+
+    _pools: Dict[Tuple, aiomysql.Pool] = {}
+    _schema_cache: Dict[Tuple, SchemaCacheEntry] = {}
+    _locks: Dict[Tuple, asyncio.Lock] = {}
+
+    def __init__(self, db_config: Optional[Dict] = None):
+        self.config = app_settings.text2sql
+        self.db_config = db_config or self._get_config_from_url(
+            self.config.get("endpoint") or app_settings.mysql.get("endpoint"))
+
+        self.max_rows = self.config.get("max_rows", 200)
+        self.page_size = self.config.get("page_size", 50)
+        self.max_tables = self.config.get("max_tables", 8)
+        self.schema_ttl = self.config.get("schema_ttl", 600)
+        self.schema_check_interval = self.config.get("schema_check_interval", 30)
+        self.query_timeout = self.config.get("query_timeout", 30)
+
+        self.key = (self.db_config["host"], self.db_config["port"], self.db_config["user"], self.db_config["database"])
+
+    @staticmethod
+    def _get_config_from_url(endpoint: str):
+        parsed = urlparse(endpoint)
+        return {
+            "host": parsed.hostname,
+            "user": parsed.username,
+            "password": parsed.password,
+            "database": parsed.path.lstrip('/'),
+            "port": parsed.port or 3306,
+            "charset": "utf8mb4"
+        }
+
+    def _get_lock(self) -> asyncio.Lock:
+        if self.key not in self._locks:
+            self._locks[self.key] = asyncio.Lock()
+        return self._locks[self.key]
+
+    async def get_pool(self) -> aiomysql.Pool:
+        """获取共享的只读连接池，会话级别设置只读事务和语句执行超时"""
+        if pool := self._pools.get(self.key):
+            return pool
+
+        async with self._get_lock():
+            if self.key not in self._pools:
+                self._pools[self.key] = await aiomysql.create_pool(
+                    host=self.db_config["host"],
+                    port=int(self.db_config["port"]),
+                    user=self.db_config["user"],
+                    password=self.db_config["password"],
+                    db=self.db_config["database"],
+                    charset=self.db_config.get("charset", "utf8mb4"),
+                    autocommit=True,
+                    minsize=1,
+                    maxsize=self.config.get("pool_size", 5),
+                    pool_recycle=3600,
+                    init_command=(
+                        "SET SESSION time_zone = '+08:00', "
+                        "transaction_read_only = ON, "
+                        f"max_execution_time = {int(self.query_timeout * 1000)}"
+                    )
+                )
+        return self._pools[self.key]
+
+    @classmethod
+    async def close_pools(cls):
+        for pool in cls._pools.values():
+            pool.close()
+            await pool.wait_closed()
+        cls._pools.clear()
+
+    async def _fetch_fingerprint(self, cursor) -> Tuple:
+        """
+        表结构的指纹：表名、CREATE_TIME 以及字段定义的校验和
+
+        重建表的 ALTER TABLE 会更新 CREATE_TIME；MySQL 8 默认的 INSTANT DDL（例如 ADD COLUMN）不会，
+        需要通过 information_schema.COLUMNS 的校验和发现字段变化
+        """
+        await cursor.execute(
+            "SELECT t.TABLE_NAME, t.CREATE_TIME, c.COLUMNS_CHECKSUM "
+            "FROM information_schema.TABLES t LEFT JOIN ("
+            "  SELECT TABLE_NAME, SUM(CRC32(CONCAT_WS('|', ORDINAL_POSITION, COLUMN_NAME, COLUMN_TYPE, "
+            "         IS_NULLABLE, COLUMN_DEFAULT, COLUMN_COMMENT))) AS COLUMNS_CHECKSUM "
+            "  FROM information_schema.COLUMNS WHERE TABLE_SCHEMA = DATABASE() GROUP BY TABLE_NAME"
+            ") c ON c.TABLE_NAME = t.TABLE_NAME "
+            "WHERE t.TABLE_SCHEMA = DATABASE() ORDER BY t.TABLE_NAME"
+        )
+        rows = await cursor.fetchall()
+        return tuple((row["TABLE_NAME"], str(row["CREATE_TIME"]), str(row["COLUMNS_CHECKSUM"])) for row in rows)
+
+    async def _load_schema(self, cursor, fingerprint: Tuple) -> Dict[str, TableSchema]:
+        tables = {}
+        for table_name, *_ in fingerprint:
+            await cursor.execute(f"SHOW CREATE TABLE `{table_name}`")
+            row = await cursor.fetchone()
+            create_stmt = row.get("Create Table") or row.get("Create View", "")
+            tables[table_name] = TableSchema(
+                name=table_name,
+                create_stmt=create_stmt,
+                keywords=_extract_keywords(table_name + " " + create_stmt),
+                references=set(re.findall(r"REFERENCES `(\w+)`", create_stmt))
+            )
+        return tables
+
+    async def get_schema(self) -> Dict[str, TableSchema]:
+        """
+        获取表结构，优先读取进程内缓存：
+        - 超过 schema_ttl 全量重新加载
+        - 超过 schema_check_interval 只对比指纹，指纹变化（发生 DDL）时重新加载
+        """
+        now = time.monotonic()
+        entry = self._schema_cache.get(self.key)
+        if entry and now - entry.loaded_at < self.schema_ttl and now - entry.checked_at < self.schema_check_interval:
+            return entry.tables
+
+        # get_pool() 在连接池不存在时也会获取同一把锁（asyncio.Lock 不可重入），必须在进入锁之前调用
+        pool = await self.get_pool()
+        async with self._get_lock():
+            entry = self._schema_cache.get(self.key)
+            now = time.monotonic()
+            if entry and now - entry.loaded_at < self.schema_ttl and now - entry.checked_at < self.schema_check_interval:
+                return entry.tables
+
+            async with pool.acquire() as conn:
+                async with conn.cursor(aiomysql.DictCursor) as cursor:
+                    fingerprint = await self._fetch_fingerprint(cursor)
+                    if entry and fingerprint == entry.fingerprint and now - entry.loaded_at < self.schema_ttl:
+                        entry.checked_at = now
+                        return entry.tables
+
+                    logger.info(f"Text2SQL schema cache reload for `{self.db_config['database']}`")
+                    tables = await self._load_schema(cursor, fingerprint)
+
+            self._schema_cache[self.key] = SchemaCacheEntry(
+                tables=tables, fingerprint=fingerprint, loaded_at=now, checked_at=now)
+            return tables
+
+    async def select_relevant_schema(self, query: str) -> str:
+        """根据用户问题挑选最相关的若干张表，拼接成 Prompt 中的 Schema 信息"""
+        tables = await self.get_schema()
+        if len(tables) <= self.max_tables:
+            selected = list(tables.values())
+        else:
+            query_keywords = _extract_keywords(query)
+            scored = sorted(
+                tables.values(),
+                key=lambda table: (len(query_keywords & table.keywords), -len(table.create_stmt)),
+                reverse=True
+            )
+            selected = [table for table in scored[:self.max_tables] if query_keywords & table.keywords] or scored[:self.max_tables]
+
+            # 带上外键引用的表
+            selected_names = {table.name for table in selected}
+            for table in list(selected):
+                for reference in table.references - selected_names:
+                    if reference in tables:
+                        selected.append(tables[reference])
+                        selected_names.add(reference)
+
+        return "\n".join([f"Table: {table.name}\nSchema: {table.create_stmt}\n" for table in selected])
+
+    def _limit_sql(self, sql: str) -> str:
+        """没有 LIMIT 的查询追加 LIMIT，多取一行用于判断结果是否被截断"""
+        if re.search(r"\blimit\s+\d+(\s*,\s*\d+|\s+offset\s+\d+)?\s*$", sql, flags=re.IGNORECASE):
+            return sql
+        return f"{sql} LIMIT {self.max_rows + 1}"
+
+    @staticmethod
+    def check_sql(sql: str) -> Optional[str]:
+        """只允许单条查询语句，返回错误信息或 None"""
+        statement = sql.strip().rstrip(";").strip()
+        if not re.match(r"^(select|with)\b", statement, flags=re.IGNORECASE):
+            return "Error: Only SELECT queries are allowed."
+        if ";" in statement:
+            return "Error: Only a single SQL statement is allowed."
+        return None
+
+    def stream_query(self, sql: str) -> QueryStream:
+        """
+        执行查询并按页产出结果，最多返回 max_rows 行
+
+        Raises:
+            ValueError: SQL 不是单条查询语句
+            asyncio.TimeoutError: 查询超时
+        """
+        if error := self.check_sql(sql):
+            raise ValueError(error)
+
+        return QueryStream(self, self._limit_sql(sql.strip().rstrip(";").strip()))
+
+    async def _fetch_pages(self, sql: str, stream: QueryStream) -> AsyncGenerator[List[Dict], None]:
+        pool = await self.get_pool()
+        async with pool.acquire() as conn:
+            cursor = await conn.cursor(aiomysql.SSDictCursor)
+            drained = False
+            try:
+                try:
+                    await asyncio.wait_for(cursor.execute(sql), timeout=self.query_timeout)
+                except aiomysql.Error:
+                    # SQL 报错时连接上没有未读取的结果，可以继续使用
+                    drained = True
+                    raise
+                # 多读一行用于判断结果是否被截断，多出的这一行不返回
+                fetched = 0
+                while fetched <= self.max_rows:
+                    rows = await asyncio.wait_for(
+                        cursor.fetchmany(min(self.page_size, self.max_rows + 1 - fetched)),
+                        timeout=self.query_timeout
+                    )
+                    if not rows:
+                        drained = True
+                        break
+                    fetched += len(rows)
+                    if fetched > self.max_rows:
+                        stream.truncated = True
+                        rows = rows[:len(rows) - (fetched - self.max_rows)]
+                    if rows:
+                        yield list(rows)
+            finally:
+                if drained:
+                    await cursor.close()
+                else:
+                    # 服务端游标关闭时会把剩余的结果全部读完（用户自己的 LIMIT 可能很大），
+                    # 超时、取消、达到行数上限时直接关闭连接，避免归还到连接池后被复用
+                    conn.close()
+
+    async def execute_query(self, sql: str) -> Tuple[List[Dict], bool]:
+        """执行查询，返回结果以及是否被截断"""
+        rows = []
+        stream = self.stream_query(sql)
+        async for page in stream:
+            rows.extend(page)
+        return rows, stream.truncated
+
+
+# 表结构语句中的通用关键字，不参与相关性匹配
+SQL_STOP_WORDS = {
+    "create", "table", "key", "primary", "unique", "index", "not", "null", "default", "comment", "engine",
+    "innodb", "charset", "collate", "utf8mb4", "utf8mb4_unicode_ci", "utf8mb4_0900_ai_ci", "int", "bigint",
+    "tinyint", "varchar", "char", "text", "longtext", "json", "datetime", "timestamp", "current_timestamp",
+    "on", "update", "auto_increment", "constraint", "foreign", "references", "double", "float", "decimal",
+    "row_format", "dynamic", "using", "btree", "id",
+}
+
+
+def _extract_keywords(text: str) -> set:
+    """
+    提取英文单词（按下划线拆分）以及中文的二元组，用于表结构与问题的粗粒度匹配
+    """
+    text = text.lower()
+    keywords = set()
+    for word in re.findall(r"[a-z][a-z0-9_]+", text):
+        keywords.add(word)
+        keywords.update(part for part in word.split("_") if len(part) > 1)
+    for chinese in re.findall(r"[一-鿿]+", text):
+        keywords.update(chinese[i:i + 2] for i in range(len(chinese) - 1))
+    return keywords - SQL_STOP_WORDS
@@ -0,0 +1 @@
+from agentchat.services.web_search.service import WebSearchService, get_web_search_service, close_web_search_service
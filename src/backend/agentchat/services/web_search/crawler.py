@@ -0,0 +1,62 @@
+import asyncio
+from loguru import logger
+from typing import List, Optional
+
+
+class CrawlerPool:
+    """
+    crawl4ai 浏览器池
+
+    之前每次爬取都会新建事件循环并启动一个无头浏览器，启动浏览器的耗时远大于爬取本身。
+    这里保持若干个常驻的 AsyncWebCrawler，按轮询方式分配，并通过信号量限制同时打开的页面数量；
+    浏览器异常退出时丢弃对应实例，下次使用时重新启动。
+    """
+
+    def __init__(self, size: int = 1, max_concurrency: int = 4):
+        self.size = max(size, 1)
+        self.semaphore = asyncio.Semaphore(max_concurrency)
+        self._crawlers: List[Optional[object]] = [None] * self.size
+        self._lock = asyncio.Lock()
+        self._next = 0
+
+    async def _acquire(self):
+        async with self._lock:
+            index = self._next
+            self._next = (self._next + 1) % self.size
+
+            if self._crawlers[index] is None:
+                # 导入较慢，第一次使用时再导入
+                from crawl4ai import AsyncWebCrawler
+
+                crawler = AsyncWebCrawler(verbose=False)
+                await crawler.start()
+                self._crawlers[index] = crawler
+                logger.info(f"Started crawler browser #{index}")
+            return index, self._crawlers[index]
+
+    async def crawl(self, url: str) -> str:
+        async with self.semaphore:
+            index, crawler = await self._acquire()
+            try:
+                result = await crawler.arun(url=url)
+            except Exception:
+                await self._discard(index, crawler)
+                raise
+
+            if not result.success:
+                raise ValueError(f"Crawl {url} failed: {result.error_message}")
+            return result.markdown
+
+    async def _discard(self, index: int, crawler):
+        async with self._lock:
+            if self._crawlers[index] is crawler:
+                self._crawlers[index] = None
+        try:
+            await crawler.close()
+        except Exception as err:
+            logger.warning(f"Close crawler browser #{index} failed: {err}")
+
+    async def close(self):
+        for index, crawler in enumerate(self._crawlers):
+            if crawler is not None:
+                await self._discard(index, crawler)
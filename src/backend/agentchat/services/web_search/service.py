@@ -0,0 +1,132 @@
+import json
+import asyncio
+import httpx
+from loguru import logger
+from cachetools import TTLCache
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from agentchat.services.web_search.crawler import CrawlerPool
+from agentchat.settings import app_settings
+
+
+class WebSearchService:
+    """
+    联网搜索 / 网页爬取的异步服务，供插件工具、工作台、灵寻以及 DeepSearch 共用
+
+        - Tavily、Bocha、Google(SerpAPI) 都使用异步客户端，不再阻塞事件循环
+        - 搜索结果按 (服务商, 参数) 缓存，爬取结果按 URL 缓存，过期时间可配置
+        - 相同的请求正在进行时直接等待同一个结果，不重复请求
+        - 每个服务商单独限制并发数量，避免触发上游的限流
+    """
+
+    def __init__(self):
+        config = app_settings.web_search
+        self.timeout = config.get("timeout", 30)
+        self.crawl_timeout = config.get("crawl_timeout", 60)
+        self.search_cache = TTLCache(maxsize=config.get("cache_size", 1024), ttl=config.get("cache_ttl", 600))
+        self.crawl_cache = TTLCache(maxsize=config.get("crawl_cache_size", 256), ttl=config.get("crawl_cache_ttl", 1800))
+        self.concurrency: Dict[str, int] = {"tavily": 4, "bocha": 4, "google": 2, "crawl": 4,
+                                            **(config.get("concurrency") or {})}
+
+        self._semaphores: Dict[str, asyncio.Semaphore] = {}
+        self._inflight: Dict[tuple, asyncio.Task] = {}
+        self._crawler_pool = CrawlerPool(config.get("crawl_pool_size", 1), self.concurrency["crawl"])
+
+        self._tavily_client = None
+        self._serpapi = None
+        self._http_client: Optional[httpx.AsyncClient] = None
+
+    def _get_semaphore(self, provider: str) -> asyncio.Semaphore:
+        if provider not in self._semaphores:
+            self._semaphores[provider] = asyncio.Semaphore(self.concurrency.get(provider, 4))
+        return self._semaphores[provider]
+
+    async def _cached(self, cache: TTLCache, provider: str, params: Any,
+                      fetch: Callable[[], Awaitable[Any]], timeout: Optional[float] = None) -> Any:
+        key = (provider, json.dumps(params, sort_keys=True, ensure_ascii=False, default=str))
+        if key in cache:
+            return cache[key]
+
+        task = self._inflight.get(key)
+        if task is None:
+            async def run():
+                async with self._get_semaphore(provider):
+                    result = await asyncio.wait_for(fetch(), timeout=timeout or self.timeout)
+                cache[key] = result
+                return result
+
+            task = asyncio.create_task(run())
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        else:
+            logger.debug(f"Reuse in-flight {provider} request: {key[1]}")
+
+        # 某个调用方被取消时不影响其他等待同一结果的调用方
+        return await asyncio.shield(task)
+
+    def _get_tavily_client(self):
+        if self._tavily_client is None:
+            from tavily import AsyncTavilyClient
+            self._tavily_client = AsyncTavilyClient(api_key=app_settings.tools.tavily.get("api_key"))
+        return self._tavily_client
+
+    def _get_http_client(self) -> httpx.AsyncClient:
+        if self._http_client is None or self._http_client.is_closed:
+            self._http_client = httpx.AsyncClient(timeout=self.timeout)
+        return self._http_client
+
+    async def tavily_search(self, query: str, **kwargs) -> dict:
+        """Tavily 搜索，返回原始的响应 dict"""
+        params = {"query": query, "country": "china", **{k: v for k, v in kwargs.items() if v is not None}}
+        return await self._cached(
+            self.search_cache, "tavily", params,
+            lambda: self._get_tavily_client().search(**params)
+        )
+
+    async def bocha_search(self, payload: dict) -> dict:
+        """Bocha 搜索，返回原始的响应 dict，HTTP 状态码非 200 时抛出异常"""
+        async def fetch():
+            response = await self._get_http_client().post(
+                app_settings.tools.bocha.get("endpoint"),
+                headers={"Authorization": f'Bearer {app_settings.tools.bocha.get("api_key")}'},
+                json=payload
+            )
+            if response.status_code != 200:
+                raise ValueError(f"状态码: {response.status_code}, 错误信息: {response.text}")
+            return response.json()
+
+        return await self._cached(self.search_cache, "bocha", payload, fetch)
+
+    async def google_search(self, query: str) -> str:
+        """SerpAPI Google 搜索，返回整理后的文本"""
+        if self._serpapi is None:
+            from langchain_community.utilities import SerpAPIWrapper
+            self._serpapi = SerpAPIWrapper(serpapi_api_key=app_settings.tools.google.get("api_key"))
+        return await self._cached(self.search_cache, "google", {"query": query},
+                                  lambda: self._serpapi.arun(query))
+
+    async def crawl(self, url: str) -> str:
+        """爬取网页，返回 Markdown"""
+        return await self._cached(self.crawl_cache, "crawl", {"url": url},
+                                  lambda: self._crawler_pool.crawl(url), timeout=self.crawl_timeout)
+
+    async def close(self):
+        await self._crawler_pool.close()
+        if self._http_client is not None:
+            await self._http_client.aclose()
+
+
+_web_search_service: Optional[WebSearchService] = None
+
+
+def get_web_search_service() -> WebSearchService:
+    """懒加载，保证读取到的是已加载的配置"""
+    global _web_search_service
+    if _web_search_service is None:
+        _web_search_service = WebSearchService()
+    return _web_search_service
+
+
+async def close_web_search_service():
+    if _web_search_service is not None:
+        await _web_search_service.close()
@@ -21,7 +21,7 @@ from agentchat.services.mcp.manager import MCPManager
 from agentchat.prompts.completion import GenerateTitlePrompt
 from agentchat.utils.convert import convert_mcp_config
 from agentchat.core.models.manager import ModelManager
-from agentchat.api.services.mcp_user_config import MCPUserConfigService
+from agentchat.api.services.mcp_user_config import MCPUserConfigCache
 from agentchat.api.services.usage_stats import UsageStatsService
 from agentchat.api.services.workspace_session import WorkSpaceSessionService
 from agentchat.database.models.workspace_session import WorkSpaceSessionCreate, WorkSpaceSessionContext
@@ -76,6 +76,8 @@ class WeChatAgent:
 
         # Find user config by server name
         self.server_dict: dict[str, Any] = {}
+        # User configs of the MCP servers, loaded in one batch on the first MCP tool call of this turn
+        self.mcp_user_configs = MCPUserConfigCache(user_id, [mcp_config.mcp_server_id for mcp_config in mcp_configs])
 
         # Initialize state management
         self._initialized = False
@@ -120,7 +122,7 @@ class WeChatAgent:
         ) -> ToolMessage | Command:
             if self.is_mcp_tool(request.tool_call["name"]):
                 # 针对鉴权的MCP Server需要用户的单独配置，例如飞书、邮箱
-                mcp_config = await MCPUserConfigService.get_mcp_user_config(self.user_id, self.get_mcp_id_by_tool(request.tool_call["name"]))
+                mcp_config = await self.mcp_user_configs.get(self.get_mcp_id_by_tool(request.tool_call["name"]))
                 request.tool_call["args"].update(mcp_config)
                 tool_result = await handler(request)
                 print(tool_result)
@@ -245,7 +247,7 @@ class WeChatAgent:
         return response
 
     async def _generate_title(self, query):
-        session = await WorkSpaceSessionService.get_workspace_session_from_id(self.session_id, self.wechat_account_user)
+        session = await WorkSpaceSessionService.get_workspace_session_from_id(self.session_id, self.wechat_account_user, include_contexts=False)
         if session:
             return session.get("title")
         title_prompt = GenerateTitlePrompt.format(query=query)
@@ -253,7 +255,7 @@ class WeChatAgent:
         return response.content
 
     async def _add_workspace_session(self, title, contexts: WorkSpaceSessionContext):
-        session = await WorkSpaceSessionService.get_workspace_session_from_id(self.session_id, self.wechat_account_user)
+        session = await WorkSpaceSessionService.get_workspace_session_from_id(self.session_id, self.wechat_account_user, include_contexts=False)
         if session:
             await WorkSpaceSessionService.update_workspace_session_contexts(
                 session_id=self.session_id,
@@ -14,6 +14,16 @@ class Settings(BaseSettings):
     whitelist_paths: list = []
     wechat_config: dict = {}
     default_config: dict = {}
+    lingseek: dict = {}
+    tool_call: dict = {}
+    workspace: dict = {}
+    text2sql: dict = {}
+    mcp_proxy: dict = {}
+    startup: dict = {}
+    completion: dict = {}
+    web_search: dict = {}
+    deepsearch: dict = {}
+    mars: dict = {}
 
     server: Optional[ServerConfig] = ServerConfig()
     rag: Optional[Rag] = None
@@ -2,7 +2,8 @@ import asyncio
 from typing import Type, Any
 from langchain.tools import BaseTool
 from pydantic import BaseModel, Field
-from crawl4ai import AsyncWebCrawler
+
+from agentchat.services.web_search import get_web_search_service
 
 class CrawlWebInput(BaseModel):
     web_url: str = Field(description='想要爬取内容的网页地址')
@@ -13,15 +14,19 @@ class CrawlWebTool(BaseTool):
     args_schema: Type[BaseModel] = CrawlWebInput
 
     def _run(self, web_url: str):
-        return crawl_web(web_url)
+        # 同步调用时没有可复用的事件循环，只能单独启动浏览器
+        return asyncio.run(crawl_action(web_url))
+
+    async def _arun(self, web_url: str):
+        return await crawl_web(web_url)
 
-def crawl_web(web_url: str):
-    """帮助用户爬取网页的内容信息"""
-    result = asyncio.run(crawl_action(web_url))
-    return result
+async def crawl_web(web_url: str):
+    """帮助用户爬取网页的内容信息，复用常驻的浏览器池，结果按 URL 缓存"""
+    return await get_web_search_service().crawl(web_url)
 
 async def crawl_action(web_url: str):
+    from crawl4ai import AsyncWebCrawler  # 导入较慢，第一次使用时再导入
+
     async with AsyncWebCrawler(verbose=True) as crawler:
         result = await crawler.arun(url=web_url)
         return result.markdown
-
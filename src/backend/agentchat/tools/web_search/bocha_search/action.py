@@ -1,8 +1,7 @@
 from langchain.tools import tool
-import requests
 from typing import Optional, Literal
 
-from agentchat.settings import app_settings
+from agentchat.services.web_search import get_web_search_service
 
 # 定义 freshness 的合法值（提升类型安全性）
 FreshnessType = Literal[
@@ -10,7 +9,7 @@ FreshnessType = Literal[
 ]
 
 @tool("bocha_search", parse_docstring=True)
-def bocha_search(
+async def bocha_search(
     query: str,
     count: int = 10,
     freshness: FreshnessType = "noLimit",
@@ -33,11 +32,6 @@ def bocha_search(
         str: 格式化的搜索结果或错误信息
     """
 
-    url = app_settings.tools.bocha.get("endpoint")
-    headers = {
-        'Authorization': f'Bearer {app_settings.tools.bocha.get("api_key")}',  # 请替换为你的API密钥
-        'Content-Type': 'application/json'
-    }
     # 构建请求体（只包含非 None 值）
     data = {
         "query": query,
@@ -54,31 +48,29 @@ def bocha_search(
     if exclude is not None:
         data["exclude"] = exclude
 
-    response = requests.post(url, headers=headers, json=data)
+    try:
+        json_response = await get_web_search_service().bocha_search(data)
+    except Exception as e:
+        return f"搜索API请求失败，{str(e)}"
 
-    if response.status_code == 200:
-        json_response = response.json()
-        try:
-            if json_response["code"] != 200 or not json_response["data"]:
-                return f"搜索API请求失败，原因是: {response.msg or '未知错误'}"
+    try:
+        if json_response["code"] != 200 or not json_response["data"]:
+            return f"搜索API请求失败，原因是: {json_response.get('msg') or '未知错误'}"
 
-            webpages = json_response["data"]["webPages"]["value"]
-            print(webpages)
-            if not webpages:
-                return "未找到相关结果。"
-            formatted_results = ""
-            for idx, page in enumerate(webpages, start=1):
-                formatted_results += (
-                    f"引用: {idx}\n"
-                    f"标题: {page['name']}\n"
-                    f"URL: {page['url']}\n"
-                    f"摘要: {page['summary']}\n"
-                    f"网站名称: {page['siteName']}\n"
-                    f"网站图标: {page['siteIcon']}\n"
-                    f"发布时间: {page['dateLastCrawled']}\n\n"
-                )
-            return formatted_results.strip()
-        except Exception as e:
-            return f"搜索API请求失败，原因是：搜索结果解析失败 {str(e)}"
-    else:
-        return f"搜索API请求失败，状态码: {response.status_code}, 错误信息: {response.text}"
\ No newline at end of file
+        webpages = json_response["data"]["webPages"]["value"]
+        if not webpages:
+            return "未找到相关结果。"
+        formatted_results = ""
+        for idx, page in enumerate(webpages, start=1):
+            formatted_results += (
+                f"引用: {idx}\n"
+                f"标题: {page['name']}\n"
+                f"URL: {page['url']}\n"
+                f"摘要: {page['summary']}\n"
+                f"网站名称: {page['siteName']}\n"
+                f"网站图标: {page['siteIcon']}\n"
+                f"发布时间: {page['dateLastCrawled']}\n\n"
+            )
+        return formatted_results.strip()
+    except Exception as e:
+        return f"搜索API请求失败，原因是：搜索结果解析失败 {str(e)}"
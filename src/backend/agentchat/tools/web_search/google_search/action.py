@@ -1,11 +1,10 @@
 from langchain.tools import tool
-from langchain_community.utilities import SerpAPIWrapper
-from agentchat.settings import app_settings
 
-search = SerpAPIWrapper(serpapi_api_key=app_settings.tools.google.get('api_key'))
+from agentchat.services.web_search import get_web_search_service
+
 
 @tool("web_search", parse_docstring=True)
-def google_search(query: str):
+async def google_search(query: str):
     """
     根据用户的问题进行网上搜索信息。
 
@@ -15,9 +14,9 @@ def google_search(query: str):
     Returns:
         str: 搜索到的信息。
     """
-    return _google_search(query)
+    return await _google_search(query)
 
-def _google_search(query: str):
+async def _google_search(query: str):
     """使用搜索工具给用户进行搜索"""
-    result = search.run(query)
+    result = await get_web_search_service().google_search(query)
     return result
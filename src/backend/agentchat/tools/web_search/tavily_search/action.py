@@ -1,14 +1,11 @@
 from typing import Type, Optional, Literal
 from langchain.tools import tool
-from tavily import TavilyClient
 
-from agentchat.settings import app_settings
+from agentchat.services.web_search import get_web_search_service
 
 
-tavily_client = TavilyClient(app_settings.tools.tavily.get("api_key"))
-
 @tool("web_search", parse_docstring=True)
-def tavily_search(query: str,
+async def tavily_search(query: str,
                   topic: Optional[str],
                   max_results: Optional[int],
                   time_range: Optional[Literal["day", "week", "month", "year"]]):
@@ -24,13 +21,12 @@ def tavily_search(query: str,
     Returns:
         将联网搜索到的信息返回给用户
     """
-    return _tavily_search(query, topic, max_results, time_range)
+    return await _tavily_search(query, topic, max_results, time_range)
 
-def _tavily_search(query, topic, max_results, time_range):
+async def _tavily_search(query, topic, max_results, time_range):
     """使用Tavily搜索工具给用户进行搜索"""
-    response = tavily_client.search(
+    response = await get_web_search_service().tavily_search(
         query=query,
-        country="china",
         topic=topic,
         time_range=time_range,
         max_results=max_results
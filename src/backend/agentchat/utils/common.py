@@ -1,4 +1,5 @@
 import uuid
+import functools
 import tiktoken
 from loguru import logger
 from datetime import datetime, timedelta, timezone
@@ -11,21 +12,51 @@ def get_now_time() -> datetime:
 def generate_uuid() -> str:
     return str(uuid.uuid4())
 
+@functools.lru_cache(maxsize=32)
+def get_token_encoding(model: str = None) -> tiktoken.Encoding:
+    """缓存 tiktoken 编码器，不认识的模型（国产模型）统一使用 cl100k_base"""
+    if model:
+        try:
+            return tiktoken.encoding_for_model(model)
+        except KeyError:
+            pass
+    return tiktoken.get_encoding("cl100k_base")
+
 def count_tokens_usage(text: str, model: str=None):
     """
     计算普通文本的 token 数量, 使用国产模型只能计算大概token使用量，±10%
     """
-    try:
-        if model:
-            enc = tiktoken.encoding_for_model(model)
-        else:
-            enc = tiktoken.get_encoding("cl100k_base")
+    if not text:
+        return 0
 
-        return len(enc.encode(text))
+    try:
+        return len(get_token_encoding(model).encode(text, disallowed_special=()))
 
     except Exception as e:
         # 兜底策略
         logger.warning(f"tiktoken failed, fallback to rough estimate: {e}")
 
         # 粗略估算：英文≈4 chars/token，中文≈1.5 chars/token
-        return int(len(text) / 2)
\ No newline at end of file
+        return int(len(text) / 2)
+
+def truncate_text_tokens(text: str, max_tokens: int, model: str=None, marker: str="\n......(中间内容已省略)......\n"):
+    """
+    将文本压缩到 max_tokens 以内，保留开头和结尾（结尾通常包含结论），中间部分省略
+    """
+    if max_tokens <= 0:
+        return ""
+    try:
+        enc = get_token_encoding(model)
+        tokens = enc.encode(text, disallowed_special=())
+        if len(tokens) <= max_tokens:
+            return text
+        head = max_tokens * 2 // 3
+        tail = max_tokens - head
+        return enc.decode(tokens[:head]) + marker + enc.decode(tokens[-tail:])
+    except Exception as e:
+        logger.warning(f"tiktoken failed, fallback to rough truncate: {e}")
+        max_chars = max_tokens * 2
+        if len(text) <= max_chars:
+            return text
+        head = max_chars * 2 // 3
+        return text[:head] + marker + text[-(max_chars - head):]
\ No newline at end of file